@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedBooking, Booking, OutboxMessage
+
+# Finished bookings leave the hot Booking table once their day is far enough
+# in the past, so the live lists, the slot checks and their indexes only see
+# current activity. The move copies rows as they are: SalonStats and
+# PlatformMetrics already count them and are deliberately left alone.
+ARCHIVED_STATUSES = ('COMPLETED', 'CANCELLED')
+DEFAULT_BATCH_SIZE = 500
+DELETE_CHUNK = 500
+# Every Booking column has a same-named ArchivedBooking column
+FIELDS = [field.attname for field in Booking._meta.concrete_fields]
+
+
+def cutoff_date(older_than_days=None):
+    if older_than_days is None:
+        older_than_days = settings.BOOKING_ARCHIVE_AFTER_DAYS
+    return timezone.localdate() - timedelta(days=older_than_days)
+
+
+def archivable(cutoff):
+    return Booking.objects.filter(status__in=ARCHIVED_STATUSES, date__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=DEFAULT_BATCH_SIZE, after_id=0):
+    """
+    Move up to `batch_size` archivable bookings with an id above `after_id`
+    in one short transaction. Returns (moved, last id seen); walking the
+    primary key keeps each batch an index range scan, however large the
+    table. `moved` is 0 once nothing is left.
+    """
+    with transaction.atomic():
+        rows = list(
+            archivable(cutoff).filter(pk__gt=after_id)
+            .select_for_update().order_by('pk').values(*FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, after_id
+        ids = [row['id'] for row in rows]
+        ArchivedBooking.objects.bulk_create([ArchivedBooking(**row) for row in rows])
+        # Sent notifications outlive the booking row, as after a delete
+        OutboxMessage.objects.filter(booking_id__in=ids).update(booking=None)
+        _delete_bookings(ids)
+    return len(ids), ids[-1]
+
+
+def _delete_bookings(ids):
+    # A plain DELETE: Model.delete() and QuerySet.delete() send post_delete,
+    # whose receivers would take these bookings back out of the stats rollups
+    table = connection.ops.quote_name(Booking._meta.db_table)
+    column = connection.ops.quote_name(Booking._meta.pk.column)
+    with connection.cursor() as cursor:
+        # Within the backend's limit on query parameters (999 on old SQLite)
+        for start in range(0, len(ids), DELETE_CHUNK):
+            chunk = ids[start:start + DELETE_CHUNK]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})", chunk,
+            )
+
+
+def bookings(archived=False):
+    """All live bookings, or with `archived` the archived ones, to filter further."""
+    return ArchivedBooking.objects.all() if archived else Booking.objects.all()
@@ -0,0 +1,227 @@
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+
+from salon.models import Staff
+from .models import Booking
+
+# Every day is split into fixed slots and each staff member gets one integer
+# per day where bit N means "slot N is free". Checking whether a service fits
+# at a given start is then a couple of shifts and ANDs instead of a loop.
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = (24 * 60) // SLOT_MINUTES
+MAX_DAYS = 7
+
+# Bookings in these states no longer hold a slot
+RELEASED_STATUSES = ('CANCELLED',)
+
+# Day bitmaps live in the shared cache under a per-salon version that every
+# booking, staff or salon change bumps, so all worker processes stop reading
+# them at once. The timeout bounds how stale a per-process cache can get.
+CACHE_TIMEOUT = 5 * 60
+
+
+def _slot_index(t, round_up=False):
+    minutes = t.hour * 60 + t.minute
+    index, remainder = divmod(minutes, SLOT_MINUTES)
+    if round_up and (remainder or t.second):
+        index += 1
+    return index
+
+
+def _range_mask(start, end):
+    # Bits [start, end) set
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def _open_mask(salon, member):
+    start = max(_slot_index(salon.opening_time, round_up=True), _slot_index(member.available_from, round_up=True))
+    end = min(_slot_index(salon.closing_time), _slot_index(member.available_to))
+    return _range_mask(start, end)
+
+
+def _fits_mask(free, length):
+    # A start slot is usable only if the next `length` slots are all free
+    mask = free
+    for offset in range(1, length):
+        mask &= free >> offset
+    return mask
+
+
+def _slots_needed(duration):
+    return max(1, -(-duration // SLOT_MINUTES))
+
+
+def _version_key(salon_id):
+    return f'salon:{salon_id}:availability_version'
+
+
+def _day_key(salon_id, version, day):
+    return f'salon:{salon_id}:availability:{version}:{day.isoformat()}'
+
+
+def _salon_version(salon_id):
+    key = _version_key(salon_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh value rather than 0, as in catalog_cache
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_salon(salon_id):
+    """Stop serving every cached day for a salon, in all processes sharing the cache."""
+    key = _version_key(salon_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _day_queries(salon, days):
+    staff = (
+        Staff.objects.filter(salon=salon, is_active=True)
+        .working_on(*days)
+        .only('id', 'name', 'available_from', 'available_to', 'working_days')
+        .order_by('name')
+    )
+    bookings = (
+        Booking.objects.filter(salon=salon, date__in=days, staff__isnull=False)
+        .exclude(status__in=RELEASED_STATUSES)
+        .values_list('staff_id', 'date', 'time', 'end_time')
+    )
+    return staff, bookings
+
+
+def _assemble_days(salon, days, staff, bookings):
+    busy = {}
+    for staff_id, day, start, end in bookings:
+        mask = _range_mask(_slot_index(start), min(_slot_index(end, round_up=True), SLOTS_PER_DAY))
+        busy[(staff_id, day)] = busy.get((staff_id, day), 0) | mask
+
+    result = {}
+    for day in days:
+        entries = []
+        for member in staff:
+            if not member.works_on(day):
+                continue
+            free = _open_mask(salon, member) & ~busy.get((member.pk, day), 0)
+            entries.append((member.pk, member.name, free))
+        result[day] = tuple(entries)
+    return result
+
+
+def _build_days(salon, days):
+    """
+    Compute the free-slot bitmaps for `days` of one salon.
+
+    Runs exactly two queries however many days or staff are involved: one for
+    the active staff working on any of those weekdays and one for every
+    booking in the date range.
+    """
+    staff, bookings = _day_queries(salon, days)
+    return _assemble_days(salon, days, list(staff), list(bookings))
+
+
+async def _abuild_days(salon, days):
+    staff, bookings = _day_queries(salon, days)
+    return _assemble_days(salon, days, [m async for m in staff], [row async for row in bookings])
+
+
+def _day_keys(salon, days, version):
+    return {day: _day_key(salon.pk, version, day) for day in days}
+
+
+def _split_cached(keys, found):
+    result = {day: found[key] for day, key in keys.items() if key in found}
+    return result, [day for day in keys if day not in result]
+
+
+def get_day_bitmaps(salon, days):
+    """
+    Return {date: ((staff_id, staff_name, free_bitmap), ...)} for each day.
+
+    Days already in the cache are served from it in one round trip, the rest
+    are built together so a whole week costs the same number of queries as
+    one day.
+    """
+    keys = _day_keys(salon, days, _salon_version(salon.pk))
+    result, missing = _split_cached(keys, cache.get_many(list(keys.values())))
+    if missing:
+        built = _build_days(salon, missing)
+        cache.set_many({keys[day]: entries for day, entries in built.items()}, CACHE_TIMEOUT)
+        result.update(built)
+    return result
+
+
+async def aget_day_bitmaps(salon, days):
+    """get_day_bitmaps() with the cache and the two queries used asynchronously."""
+    version = await cache.aget(_version_key(salon.pk))
+    if version is None:
+        version = await sync_to_async(_salon_version)(salon.pk)
+    keys = _day_keys(salon, days, version)
+    result, missing = _split_cached(keys, await cache.aget_many(list(keys.values())))
+    if missing:
+        built = await _abuild_days(salon, missing)
+        await cache.aset_many({keys[day]: entries for day, entries in built.items()}, CACHE_TIMEOUT)
+        result.update(built)
+    return result
+
+
+def _format_slot(index):
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _past_mask(day):
+    # Hide start times that have already gone by today
+    now = timezone.localtime()
+    if day < now.date():
+        return _range_mask(0, SLOTS_PER_DAY)
+    if day > now.date():
+        return 0
+    return _range_mask(0, _slot_index(now.time(), round_up=True))
+
+
+def _request_days(start_date, num_days):
+    num_days = max(1, min(num_days, MAX_DAYS))
+    return [start_date + timedelta(days=offset) for offset in range(num_days)]
+
+
+def _schedule(service, days, bitmaps, staff_id):
+    length = _slots_needed(service.duration)
+    schedule = []
+    for day in days:
+        hidden = _past_mask(day)
+        staff_slots = []
+        for member_id, name, free in bitmaps[day]:
+            if staff_id is not None and member_id != staff_id:
+                continue
+            starts = _fits_mask(free, length) & ~hidden
+            slots = [_format_slot(i) for i in range(SLOTS_PER_DAY) if starts >> i & 1]
+            staff_slots.append({'id': member_id, 'name': name, 'slots': slots})
+        schedule.append({'date': day.isoformat(), 'staff': staff_slots})
+    return schedule
+
+
+def available_slots(salon, service, start_date, num_days=1, staff_id=None):
+    """
+    List the bookable start times for `service` at `salon` over a date range.
+
+    Returns one entry per day, each with the staff members who can take the
+    service and the "HH:MM" start times they have free.
+    """
+    days = _request_days(start_date, num_days)
+    return _schedule(service, days, get_day_bitmaps(salon, days), staff_id)
+
+
+async def aavailable_slots(salon, service, start_date, num_days=1, staff_id=None):
+    """available_slots() for async views."""
+    days = _request_days(start_date, num_days)
+    return _schedule(service, days, await aget_day_bitmaps(salon, days), staff_id)
@@ -0,0 +1,169 @@
+import csv
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from salon.models import Salon
+from .models import compute_end_time
+
+# Rows fetched per round trip while streaming; memory stays at one chunk
+# whatever the size of the export
+CHUNK_SIZE = 2000
+# Calendar feeds without an explicit start date begin this far back
+FEED_HISTORY_DAYS = 90
+FEED_SALT = 'booking.calendar-feed'
+
+CSV_COLUMNS = [
+    ('Booking', 'pk'),
+    ('Date', 'date'),
+    ('Start', 'time'),
+    ('End', 'end_time'),
+    ('Status', 'status'),
+    ('Customer first name', 'customer__first_name'),
+    ('Customer last name', 'customer__last_name'),
+    ('Customer email', 'customer__email'),
+    ('Customer phone', 'customer__phone_number'),
+    ('Service', 'service__name'),
+    ('Price', 'service__price'),
+    ('Staff', 'staff__name'),
+    ('Notes', 'notes'),
+    ('Booked at', 'created_at'),
+]
+
+ICS_FIELDS = [
+    'pk', 'date', 'time', 'end_time', 'status', 'service__name', 'service__duration',
+    'customer__first_name', 'customer__last_name', 'staff__name', 'notes', 'updated_at',
+]
+ICS_STATUS = {'PENDING': 'TENTATIVE', 'CONFIRMED': 'CONFIRMED', 'COMPLETED': 'CONFIRMED', 'CANCELLED': 'CANCELLED'}
+
+
+def export_queryset(queryset):
+    # Oldest first along the (salon, date, time) index
+    return queryset.order_by('date', 'time', 'id')
+
+
+def feed_etag(queryset, calendar_name):
+    """
+    Weak ETag for a calendar export, from how many bookings it holds and
+    the latest updated_at among them. The count catches bookings that leave
+    the feed (deleted or archived), which no timestamp in it would show.
+    """
+    totals = queryset.order_by().aggregate(latest=Max('updated_at'), count=Count('pk'))
+    latest = totals['latest'].timestamp() if totals['latest'] else 0
+    key = f"{totals['count']}|{latest}|{calendar_name}"
+    return f'W/"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+class _Echo:
+    # csv.writer target that hands each formatted row straight back
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    text = str(value)
+    # Keep spreadsheet apps from evaluating customer-entered text as a formula
+    if text[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + text
+    return text
+
+
+def csv_rows(queryset):
+    """Yield CSV lines for the bookings in `queryset`, one chunk of rows in memory at a time."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow([label for label, _ in CSV_COLUMNS])
+    rows = export_queryset(queryset).values_list(*[field for _, field in CSV_COLUMNS])
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _ics_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _ics_line(line):
+    # RFC 5545: lines longer than 75 octets are folded with CRLF + space
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never split inside a multi-byte character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc_stamp(day, at):
+    local = timezone.make_aware(datetime.combine(day, at))
+    return local.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_lines(queryset, calendar_name, host):
+    """Yield an iCalendar feed with one VEVENT per booking in `queryset`."""
+    for line in ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//ChautariChic//Appointments//EN',
+                 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH', f'X-WR-CALNAME:{_ics_text(calendar_name)}']:
+        yield _ics_line(line)
+    rows = export_queryset(queryset).values_list(*ICS_FIELDS)
+    for (pk, day, start, end, status, service, duration, first_name, last_name,
+         staff, notes, updated_at) in rows.iterator(chunk_size=CHUNK_SIZE):
+        customer = f'{first_name} {last_name}'.strip()
+        summary = f'{service} - {customer}' if customer else service
+        description = f'Staff: {staff}' if staff else 'Staff: any'
+        if notes:
+            description += f'\nNotes: {notes}'
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:booking-{pk}@{host}',
+            f'DTSTAMP:{updated_at.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}',
+            f'DTSTART:{_utc_stamp(day, start)}',
+            f'DTEND:{_utc_stamp(day, end or compute_end_time(start, duration))}',
+            f'SUMMARY:{_ics_text(summary)}',
+            f'DESCRIPTION:{_ics_text(description)}',
+            f'STATUS:{ICS_STATUS.get(status, "CONFIRMED")}',
+            'END:VEVENT',
+        ]
+        yield ''.join(_ics_line(line) for line in lines)
+    yield _ics_line('END:VCALENDAR')
+
+
+def default_feed_start():
+    return timezone.localdate() - timedelta(days=FEED_HISTORY_DAYS)
+
+
+def feed_token(salon_id, staff_id=None):
+    """
+    Signed token for a subscribable calendar URL of one salon (optionally one
+    stylist). It carries the salon's current calendar_feed_version, so
+    rotate_feed_links() revokes it.
+    """
+    version = Salon.objects.filter(pk=salon_id).values_list('calendar_feed_version', flat=True).first()
+    return signing.dumps({'salon': salon_id, 'staff': staff_id, 'v': version}, salt=FEED_SALT, compress=True)
+
+
+def read_feed_token(token):
+    """(salon_id, staff_id, version) from a feed token, or None if it was tampered with."""
+    try:
+        data = signing.loads(token, salt=FEED_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(data, dict):
+        return None
+    # Links handed out before versions existed belong to the first one
+    return data.get('salon'), data.get('staff'), data.get('v', 1)
+
+
+def rotate_feed_links(salon_id):
+    """Revoke every calendar feed link of a salon; new links use the next version."""
+    Salon.objects.filter(pk=salon_id).update(calendar_feed_version=F('calendar_feed_version') + 1)
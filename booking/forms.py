@@ -1,8 +1,23 @@
 from django import forms
-from .models import Booking
+from .models import Booking, BookingSeries, compute_end_time, hours_error
+from .series import MAX_OCCURRENCES
+from .transitions import ALLOWED_SOURCES, MAX_BATCH
 from salon.models import Service, Staff
 
 class BookingForm(forms.ModelForm):
+    REPEAT_CHOICES = [('', 'Does not repeat')] + [
+        (str(weeks), label) for weeks, label in BookingSeries.INTERVAL_CHOICES
+    ]
+
+    repeat = forms.TypedChoiceField(
+        choices=REPEAT_CHOICES, coerce=int, empty_value=None, required=False,
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    occurrences = forms.IntegerField(
+        min_value=2, max_value=MAX_OCCURRENCES, initial=4, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-input'}),
+    )
+
     class Meta:
         model = Booking
         fields = ['service', 'staff', 'date', 'time', 'notes']
@@ -17,6 +32,105 @@ class BookingForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
+        self.salon = salon
         if salon:
             self.fields['service'].queryset = Service.objects.filter(salon=salon, is_active=True)
             self.fields['staff'].queryset = Staff.objects.filter(salon=salon, is_active=True)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        staff = cleaned_data.get('staff')
+        service = cleaned_data.get('service')
+        day = cleaned_data.get('date')
+        start = cleaned_data.get('time')
+        if staff and day and not staff.works_on(day):
+            self.add_error('staff', f"{staff.name} does not work on {day.strftime('%A')}s.")
+        elif self.salon and service and day and start:
+            # The whole service has to fit in the salon's and stylist's hours
+            error = hours_error(self.salon, staff, day, start, compute_end_time(start, service.duration))
+            if error:
+                self.add_error('time', error)
+        if cleaned_data.get('repeat') and not cleaned_data.get('occurrences'):
+            self.add_error('occurrences', "Say how many appointments to book.")
+        return cleaned_data
+
+
+class SeriesShiftForm(forms.Form):
+    time = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-input'}))
+    days = forms.IntegerField(
+        min_value=-6, max_value=6, initial=0, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-input'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('time') and not cleaned_data.get('days'):
+            raise forms.ValidationError("Pick a new time or a number of days to move by.")
+        return cleaned_data
+
+
+class AppointmentFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[('', 'All statuses')] + Booking.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input'}))
+    staff = forms.ModelChoiceField(
+        queryset=Staff.objects.none(),
+        required=False,
+        empty_label='All staff',
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    # Read the archive of old completed/cancelled bookings instead
+    history = forms.BooleanField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        if salon:
+            self.fields['staff'].queryset = Staff.objects.filter(salon=salon).only('id', 'name').order_by('name')
+            self.fields['staff'].label_from_instance = lambda member: member.name
+
+    def wants_history(self):
+        return self.is_valid() and self.cleaned_data['history']
+
+    def filter_queryset(self, queryset):
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('date_from'):
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(date__lte=data['date_to'])
+        if data.get('staff'):
+            queryset = queryset.filter(staff=data['staff'])
+        return queryset
+
+
+class BookingIdsField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        try:
+            return [int(pk) for pk in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Booking ids must be numbers.")
+
+    def validate(self, value):
+        super().validate(value)
+        if len(value) > MAX_BATCH:
+            raise forms.ValidationError(f"Select at most {MAX_BATCH} bookings.")
+
+
+class BulkStatusForm(forms.Form):
+    ids = BookingIdsField()
+    status = forms.ChoiceField(
+        choices=[(value, label) for value, label in Booking.STATUS_CHOICES if value in ALLOWED_SOURCES],
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
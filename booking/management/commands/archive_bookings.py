@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed and cancelled bookings older than --older-than-days into the "
+        "archive table, one short transaction per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=None,
+            help=f"Archive bookings whose day is at least this old (default BOOKING_ARCHIVE_AFTER_DAYS, {settings.BOOKING_ARCHIVE_AFTER_DAYS}).",
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE, help="Bookings per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches, to leave room for other writers.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days is not None and days < 1:
+            raise CommandError("--older-than-days must be at least 1.")
+        cutoff = archive.cutoff_date(days)
+
+        if options['dry_run']:
+            count = archive.archivable(cutoff).count()
+            self.stdout.write(f"{count} booking(s) from before {cutoff} would be archived.")
+            return
+
+        batch_size = max(1, options['batch_size'])
+        total, last_id = 0, 0
+        while True:
+            started = time.perf_counter()
+            moved, last_id = archive.archive_batch(cutoff, batch_size, after_id=last_id)
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f"Archived {moved} booking(s) up to id {last_id} in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} booking(s) from before {cutoff}."))
@@ -0,0 +1,91 @@
+import threading
+import time as timer
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from booking.models import Booking
+from salon.models import EVERY_DAY, Salon, Service, ServiceCategory, Staff
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire many parallel bookings at the same staff slot and check that exactly "
+        "one succeeds. Creates a throwaway salon in the configured database and "
+        "removes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=50, help="Number of competing bookings.")
+        parser.add_argument('--threads', type=int, default=16, help="Worker threads firing the bookings.")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated data for inspection.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("The race benchmark needs a file or server database; in-memory SQLite is per-connection.")
+
+        attempts = options['attempts']
+        tag = uuid.uuid4().hex[:8]
+        owner, customers, salon, service, staff = self._setup(tag, attempts)
+        slot_date = timezone.localdate() + timedelta(days=1)
+        start_gate = threading.Event()
+
+        def attempt(customer):
+            try:
+                start_gate.wait()
+                booking = Booking(customer=customer, salon=salon, service=service, staff=staff, date=slot_date, time=time(10, 0))
+                return booking.reserve()
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            futures = [pool.submit(attempt, customer) for customer in customers]
+            started = timer.perf_counter()
+            start_gate.set()
+            results = [future.result() for future in futures]
+        elapsed = timer.perf_counter() - started
+
+        wins = sum(1 for r in results if r)
+        stored = Booking.objects.filter(staff=staff, date=slot_date).count()
+        self.stdout.write(f"attempts:    {attempts} on {options['threads']} threads ({connection.vendor})")
+        self.stdout.write(f"succeeded:   {wins}")
+        self.stdout.write(f"rejected:    {attempts - wins}")
+        self.stdout.write(f"rows stored: {stored}")
+        self.stdout.write(f"elapsed:     {elapsed:.3f}s")
+        self.stdout.write(f"throughput:  {attempts / elapsed:.1f} booking attempts/s")
+
+        if not options['keep']:
+            salon.delete()
+            User.objects.filter(pk__in=[owner.pk] + [c.pk for c in customers]).delete()
+
+        if wins != 1 or stored != 1:
+            raise CommandError(f"Expected exactly one booking to win the slot, got {wins} ({stored} stored).")
+        self.stdout.write(self.style.SUCCESS("Exactly one booking won the slot."))
+
+    def _setup(self, tag, attempts):
+        owner = User.objects.create_user(
+            username=f'race-owner-{tag}', email=f'race-owner-{tag}@example.com',
+            password=None, user_type='salon_owner',
+        )
+        customers = User.objects.bulk_create([
+            User(username=f'race-{tag}-{i}', email=f'race-{tag}-{i}@example.com', user_type='customer')
+            for i in range(attempts)
+        ])
+        salon = Salon.objects.create(
+            owner=owner, name=f'Race Salon {tag}', description='Benchmark fixture', location='Benchmark',
+            contact_number='0000000000', opening_time=time(9), closing_time=time(18), is_approved=True,
+        )
+        category = ServiceCategory.objects.create(salon=salon, name='Benchmark')
+        service = Service.objects.create(salon=salon, category=category, name='Haircut', price=500, duration=45)
+        staff = Staff.objects.create(
+            salon=salon, name='Benchmark Stylist', role='Stylist', phone='0000000000',
+            available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+        )
+        return owner, customers, salon, service, staff
@@ -0,0 +1,204 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time as timer
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.utils import timezone
+
+from booking.models import Booking, OutboxMessage
+from salon.models import EVERY_DAY, Salon, Service, ServiceCategory, Staff
+
+User = get_user_model()
+
+SLOT_MINUTES = 30
+OPENING, CLOSING = 9, 18
+SLOTS_PER_DAY = (CLOSING - OPENING) * 60 // SLOT_MINUTES
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure booking write throughput under concurrency for the configured database "
+        "profile: writer threads reserve bookings while reader threads list them, each "
+        "operation wrapped like a request (connections released per CONN_MAX_AGE). "
+        "--compare runs the benchmark once per DJANGO_DB_PROFILE and prints them side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Threads creating bookings.")
+        parser.add_argument('--readers', type=int, default=4, help="Threads reading bookings meanwhile.")
+        parser.add_argument('--bookings', type=int, default=100, help="Bookings per writer thread.")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON only.")
+        parser.add_argument(
+            '--compare', nargs='+', metavar='PROFILE',
+            help="Run once per profile (e.g. sqlite-legacy sqlite postgres) in a subprocess and compare.",
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(options)
+            return
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("The write benchmark needs a file or server database; in-memory SQLite is per-connection.")
+
+        result = self.run(options)
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+            return
+        self.report([result])
+
+    def run(self, options):
+        tag = uuid.uuid4().hex[:8]
+        owner, customer, salon, service, members = self._setup(tag, options['writers'])
+        first_day = timezone.localdate() + timedelta(days=1)
+        start_gate = threading.Event()
+        writers_done = threading.Event()
+
+        def write(member):
+            latencies, locked, clashes = [], 0, 0
+            start_gate.wait()
+            for i in range(options['bookings']):
+                day = first_day + timedelta(days=i // SLOTS_PER_DAY)
+                minutes = OPENING * 60 + (i % SLOTS_PER_DAY) * SLOT_MINUTES
+                booking = Booking(
+                    customer=customer, salon=salon, service=service, staff=member,
+                    date=day, time=time(minutes // 60, minutes % 60),
+                )
+                # What the request cycle does around each view
+                close_old_connections()
+                started = timer.perf_counter()
+                try:
+                    if not booking.reserve():
+                        clashes += 1
+                except OperationalError:
+                    # "database is locked": the busy timeout ran out
+                    locked += 1
+                latencies.append((timer.perf_counter() - started) * 1000)
+                close_old_connections()
+            connections.close_all()
+            return latencies, locked, clashes
+
+        def read():
+            reads = 0
+            start_gate.wait()
+            while not writers_done.is_set():
+                close_old_connections()
+                list(Booking.objects.filter(salon=salon).order_by('-date', '-time')[:50])
+                close_old_connections()
+                reads += 1
+            connections.close_all()
+            return reads
+
+        with ThreadPoolExecutor(max_workers=options['writers'] + options['readers']) as pool:
+            writer_futures = [pool.submit(write, member) for member in members]
+            reader_futures = [pool.submit(read) for _ in range(options['readers'])]
+            started = timer.perf_counter()
+            start_gate.set()
+            writer_results = [future.result() for future in writer_futures]
+            elapsed = timer.perf_counter() - started
+            writers_done.set()
+            reads = sum(future.result() for future in reader_futures)
+
+        latencies = sorted(ms for result in writer_results for ms in result[0])
+        locked = sum(result[1] for result in writer_results)
+        clashes = sum(result[2] for result in writer_results)
+        stored = Booking.objects.filter(salon=salon).count()
+        self._teardown(owner, customer, salon)
+        return {
+            'profile': os.environ.get('DJANGO_DB_PROFILE', getattr(settings, 'DB_PROFILE', '')),
+            'vendor': connection.vendor,
+            'journal_mode': self._journal_mode(),
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'writers': options['writers'],
+            'readers': options['readers'],
+            'attempts': len(latencies),
+            'stored': stored,
+            'locked': locked,
+            'clashes': clashes,
+            'elapsed_s': round(elapsed, 3),
+            'writes_per_s': round(stored / elapsed, 1),
+            'reads_per_s': round(reads / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        }
+
+    def compare(self, options):
+        manage = str(settings.BASE_DIR / 'manage.py')
+        results = []
+        for profile in options['compare']:
+            self.stdout.write(f"Running profile {profile}...")
+            command = [
+                sys.executable, manage, 'benchmark_db_writes', '--json',
+                '--writers', str(options['writers']), '--readers', str(options['readers']),
+                '--bookings', str(options['bookings']),
+            ]
+            completed = subprocess.run(
+                command, env={**os.environ, 'DJANGO_DB_PROFILE': profile},
+                capture_output=True, text=True,
+            )
+            if completed.returncode:
+                self.stderr.write(f"{profile} failed:\n{completed.stderr.strip()}")
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        if results:
+            self.report(results)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'profile':<15} {'journal':<8} {'writes/s':>9} {'reads/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'locked':>7} {'stored':>7}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['profile']:<15} {r['journal_mode']:<8} {r['writes_per_s']:>9.1f} {r['reads_per_s']:>9.1f} "
+                f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['locked']:>7} {r['stored']:>7}"
+            )
+        self.stdout.write(
+            f"({results[0]['writers']} writers x {results[0]['attempts'] // max(1, results[0]['writers'])} bookings, "
+            f"{results[0]['readers']} readers)"
+        )
+
+    def _journal_mode(self):
+        if connection.vendor != 'sqlite':
+            return '-'
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def _setup(self, tag, writers):
+        owner = User.objects.create_user(
+            username=f'writes-owner-{tag}', email=f'writes-owner-{tag}@example.com',
+            password=None, user_type='salon_owner',
+        )
+        customer = User.objects.create_user(
+            username=f'writes-{tag}', email=f'writes-{tag}@example.com', password=None, user_type='customer',
+        )
+        salon = Salon.objects.create(
+            owner=owner, name=f'Write Benchmark Salon {tag}', description='Benchmark fixture', location='Benchmark',
+            contact_number='0000000000', opening_time=time(OPENING), closing_time=time(CLOSING), is_approved=True,
+        )
+        category = ServiceCategory.objects.create(salon=salon, name='Benchmark')
+        service = Service.objects.create(salon=salon, category=category, name='Haircut', price=500, duration=SLOT_MINUTES)
+        # One stylist per writer, so every reservation is a real insert rather than a clash
+        members = Staff.objects.bulk_create([
+            Staff(
+                salon=salon, name=f'Benchmark Stylist {i}', role='Stylist', phone='0000000000',
+                available_from=time(OPENING), available_to=time(CLOSING), working_days=EVERY_DAY,
+            )
+            for i in range(writers)
+        ])
+        return owner, customer, salon, service, members
+
+    def _teardown(self, owner, customer, salon):
+        OutboxMessage.objects.filter(recipient__in=[owner.email, customer.email]).delete()
+        salon.delete()
+        User.objects.filter(pk__in=[owner.pk, customer.pk]).delete()
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as timer
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from salon.models import Salon
+
+INTERFACES = ('wsgi', 'asgi')
+STARTUP_TIMEOUT = 30
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def _read_response(reader):
+    # Minimal HTTP/1.1 response reader: status, then a Content-Length or
+    # chunked body; returns (status, keep_alive)
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked, keep_alive = None, False, True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and value == 'close':
+            keep_alive = False
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+                break
+            await reader.readexactly(size + 2)
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+async def _client(host, port, paths, offset, deadline, measure_from, latencies, errors):
+    reader = writer = None
+    index = offset
+    while timer.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = timer.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: */*\r\n\r\n'.encode())
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors['connection'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+        if started >= measure_from:
+            latencies.append((timer.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+    if writer is not None:
+        writer.close()
+
+
+async def load(host, port, paths, concurrency, duration, warmup):
+    """Keep `concurrency` keep-alive connections busy; latencies after warm-up only."""
+    latencies, errors = [], {'connection': 0}
+    started = timer.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    await asyncio.gather(*[
+        _client(host, port, paths, i, deadline, measure_from, latencies, errors) for i in range(concurrency)
+    ])
+    return latencies, errors
+
+
+def _wait_for_port(host, port, process):
+    deadline = timer.monotonic() + STARTUP_TIMEOUT
+    while timer.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"The server exited with status {process.returncode}.")
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            timer.sleep(0.1)
+    raise CommandError(f"The server did not start listening on {host}:{port}.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the public salon pages and the availability endpoint under uvicorn, "
+        "once with the sync views behind a WSGI thread pool and once with the async views "
+        "over ASGI, and compare sustained requests/s and tail latency at high concurrency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interfaces', nargs='+', choices=INTERFACES, default=list(INTERFACES))
+        parser.add_argument('--concurrency', type=int, default=200, help="Open keep-alive connections.")
+        parser.add_argument('--duration', type=float, default=20, help="Measured seconds per interface.")
+        parser.add_argument('--warmup', type=float, default=3, help="Unmeasured seconds first.")
+        parser.add_argument('--workers', type=int, default=1, help="Server processes.")
+        parser.add_argument('--threads', type=int, default=10, help="WSGI threads per process.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--path', action='append', dest='paths', help="URL to request (repeatable); defaults to a mix of public pages.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON only.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        host, port = '127.0.0.1', options['port']
+        results = []
+        for interface in options['interfaces']:
+            if not options['json']:
+                self.stdout.write(f"{interface.upper()}: {options['concurrency']} connections for {options['duration']:g}s...")
+            results.append(self.run(interface, host, port, paths, options))
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.report(results, paths, options)
+
+    def default_paths(self):
+        salon = (
+            Salon.objects.filter(is_approved=True, is_active=True, services__is_active=True, staff__is_active=True)
+            .exclude(latitude=None).order_by('pk').first()
+        )
+        if salon is None:
+            raise CommandError("No public salon with services and staff; run seed_data first or pass --path.")
+        service = salon.services.filter(is_active=True).order_by('pk').first()
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        return [
+            reverse('salon:public_salon_list') + '?' + urlencode({'q': salon.name}),
+            reverse('salon:public_salon_detail', args=[salon.pk]),
+            reverse('salon:public_salon_list') + '?' + urlencode({'near': f'{salon.latitude},{salon.longitude}', 'radius': 5}),
+            reverse('booking:availability', args=[salon.pk]) + '?' + urlencode({'service': service.pk, 'date': tomorrow, 'days': 7}),
+        ]
+
+    def run(self, interface, host, port, paths, options):
+        manage = str(settings.BASE_DIR / 'manage.py')
+        command = [
+            sys.executable, manage, 'serve', '--interface', interface, '--host', host, '--port', str(port),
+            '--workers', str(options['workers']), '--threads', str(options['threads']),
+        ]
+        # A file rather than a pipe, which a chatty server could fill and block on
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=log, env=os.environ.copy())
+        try:
+            _wait_for_port(host, port, server)
+            latencies, errors = asyncio.run(
+                load(host, port, paths, options['concurrency'], options['duration'], options['warmup'])
+            )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if not latencies:
+            log.seek(0)
+            raise CommandError(f"No {interface} request completed:\n{log.read().decode(errors='replace')[-2000:]}")
+        log.close()
+        latencies.sort()
+        return {
+            'interface': interface,
+            'requests': len(latencies),
+            'requests_per_s': round(len(latencies) / options['duration'], 1),
+            'p50_ms': round(statistics.median(latencies), 1),
+            'p95_ms': round(percentile(latencies, 0.95), 1),
+            'p99_ms': round(percentile(latencies, 0.99), 1),
+            'max_ms': round(latencies[-1], 1),
+            'errors': {kind: count for kind, count in errors.items() if count},
+        }
+
+    def report(self, results, paths, options):
+        self.stdout.write(
+            f"{'interface':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'requests':>9}  errors"
+        )
+        for r in results:
+            errors = ', '.join(f'{kind}: {count}' for kind, count in r['errors'].items()) or '-'
+            self.stdout.write(
+                f"{r['interface']:<10} {r['requests_per_s']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['requests']:>9}  {errors}"
+            )
+        self.stdout.write(
+            f"({options['concurrency']} connections, {options['workers']} worker process(es), "
+            f"{options['threads']} WSGI threads; paths requested in rotation:)"
+        )
+        for path in paths:
+            self.stdout.write(f"  {path}")
@@ -0,0 +1,249 @@
+import json
+import logging
+import statistics
+import time as timer
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from booking.models import Booking
+from salon.models import Salon
+
+User = get_user_model()
+
+# Namespaces and URL names that are not benchmarked: the Django admin, and
+# pages whose GET changes state
+SKIP_NAMESPACES = {'admin'}
+SKIP_NAMES = {'logout'}
+ROLES = ('anonymous', 'customer', 'owner', 'admin')
+# Required query parameters, per URL name
+QUERY_PARAMS = {
+    'booking:availability': lambda fixtures: {'service': fixtures['service'].pk, 'days': 7},
+}
+
+
+def iter_patterns(patterns, prefix='', namespace=None):
+    """Yield (route, qualified name, URLPattern) for every named route."""
+    for entry in patterns:
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            if entry.namespace in SKIP_NAMESPACES:
+                continue
+            child_namespace = entry.namespace or namespace
+            if entry.namespace and namespace:
+                child_namespace = f'{namespace}:{entry.namespace}'
+            yield from iter_patterns(entry.url_patterns, route, child_namespace)
+        elif isinstance(entry, URLPattern) and entry.name and entry.name not in SKIP_NAMES:
+            yield route, f'{namespace}:{entry.name}' if namespace else entry.name, entry
+
+
+class QueryTimer:
+    """Execute wrapper counting queries and timing them with perf_counter."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = timer.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += timer.perf_counter() - started
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every named URL through the test client against the configured database "
+        "and report p50/p95 latency, SQL query count and SQL time per view. Writes a JSON "
+        "baseline and can compare against a previous one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per URL.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per URL first.")
+        parser.add_argument('--output', default='benchmarks/views.json', help="Where to write the results.")
+        parser.add_argument('--compare', help="Baseline JSON to diff against.")
+        parser.add_argument('--only', help="Only URL names containing this text.")
+        parser.add_argument('--host', default='localhost', help="Host header for the requests.")
+
+    def handle(self, *args, **options):
+        fixtures = self.find_fixtures()
+        clients = self.make_clients(fixtures, options['host'])
+        results = {}
+        # 4xx/5xx responses while probing roles are expected; keep them out of the report
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            self.benchmark_urls(fixtures, clients, results, options)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        baseline = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'counts': {
+                'salons': Salon.objects.count(),
+                'bookings': Booking.objects.count(),
+                'users': User.objects.count(),
+            },
+            'views': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), baseline)
+
+    def benchmark_urls(self, fixtures, clients, results, options):
+        for route, name, pattern in iter_patterns(get_resolver().url_patterns):
+            # Format-suffix and duplicate includes repeat names; time each once
+            if name in results or (options['only'] and options['only'] not in name):
+                continue
+            url = self.build_url(name, pattern, fixtures)
+            if url is None:
+                results[name] = {'route': route, 'skipped': 'no sample arguments'}
+                continue
+            results[name] = self.measure(url, route, clients, options['warmup'], max(1, options['iterations']))
+            self.report(name, results[name])
+
+    def find_fixtures(self):
+        busiest = (
+            Booking.objects.filter(salon__is_approved=True, salon__is_active=True)
+            .values('salon').annotate(n=Count('pk')).order_by('-n').first()
+        )
+        if busiest is None:
+            raise CommandError("No bookings found; run `manage.py seed_data` first.")
+        salon = Salon.objects.select_related('owner').get(pk=busiest['salon'])
+        booking = Booking.objects.filter(salon=salon).select_related('customer').order_by('-date').first()
+        return {
+            'salon': salon,
+            'owner': salon.owner,
+            'customer': booking.customer,
+            'admin': User.objects.filter(user_type='super_admin').first() or User.objects.filter(is_superuser=True).first(),
+            'booking': booking,
+            'category': salon.categories.order_by('pk').first(),
+            'service': salon.services.order_by('pk').first(),
+            'staff': salon.staff.order_by('pk').first(),
+        }
+
+    def make_clients(self, fixtures, host):
+        clients = {}
+        for role in ROLES:
+            user = None if role == 'anonymous' else fixtures[role]
+            if role != 'anonymous' and user is None:
+                continue
+            # Record server errors as results instead of aborting the run
+            client = Client(HTTP_HOST=host, raise_request_exception=False)
+            if user is not None:
+                client.force_login(user)
+            clients[role] = client
+        return clients
+
+    def build_url(self, name, pattern, fixtures):
+        kwargs = {}
+        for key in pattern.pattern.regex.groupindex:
+            if key == 'salon_id':
+                kwargs[key] = fixtures['salon'].pk
+            elif key == 'status':
+                kwargs[key] = 'CONFIRMED'
+            elif key == 'format':
+                continue
+            elif key == 'pk':
+                # The object a pk refers to is named in the URL name
+                source = next((k for k in ('category', 'service', 'staff', 'booking', 'status') if k in name), 'salon')
+                obj = fixtures['booking' if source == 'status' else source]
+                if obj is None:
+                    return None
+                kwargs[key] = obj.pk
+            else:
+                return None
+        try:
+            url = reverse(name, kwargs=kwargs)
+        except Exception:
+            return None
+        if name in QUERY_PARAMS:
+            url += '?' + urlencode(QUERY_PARAMS[name](fixtures))
+        return url
+
+    def measure(self, url, route, clients, warmup, iterations):
+        # Use the first role the view answers without a redirect or 403
+        role, response = None, None
+        for candidate, client in clients.items():
+            response = client.get(url)
+            if response.status_code < 300:
+                role = candidate
+                break
+        if role is None:
+            return {'route': route, 'url': url, 'skipped': f'no role gets a 2xx (last status {response.status_code})'}
+
+        client = clients[role]
+        for _ in range(warmup):
+            client.get(url)
+        latencies, query_counts, sql_times = [], [], []
+        for _ in range(iterations):
+            queries = QueryTimer()
+            with connection.execute_wrapper(queries):
+                started = timer.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append((timer.perf_counter() - started) * 1000)
+            query_counts.append(queries.count)
+            sql_times.append(queries.seconds * 1000)
+        return {
+            'route': route,
+            'url': url,
+            'role': role,
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'queries': max(query_counts),
+            'sql_ms': round(statistics.median(sql_times), 2),
+            'bytes': len(response.content) if not response.streaming else None,
+        }
+
+    def report(self, name, result):
+        if 'skipped' in result:
+            self.stdout.write(f"{name:<40} skipped: {result['skipped']}")
+            return
+        self.stdout.write(
+            f"{name:<40} {result['role']:<9} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+            f"{result['queries']:>3} queries  {result['sql_ms']:>7.2f}ms SQL"
+        )
+
+    def compare(self, old, new):
+        self.stdout.write(f"\nAgainst baseline from {old.get('created_at')}:")
+        for name, result in new['views'].items():
+            before = old.get('views', {}).get(name)
+            if not before or 'skipped' in before or 'skipped' in result:
+                continue
+
+            def change(key):
+                if not before[key]:
+                    return '   n/a'
+                return f"{(result[key] - before[key]) / before[key] * 100:+6.1f}%"
+
+            queries = result['queries'] - before['queries']
+            self.stdout.write(
+                f"{name:<40} p50 {change('p50_ms')}  p95 {change('p95_ms')}  "
+                f"queries {queries:+d}  SQL {change('sql_ms')}"
+            )
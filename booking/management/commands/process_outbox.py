@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking import notifications
+
+
+class Command(BaseCommand):
+    help = "Deliver queued booking notifications from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Messages claimed per round.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--max-attempts', type=int, default=notifications.MAX_ATTEMPTS, help="Attempts before a message is marked failed.")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        backends = notifications.get_backends()
+        totals = [0, 0, 0]
+        while not self.stopping:
+            if not options['once']:
+                # A long-running worker drops connections past CONN_MAX_AGE
+                close_old_connections()
+            batch = notifications.claim_batch(max(1, options['batch_size']))
+            if batch:
+                counts = notifications.deliver(batch, backends, options['max_attempts'])
+                totals = [total + count for total, count in zip(totals, counts)]
+                self.stdout.write(f"Sent {counts[0]}, retrying {counts[1]}, failed {counts[2]}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {totals[0]} sent, {totals[1]} retries scheduled, {totals[2]} failed."))
+
+    def stop(self, signum, frame):
+        # Finish the batch in hand, then exit
+        self.stopping = True
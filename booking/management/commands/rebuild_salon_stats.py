@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from booking import stats
+from salon.models import Salon
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SalonStats rollup table from existing bookings, a batch of salons at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Salons per transaction.")
+        parser.add_argument('--salon', type=int, action='append', dest='salons', help="Only rebuild this salon id (repeatable).")
+
+    def handle(self, *args, **options):
+        salon_ids = Salon.objects.order_by('pk').values_list('pk', flat=True)
+        if options['salons']:
+            salon_ids = salon_ids.filter(pk__in=options['salons'])
+        salon_ids = list(salon_ids)
+
+        batch_size = max(1, options['batch_size'])
+        total_rows = 0
+        for start in range(0, len(salon_ids), batch_size):
+            batch = salon_ids[start:start + batch_size]
+            rows = stats.rebuild_for_salons(batch)
+            total_rows += rows
+            self.stdout.write(f"Salons {batch[0]}-{batch[-1]}: {rows} daily rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total_rows} rows for {len(salon_ids)} salons."))
@@ -0,0 +1,218 @@
+import random
+import uuid
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking import availability, stats
+from booking.models import Booking, compute_end_time
+from salon import catalog_cache, metrics, search
+from salon.models import EVERY_DAY, Salon, Service, ServiceCategory, Staff
+
+User = get_user_model()
+
+# City centres; seeded salons are scattered a few km around them
+LOCATIONS = {
+    'Kathmandu': (27.7172, 85.3240), 'Lalitpur': (27.6644, 85.3188), 'Bhaktapur': (27.6710, 85.4298),
+    'Pokhara': (28.2096, 83.9856), 'Chitwan': (27.6766, 84.4300), 'Biratnagar': (26.4525, 87.2718),
+    'Butwal': (27.7006, 83.4484), 'Dharan': (26.8125, 87.2836),
+}
+CATEGORIES = {
+    'Hair': ['Haircut', 'Blow Dry', 'Hair Colour', 'Keratin Treatment', 'Hair Spa', 'Highlights'],
+    'Nails': ['Manicure', 'Pedicure', 'Gel Polish', 'Nail Art', 'Acrylic Extensions'],
+    'Skin': ['Facial', 'Clean Up', 'Threading', 'Waxing', 'Bleach'],
+    'Makeup': ['Party Makeup', 'Bridal Makeup', 'Saree Draping', 'Mehendi'],
+    'Spa': ['Head Massage', 'Body Massage', 'Foot Reflexology', 'Body Polish'],
+}
+ROLES = ['Hairdresser', 'Nail Technician', 'Makeup Artist', 'Beautician', 'Therapist']
+NAME_PARTS = ['Glow', 'Chautari', 'Lotus', 'Himalayan', 'Silk', 'Velvet', 'Bloom', 'Aura', 'Shine', 'Pearl']
+DURATIONS = [15, 30, 30, 45, 45, 60, 60, 90, 120]
+WORKING_PATTERNS = [EVERY_DAY, 0b0111111, 0b1011111, 0b0011111, 0b1100000, 0b1110111]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the database with synthetic users, salons, catalogs and bookings using "
+        "bulk inserts, then rebuild the rollups and search index that signals would "
+        "normally maintain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--salons', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=4, help="Categories per salon (max 5).")
+        parser.add_argument('--services', type=int, default=4, help="Services per category.")
+        parser.add_argument('--staff', type=int, default=5, help="Staff per salon.")
+        parser.add_argument('--bookings', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=180, help="Bookings are spread over this many past days plus 30 ahead.")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Unique per run so seeding twice adds data instead of colliding
+        self.tag = uuid.uuid4().hex[:6]
+        self.password = make_password('password')
+        today = timezone.localdate()
+
+        with transaction.atomic():
+            owners = self.create_users(options['salons'], 'salon_owner', options['days'])
+            customers = self.create_users(options['customers'], 'customer', options['days'])
+            admin = self.create_users(1, 'super_admin', options['days'])
+            salons = self.create_salons(owners)
+            services, staff = self.create_catalog(salons, min(options['categories'], len(CATEGORIES)), options['services'], options['staff'])
+            bookings = self.create_bookings(salons, customers, services, staff, options['bookings'], today, options['days'])
+
+        salon_ids = [salon.pk for salon in salons]
+        self.stdout.write("Rebuilding rollups and search index...")
+        for start in range(0, len(salon_ids), 200):
+            stats.rebuild_for_salons(salon_ids[start:start + 200])
+        metrics.rebuild()
+        search.rebuild_index()
+        for salon_id in salon_ids:
+            catalog_cache.invalidate_salon(salon_id)
+            availability.invalidate_salon(salon_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(owners) + len(customers) + len(admin)} users, {len(salons)} salons, "
+            f"{len(services)} services, {sum(len(s) for s in staff.values())} staff, {bookings} bookings "
+            f"(tag {self.tag}, admin login {admin[0].username} / password)."
+        ))
+
+    def create_users(self, count, user_type, days):
+        now = timezone.now()
+        users = []
+        for i in range(count):
+            email = f'{user_type.replace("_", "")}{i}.{self.tag}@example.com'
+            users.append(User(
+                username=email, email=email, password=self.password, user_type=user_type,
+                first_name=self.rng.choice(['Asha', 'Bina', 'Sita', 'Gita', 'Rita', 'Maya', 'Anita', 'Sunita', 'Ram', 'Hari']),
+                last_name=self.rng.choice(['Shrestha', 'Bhattarai', 'Gurung', 'Tamang', 'Karki', 'Thapa', 'Rai', 'Magar']),
+                is_superuser=user_type == 'super_admin', is_staff=user_type == 'super_admin',
+                # Signups ramp up over time
+                date_joined=now - timedelta(days=days * self.rng.random() ** 2),
+            ))
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_salons(self, owners):
+        salons = []
+        for i, owner in enumerate(owners):
+            opening = self.rng.choice([8, 9, 9, 10])
+            location = self.rng.choice(list(LOCATIONS))
+            latitude, longitude = LOCATIONS[location]
+            salon = Salon(
+                owner=owner,
+                name=f'{self.rng.choice(NAME_PARTS)} {self.rng.choice(["Salon", "Beauty Studio", "Parlour", "Spa"])} {i}',
+                description=f'Hair, nails and skin care in {location}.',
+                location=location,
+                latitude=round(latitude + self.rng.uniform(-0.05, 0.05), 6),
+                longitude=round(longitude + self.rng.uniform(-0.05, 0.05), 6),
+                contact_number=f'01-{self.rng.randint(4000000, 5999999)}',
+                opening_time=time(opening), closing_time=time(opening + self.rng.choice([8, 9, 10])),
+                # Most salons are approved and active; a few wait for review
+                is_approved=self.rng.random() < 0.85,
+                is_active=self.rng.random() < 0.95,
+            )
+            # bulk_create() skips save(), which fills this in
+            salon.geohash = salon.compute_geohash()
+            salons.append(salon)
+        return Salon.objects.bulk_create(salons, batch_size=self.batch_size)
+
+    def create_catalog(self, salons, categories_per_salon, services_per_category, staff_per_salon):
+        categories = []
+        for salon in salons:
+            for name in self.rng.sample(sorted(CATEGORIES), categories_per_salon):
+                categories.append(ServiceCategory(salon=salon, name=name))
+        categories = ServiceCategory.objects.bulk_create(categories, batch_size=self.batch_size)
+
+        services = []
+        for category in categories:
+            names = CATEGORIES[category.name]
+            for name in self.rng.sample(names, min(services_per_category, len(names))):
+                # Log-normal prices: most services are cheap, a few are expensive
+                price = Decimal(round(min(25000, self.rng.lognormvariate(7, 0.7)), -1))
+                services.append(Service(
+                    salon_id=category.salon_id, category=category, name=name, price=price,
+                    duration=self.rng.choice(DURATIONS), description=f'{name} by our experts.',
+                    is_active=self.rng.random() < 0.95,
+                ))
+        services = Service.objects.bulk_create(services, batch_size=self.batch_size)
+
+        members = []
+        for salon in salons:
+            for i in range(staff_per_salon):
+                members.append(Staff(
+                    salon=salon, name=f'{self.rng.choice(["Asha", "Bina", "Kiran", "Puja", "Nisha", "Rohan"])} {i}',
+                    role=self.rng.choice(ROLES), phone=f'98{self.rng.randint(10000000, 99999999)}',
+                    available_from=salon.opening_time, available_to=salon.closing_time,
+                    working_days=self.rng.choice(WORKING_PATTERNS), is_active=self.rng.random() < 0.9,
+                ))
+        staff = {}
+        for member in Staff.objects.bulk_create(members, batch_size=self.batch_size):
+            staff.setdefault(member.salon_id, []).append(member)
+        return services, staff
+
+    def create_bookings(self, salons, customers, services, staff, count, today, days):
+        by_salon = {}
+        for service in services:
+            if service.is_active:
+                by_salon.setdefault(service.salon_id, []).append(service)
+        bookable = [salon for salon in salons if salon.is_approved and by_salon.get(salon.pk)]
+        if not bookable or not customers:
+            return 0
+        # Popularity follows a power law: a few salons get most bookings
+        weights = [self.rng.paretovariate(1.2) for _ in bookable]
+        # ...and so do customers
+        customer_weights = [self.rng.paretovariate(1.5) for _ in customers]
+
+        created = 0
+        batch = []
+        # (staff id, day) -> bitmap of the 15-minute slots already taken, so
+        # no stylist is double-booked (Booking.reserve()'s invariant)
+        taken = {}
+        salon_picks = self.rng.choices(bookable, weights=weights, k=count)
+        customer_picks = self.rng.choices(customers, weights=customer_weights, k=count)
+        for salon, customer in zip(salon_picks, customer_picks):
+            service = self.rng.choice(by_salon[salon.pk])
+            day = today + timedelta(days=self.rng.randint(-days, 30))
+            open_minutes = salon.opening_time.hour * 60
+            close_minutes = salon.closing_time.hour * 60 - service.duration
+            start = open_minutes + 15 * self.rng.randint(0, max(0, (close_minutes - open_minutes) // 15))
+            start_time = time(start // 60, start % 60)
+            members = [m for m in staff.get(salon.pk, []) if m.works_on(day)]
+            if day < today:
+                status = self.rng.choices(['COMPLETED', 'CANCELLED', 'CONFIRMED'], weights=[80, 15, 5])[0]
+            else:
+                status = self.rng.choices(['PENDING', 'CONFIRMED', 'CANCELLED'], weights=[45, 45, 10])[0]
+            member = None
+            if members and self.rng.random() < 0.8:
+                member = self.free_member(taken, members, day, start, service.duration, holds_slot=status != 'CANCELLED')
+            batch.append(Booking(
+                customer=customer, salon=salon, service=service, staff=member,
+                date=day, time=start_time, end_time=compute_end_time(start_time, service.duration),
+                status=status,
+            ))
+            if len(batch) >= self.batch_size:
+                created += len(Booking.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Booking.objects.bulk_create(batch))
+        return created
+
+    def free_member(self, taken, members, day, start, duration, holds_slot=True):
+        """A random one of `members` free for the whole service, or None (left unassigned)."""
+        first = start // 15
+        mask = ((1 << -(-duration // 15)) - 1) << first
+        for member in self.rng.sample(members, len(members)):
+            key = (member.pk, day)
+            if not taken.get(key, 0) & mask:
+                if holds_slot:
+                    taken[key] = taken.get(key, 0) | mask
+                return member
+        return None
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:12
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+
+
+# A copy of booking.models.compute_end_time as it was when this migration
+# was written; migrations must not follow later changes to app code
+def compute_end_time(start, duration):
+    end = datetime.combine(datetime.min, start) + timedelta(minutes=duration)
+    if end.date() != datetime.min.date():
+        return datetime.max.time()
+    return end.time()
+
+
+def backfill_end_time(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    batch = []
+    for booking in Booking.objects.select_related('service').only('id', 'time', 'service__duration').iterator(chunk_size=1000):
+        booking.end_time = compute_end_time(booking.time, booking.service.duration)
+        batch.append(booking)
+        if len(batch) >= 1000:
+            Booking.objects.bulk_update(batch, ['end_time'])
+            batch = []
+    if batch:
+        Booking.objects.bulk_update(batch, ['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='end_time',
+            field=models.TimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['staff', 'date', 'time', 'end_time'], name='booking_staff_slot_idx'),
+        ),
+    ]
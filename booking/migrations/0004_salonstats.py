@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_query_indexes'),
+        ('salon', '0007_salon_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pending_count', models.IntegerField(default=0)),
+                ('confirmed_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Price of completed bookings', max_digits=12)),
+                ('completed_minutes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='salon.salon')),
+            ],
+            options={
+                'verbose_name_plural': 'Salon stats',
+                'ordering': ['-date'],
+                'unique_together': {('salon', 'date')},
+            },
+        ),
+    ]
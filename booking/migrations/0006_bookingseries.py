@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 15:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_outboxmessage'),
+        ('salon', '0009_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('time', models.TimeField()),
+                ('interval_weeks', models.PositiveSmallIntegerField(choices=[(1, 'Every week'), (2, 'Every 2 weeks')], default=1)),
+                ('occurrences', models.PositiveSmallIntegerField()),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to=settings.AUTH_USER_MODEL)),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to='salon.salon')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to='salon.service')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_series', to='salon.staff')),
+            ],
+            options={
+                'verbose_name_plural': 'Booking series',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='booking.bookingseries'),
+        ),
+    ]
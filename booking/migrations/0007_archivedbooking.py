@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_bookingseries'),
+        ('salon', '0011_catalog_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL)),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='salon.salon')),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bookings', to='booking.bookingseries')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='salon.service')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bookings', to='salon.staff')),
+            ],
+            options={
+                'ordering': ['-date', '-time'],
+                'indexes': [models.Index(fields=['salon', 'date', 'time'], name='archived_salon_date_idx'), models.Index(fields=['customer', 'created_at'], name='archived_customer_created_idx')],
+            },
+        ),
+    ]
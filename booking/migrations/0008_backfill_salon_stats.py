@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+# booking.stats.rebuild_for_salons() as it stood when this migration was
+# written; copied so later changes to the app cannot alter it
+STAT_FIELDS = (
+    'pending_count', 'confirmed_count', 'completed_count', 'cancelled_count',
+    'revenue', 'completed_minutes',
+)
+
+
+def aggregate_bookings(queryset):
+    return (
+        queryset.order_by()
+        .values('salon_id', 'date')
+        .annotate(
+            pending_count=Count('pk', filter=Q(status='PENDING')),
+            confirmed_count=Count('pk', filter=Q(status='CONFIRMED')),
+            completed_count=Count('pk', filter=Q(status='COMPLETED')),
+            cancelled_count=Count('pk', filter=Q(status='CANCELLED')),
+            revenue=Sum('service__price', filter=Q(status='COMPLETED'), default=0),
+            completed_minutes=Sum('service__duration', filter=Q(status='COMPLETED'), default=0),
+        )
+    )
+
+
+def backfill_salon_stats(apps, schema_editor):
+    """
+    SalonStats was created empty, so bookings made before it existed were
+    missing from the owner dashboard. Recompute every row from the live and
+    archived bookings; this also replaces rows counted since then.
+    """
+    SalonStats = apps.get_model('booking', 'SalonStats')
+    days = {}
+    for model_name in ('Booking', 'ArchivedBooking'):
+        for values in aggregate_bookings(apps.get_model('booking', model_name).objects.all()):
+            key = (values['salon_id'], values['date'])
+            if key in days:
+                for field in STAT_FIELDS:
+                    days[key][field] += values[field]
+            else:
+                days[key] = values
+    SalonStats.objects.all().delete()
+    SalonStats.objects.bulk_create([SalonStats(**values) for values in days.values()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_salon_stats, migrations.RunPython.noop),
+    ]
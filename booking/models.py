@@ -1,7 +1,49 @@
-from django.db import models
+from datetime import datetime, timedelta
+from django.db import models, transaction
+from django.utils import timezone
 from django.conf import settings
 from salon.models import Salon, Service, Staff
 
+
+class BookingQuerySet(models.QuerySet):
+    def holding_slot(self):
+        # Cancelled bookings free their slot again
+        return self.exclude(status='CANCELLED')
+
+    def overlapping(self, staff, date, start, end):
+        # Half-open intervals: [start, end) overlaps [time, end_time) when
+        # each one starts before the other ends. Served by the
+        # (staff, date, time, end_time) index as a single range scan.
+        return self.holding_slot().filter(staff=staff, date=date, time__lt=end, end_time__gt=start)
+
+
+def compute_end_time(start, duration):
+    end = datetime.combine(datetime.min, start) + timedelta(minutes=duration)
+    # Services running past midnight are clamped to the end of the day
+    if end.date() != datetime.min.date():
+        return datetime.max.time()
+    return end.time()
+
+
+def hours_error(salon, staff, day, start, end):
+    """
+    Why [start, end) on `day` cannot be booked with `staff` (None for any
+    stylist) given the salon's and the stylist's hours, or None if it can.
+    """
+    if staff is not None and not staff.works_on(day):
+        return f"{staff.name} does not work on {day.strftime('%A')}s."
+    opens, closes = salon.opening_time, salon.closing_time
+    if staff is not None:
+        opens, closes = max(opens, staff.available_from), min(closes, staff.available_to)
+    if start < opens or end > closes:
+        who = staff.name if staff is not None else salon.name
+        return f"{who} takes bookings between {opens:%H:%M} and {closes:%H:%M} only."
+    return None
+
+
+STATS_FIELDS = {'salon_id', 'date', 'status', 'service_id'}
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -18,17 +60,204 @@ class Booking(models.Model):
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='bookings')
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='bookings')
     staff = models.ForeignKey(Staff, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
+    series = models.ForeignKey('BookingSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
     
     date = models.DateField()
     time = models.TimeField()
+    end_time = models.TimeField(null=True, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     notes = models.TextField(blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['staff', 'date', 'time', 'end_time'], name='booking_staff_slot_idx'),
+            # Owner appointment list, customer history and dashboard feed
+            models.Index(fields=['salon', 'date', 'time'], name='booking_salon_date_idx'),
+            models.Index(fields=['customer', 'created_at'], name='booking_customer_created_idx'),
+            models.Index(fields=['salon', 'created_at'], name='booking_salon_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.customer.get_full_name()} - {self.service.name} at {self.salon.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to SalonStats so a later save
+        # can move it to the right status/day
+        if STATS_FIELDS.issubset(field_names):
+            instance._stats_state = instance.stats_state()
+        return instance
+
+    def stats_state(self):
+        return (self.salon_id, self.date, self.status, self.service_id)
+
+    def save(self, *args, **kwargs):
+        if self.time is not None and self.service_id:
+            self.end_time = compute_end_time(self.time, self.service.duration)
+        # The booking row and its stats rollup are written together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def reserve(self):
+        """
+        Save this booking only if it falls within the salon's and its staff
+        member's hours and the staff member is free for the whole service.
+
+        The check and the insert run in one transaction with the staff row
+        locked (BEGIN IMMEDIATE on SQLite), so two customers racing for the
+        same slot cannot both get it, and hours changed since the form was
+        validated are seen. Returns False when the slot cannot be booked.
+        """
+        self.end_time = compute_end_time(self.time, self.service.duration)
+        with transaction.atomic():
+            staff = None
+            if self.staff_id:
+                # Row lock on PostgreSQL/MySQL; a no-op on SQLite where the
+                # IMMEDIATE transaction already holds the write lock
+                staff = Staff.objects.select_for_update().filter(pk=self.staff_id).first()
+            if hours_error(self.salon, staff, self.date, self.time, self.end_time):
+                return False
+            if staff is not None:
+                clash = Booking.objects.overlapping(self.staff_id, self.date, self.time, self.end_time)
+                if self.pk:
+                    clash = clash.exclude(pk=self.pk)
+                if clash.exists():
+                    return False
+            self.save()
+        return True
+
+
+class ArchivedBooking(models.Model):
+    """
+    A completed or cancelled booking moved out of the Booking table by
+    `manage.py archive_bookings`, under its original id. SalonStats and
+    PlatformMetrics keep counting it; only the history views read it.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_bookings')
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='archived_bookings')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_bookings')
+    staff = models.ForeignKey(Staff, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_bookings')
+    series = models.ForeignKey('BookingSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_bookings')
+
+    date = models.DateField()
+    time = models.TimeField()
+    end_time = models.TimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    notes = models.TextField(blank=True)
+
+    # Copied from the booking, not stamped again
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', '-time']
+        indexes = [
+            # Owner history list and customer history, as on Booking
+            models.Index(fields=['salon', 'date', 'time'], name='archived_salon_date_idx'),
+            models.Index(fields=['customer', 'created_at'], name='archived_customer_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer.get_full_name()} - {self.service.name} at {self.salon.name} (archived)"
+
+    def stats_state(self):
+        return (self.salon_id, self.date, self.status, self.service_id)
+
+
+class BookingSeries(models.Model):
+    """A weekly or fortnightly repeat of one booking; its occurrences are ordinary Booking rows."""
+    INTERVAL_CHOICES = [
+        (1, 'Every week'),
+        (2, 'Every 2 weeks'),
+    ]
+
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_series')
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='booking_series')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='booking_series')
+    staff = models.ForeignKey(Staff, on_delete=models.SET_NULL, null=True, blank=True, related_name='booking_series')
+    start_date = models.DateField()
+    time = models.TimeField()
+    interval_weeks = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=1)
+    occurrences = models.PositiveSmallIntegerField()
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Booking series"
+
+    def __str__(self):
+        return f"{self.get_interval_weeks_display()}: {self.service.name} at {self.salon.name}"
+
+
+class SalonStats(models.Model):
+    """Per salon, per appointment-day rollup of bookings, kept up to date on every booking write."""
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    pending_count = models.IntegerField(default=0)
+    confirmed_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Price of completed bookings")
+    completed_minutes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Salon stats"
+        unique_together = ('salon', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.salon_id} on {self.date}"
+
+    @property
+    def total_count(self):
+        return self.pending_count + self.confirmed_count + self.completed_count + self.cancelled_count
+
+
+class OutboxMessage(models.Model):
+    """
+    A notification waiting to be delivered. Rows are written in the same
+    transaction as the booking change that caused them and drained by the
+    process_outbox worker, so a rolled-back booking never notifies anyone.
+    """
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_messages')
+    event = models.CharField(max_length=50)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not picked up by the worker before this time")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [
+            # The worker's "next due batch" query only looks at pending rows
+            models.Index(fields=['available_at', 'id'], condition=models.Q(status='PENDING'), name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} via {self.channel} to {self.recipient}"
@@ -0,0 +1,210 @@
+import json
+import logging
+import random
+import sys
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Booking, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# What each booking event tells the customer and the salon owner
+EVENT_TEXT = {
+    'created': (
+        "Booking request received",
+        "Your booking for {service} at {salon} on {when} has been received and is awaiting confirmation.",
+        "New booking: {customer} booked {service} on {when}.",
+    ),
+    'confirmed': (
+        "Booking confirmed",
+        "Your booking for {service} at {salon} on {when} is confirmed.",
+        None,
+    ),
+    'completed': (
+        "Thanks for visiting",
+        "Thanks for visiting {salon}! We hope you enjoyed your {service}.",
+        None,
+    ),
+    'cancelled': (
+        "Booking cancelled",
+        "Your booking for {service} at {salon} on {when} has been cancelled.",
+        "Booking cancelled: {customer}'s {service} on {when}.",
+    ),
+    # Recurring series send one message for the whole series, about its
+    # first (remaining) occurrence
+    'series_created': (
+        "Recurring booking received",
+        "Your recurring booking for {service} at {salon} starting {when} has been received and is awaiting confirmation.",
+        "New recurring booking: {customer} booked {service} starting {when}.",
+    ),
+    'series_rescheduled': (
+        "Recurring booking moved",
+        "Your upcoming {service} visits at {salon} now start {when} and are awaiting confirmation.",
+        "Recurring booking moved: {customer}'s {service} now starts {when}.",
+    ),
+    'series_cancelled': (
+        "Recurring booking cancelled",
+        "Your upcoming {service} visits at {salon} from {when} have been cancelled.",
+        "Recurring booking cancelled: {customer}'s {service} from {when}.",
+    ),
+}
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 30
+BACKOFF_CAP = 60 * 60
+# A claimed batch becomes visible again if its worker dies mid-delivery
+CLAIM_TIMEOUT = 5 * 60
+
+
+def build_messages(booking, event):
+    """Unsaved OutboxMessage rows announcing `event` for `booking`."""
+    if event not in EVENT_TEXT:
+        return []
+    subject, customer_text, owner_text = EVENT_TEXT[event]
+    customer = booking.customer
+    context = {
+        'service': booking.service.name,
+        'salon': booking.salon.name,
+        'when': f"{booking.date:%a %d %b} at {booking.time:%H:%M}",
+        'customer': customer.get_full_name() or customer.email,
+    }
+
+    def message(channel, recipient, text):
+        return OutboxMessage(
+            booking_id=booking.pk, event=event, channel=channel, recipient=recipient,
+            subject=f"{subject} - {booking.salon.name}", body=text.format(**context),
+        )
+
+    messages = []
+    if customer.email:
+        messages.append(message('email', customer.email, customer_text))
+    if customer.phone_number:
+        messages.append(message('sms', customer.phone_number, customer_text))
+    if owner_text and booking.salon.owner.email:
+        messages.append(message('email', booking.salon.owner.email, owner_text))
+    return messages
+
+
+def enqueue(bookings_and_events):
+    """Write the outbox rows for several (booking, event) pairs in one INSERT."""
+    messages = [m for booking, event in bookings_and_events for m in build_messages(booking, event)]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+    return len(messages)
+
+
+def enqueue_for_ids(events_by_id):
+    """Like enqueue(), loading the bookings (and who to tell) in one query."""
+    bookings = Booking.objects.filter(pk__in=events_by_id).select_related('customer', 'service', 'salon__owner')
+    return enqueue((booking, events_by_id[booking.pk]) for booking in bookings)
+
+
+# Delivery backends. Each takes an OutboxMessage and raises on failure.
+class ConsoleBackend:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, message):
+        self.stream.write(f"[{message.channel}] to {message.recipient}: {message.subject}\n{message.body}\n\n")
+        self.stream.flush()
+
+
+class EmailBackend:
+    """Sends through Django's mail framework, i.e. EMAIL_BACKEND (SMTP in production, locmem in tests)."""
+
+    def send(self, message):
+        EmailMessage(message.subject, message.body, to=[message.recipient]).send(fail_silently=False)
+
+
+class SMSGatewayBackend:
+    """POSTs {"to", "message"} as JSON to SMS_GATEWAY_URL with an optional bearer token."""
+
+    def __init__(self, url=None, token=None, timeout=10):
+        self.url = url or getattr(settings, 'SMS_GATEWAY_URL', '')
+        self.token = token or getattr(settings, 'SMS_GATEWAY_TOKEN', '')
+        self.timeout = timeout
+
+    def send(self, message):
+        if not self.url:
+            raise RuntimeError("SMS_GATEWAY_URL is not configured.")
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(
+            self.url, data=json.dumps({'to': message.recipient, 'message': message.body}).encode(),
+            headers=headers, method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"SMS gateway answered {response.status}.")
+
+
+def get_backends():
+    configured = getattr(settings, 'NOTIFICATION_BACKENDS', {})
+    return {channel: import_string(path)() for channel, path in configured.items()}
+
+
+def backoff(attempts):
+    # Exponential with jitter so failed messages do not retry in lockstep
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Take up to `batch_size` due messages. Claiming pushes available_at past
+    CLAIM_TIMEOUT with a conditional UPDATE, so concurrent workers never get
+    the same row and a crashed worker's rows come back on their own.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('available_at', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(pk__in=ids, status='PENDING', available_at__lte=now).update(
+            available_at=now + timedelta(seconds=CLAIM_TIMEOUT),
+        )
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by('available_at', 'id'))
+
+
+def deliver(messages, backends, max_attempts=MAX_ATTEMPTS):
+    """Send claimed messages. Returns (sent, retried, failed) counts."""
+    sent, retried, failed = [], [], []
+    for message in messages:
+        message.attempts += 1
+        backend = backends.get(message.channel)
+        try:
+            if backend is None:
+                raise RuntimeError(f"No backend configured for channel '{message.channel}'.")
+            backend.send(message)
+        except Exception as exc:
+            message.last_error = f"{type(exc).__name__}: {exc}"
+            if message.attempts >= max_attempts:
+                message.status = 'FAILED'
+                failed.append(message)
+                logger.error("Giving up on outbox message %s: %s", message.pk, message.last_error)
+            else:
+                message.available_at = timezone.now() + backoff(message.attempts)
+                retried.append(message)
+        else:
+            message.status = 'SENT'
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            sent.append(message)
+
+    OutboxMessage.objects.bulk_update(
+        sent + retried + failed, ['status', 'attempts', 'available_at', 'last_error', 'sent_at'],
+    )
+    return len(sent), len(retried), len(failed)
@@ -0,0 +1,74 @@
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_SEPARATOR = ','
+
+
+class KeysetPage:
+    """
+    One page of a queryset ordered descending on `fields`, navigated with
+    opaque cursors instead of OFFSET so every page costs the same.
+    """
+
+    def __init__(self, queryset, fields, page_size, after=None, before=None):
+        self.fields = fields
+        self.page_size = page_size
+        model = queryset.model
+        after_key = self._decode(model, after)
+        before_key = self._decode(model, before)
+
+        if before_key is not None:
+            # Walk backwards towards newer rows, then flip back into display order
+            rows = list(
+                queryset.filter(self._compare(before_key, 'gt'))
+                .order_by(*fields)[:page_size + 1]
+            )
+            self.has_previous = len(rows) > page_size
+            self.object_list = rows[:page_size][::-1]
+            self.has_next = True
+        else:
+            qs = queryset.order_by(*[f'-{field}' for field in fields])
+            if after_key is not None:
+                qs = qs.filter(self._compare(after_key, 'lt'))
+            rows = list(qs[:page_size + 1])
+            self.has_next = len(rows) > page_size
+            self.object_list = rows[:page_size]
+            self.has_previous = after_key is not None
+
+    def _compare(self, key, op):
+        # Lexicographic (f1, f2, ...) < key (or >), spelled out as ORs. The
+        # extra bound on the first field lets the index seek straight to it.
+        terms = []
+        for i, field in enumerate(self.fields):
+            equal = {self.fields[j]: key[j] for j in range(i)}
+            terms.append(Q(**equal, **{f'{field}__{op}': key[i]}))
+        return Q(**{f'{self.fields[0]}__{op}e': key[0]}) & reduce(or_, terms)
+
+    def _decode(self, model, cursor):
+        if not cursor:
+            return None
+        parts = cursor.split(CURSOR_SEPARATOR)
+        if len(parts) != len(self.fields):
+            return None
+        try:
+            return [model._meta.get_field(field).to_python(part) for field, part in zip(self.fields, parts)]
+        except ValidationError:
+            return None
+
+    def _encode(self, obj):
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return CURSOR_SEPARATOR.join(values)
+
+    @property
+    def next_cursor(self):
+        return self._encode(self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self._encode(self.object_list[0]) if self.has_previous else None
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from salon.models import Staff
+from . import availability, notifications, stats
+from .models import Booking, BookingSeries, compute_end_time, hours_error
+from .transitions import UPDATED, transition_bookings
+
+# Recurring bookings: a series is expanded into ordinary Booking rows. Every
+# occurrence is checked against the stylist's working days and existing
+# bookings with one query for the whole series, and the accepted ones are
+# written with one bulk INSERT. bulk_create/bulk_update skip post_save, so
+# the stats rollups, outbox and availability cache are updated here.
+MAX_OCCURRENCES = 26
+ACTIVE_STATUSES = ('PENDING', 'CONFIRMED')
+
+PAST = 'past'
+DAY_OFF = 'day_off'
+CLOSED = 'closed'
+TAKEN = 'taken'
+REASON_TEXT = {
+    PAST: "in the past",
+    DAY_OFF: "stylist's day off",
+    CLOSED: "outside opening hours",
+    TAKEN: "stylist already booked",
+}
+
+
+def occurrence_dates(start_date, interval_weeks, occurrences):
+    return [start_date + timedelta(weeks=interval_weeks * i) for i in range(occurrences)]
+
+
+def unavailable_dates(salon, staff, dates, start, end, exclude_ids=()):
+    """
+    {date: reason} for the dates in `dates` on which [start, end) cannot be
+    booked: past days, the stylist's days off, times outside the salon's or
+    stylist's hours, and clashes with existing bookings, found with a single
+    query over all the dates.
+    """
+    today = timezone.localdate()
+    reasons = {day: PAST for day in dates if day < today}
+    for day in dates:
+        if day not in reasons and staff is not None and not staff.works_on(day):
+            reasons[day] = DAY_OFF
+    remaining = [day for day in dates if day not in reasons]
+    # Hours are the same every week, so one check covers every remaining date
+    if remaining and hours_error(salon, staff, remaining[0], start, end):
+        reasons.update((day, CLOSED) for day in remaining)
+        remaining = []
+    if remaining and staff is not None:
+        # overlapping() for every remaining date at once
+        clashes = Booking.objects.holding_slot().filter(
+            staff=staff, date__in=remaining, time__lt=end, end_time__gt=start,
+        )
+        if exclude_ids:
+            clashes = clashes.exclude(pk__in=exclude_ids)
+        for day in clashes.values_list('date', flat=True).distinct():
+            reasons[day] = TAKEN
+    return reasons
+
+
+def _lock_staff(staff):
+    # Same serialisation as Booking.reserve(): row lock on PostgreSQL/MySQL,
+    # the IMMEDIATE write lock on SQLite
+    if staff is not None:
+        Staff.objects.select_for_update().filter(pk=staff.pk).first()
+
+
+def book_series(customer, salon, service, staff, start_date, at, interval_weeks, occurrences, notes=''):
+    """
+    Create a series and all of its occurrences, or nothing at all if any
+    date cannot be booked. Returns (series, {}) or (None, {blocked date:
+    reason}).
+    """
+    occurrences = min(occurrences, MAX_OCCURRENCES)
+    dates = occurrence_dates(start_date, interval_weeks, occurrences)
+    end = compute_end_time(at, service.duration)
+    with transaction.atomic():
+        _lock_staff(staff)
+        blocked = unavailable_dates(salon, staff, dates, at, end)
+        if blocked:
+            return None, blocked
+        series = BookingSeries.objects.create(
+            customer=customer, salon=salon, service=service, staff=staff, start_date=start_date,
+            time=at, interval_weeks=interval_weeks, occurrences=occurrences, notes=notes,
+        )
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                customer=customer, salon=salon, service=service, staff=staff, series=series,
+                date=day, time=at, end_time=end, notes=notes,
+            )
+            for day in dates
+        ])
+        delta = stats.StatsDelta()
+        for booking in bookings:
+            delta.add(booking.stats_state(), booking=booking)
+        delta.apply()
+        notifications.enqueue([(bookings[0], 'series_created')])
+        salon_id = salon.pk
+        transaction.on_commit(lambda: availability.invalidate_salon(salon_id))
+    return series, {}
+
+
+def upcoming(series):
+    """The series' occurrences from today on that are still active."""
+    return series.bookings.filter(date__gte=timezone.localdate(), status__in=ACTIVE_STATUSES)
+
+
+def cancel_series(series):
+    """Cancel every upcoming occurrence with one conditional UPDATE. Returns how many were cancelled."""
+    with transaction.atomic():
+        bookings = list(upcoming(series).select_related('customer', 'service', 'salon__owner').order_by('date'))
+        if not bookings:
+            return 0
+        results = transition_bookings(series.salon, [booking.pk for booking in bookings], 'CANCELLED', notify=False)
+        cancelled = sum(1 for result, _ in results.values() if result == UPDATED)
+        notifications.enqueue([(bookings[0], 'series_cancelled')])
+    return cancelled
+
+
+def shift_series(series, new_time=None, days=0):
+    """
+    Move every upcoming occurrence to `new_time` and/or `days` later (or
+    earlier) with one batched UPDATE. All occurrences move or none do:
+    returns (moved count, {new date: reason}) where the dict lists the
+    occurrences that could not move.
+    """
+    with transaction.atomic():
+        _lock_staff(series.staff)
+        bookings = list(
+            upcoming(series).select_for_update()
+            .select_related('customer', 'service', 'salon__owner').order_by('date')
+        )
+        if not bookings:
+            return 0, {}
+        at = new_time or series.time
+        end = compute_end_time(at, series.service.duration)
+        new_dates = [booking.date + timedelta(days=days) for booking in bookings]
+        blocked = unavailable_dates(series.salon, series.staff, new_dates, at, end, exclude_ids=[b.pk for b in bookings])
+        if blocked:
+            return 0, blocked
+
+        now = timezone.now()
+        delta = stats.StatsDelta()
+        for booking, day in zip(bookings, new_dates):
+            old_state = booking.stats_state()
+            booking.date, booking.time, booking.end_time, booking.updated_at = day, at, end, now
+            # A moved slot has to be confirmed again by the salon
+            booking.status = 'PENDING'
+            delta.move(old_state, booking.stats_state(), booking=booking)
+        Booking.objects.bulk_update(bookings, ['date', 'time', 'end_time', 'status', 'updated_at'])
+        delta.apply()
+
+        series.time = at
+        series.start_date += timedelta(days=days)
+        series.save(update_fields=['time', 'start_date'])
+        notifications.enqueue([(bookings[0], 'series_rescheduled')])
+        salon_id = series.salon_id
+        transaction.on_commit(lambda: availability.invalidate_salon(salon_id))
+    return len(bookings), {}
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from salon.models import Salon, Staff
+from . import availability, notifications, stats
+from .models import ArchivedBooking, Booking
+from .transitions import bookings_transitioned
+
+
+# Any change to a booking, a staff schedule or salon hours makes that salon's
+# cached availability stale. Invalidate after commit so a concurrent reader
+# cannot re-cache the pre-commit state.
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Staff)
+def invalidate_salon_availability(sender, instance, **kwargs):
+    salon_id = instance.salon_id
+    transaction.on_commit(lambda: availability.invalidate_salon(salon_id))
+
+
+@receiver([post_save, post_delete], sender=Salon)
+def invalidate_availability_for_salon(sender, instance, **kwargs):
+    salon_id = instance.pk
+    transaction.on_commit(lambda: availability.invalidate_salon(salon_id))
+
+
+# Queue customer/owner notifications in the booking's own transaction. This
+# must stay connected before update_salon_stats, which overwrites
+# _stats_state with the new state.
+@receiver(post_save, sender=Booking)
+def queue_booking_notifications(sender, instance, created, **kwargs):
+    if created:
+        notifications.enqueue([(instance, 'created')])
+        return
+    old_state = getattr(instance, '_stats_state', None)
+    if old_state is not None and old_state[2] != instance.status:
+        notifications.enqueue([(instance, instance.status.lower())])
+
+
+# Keep the SalonStats rollup in step; Booking.save() runs inside a
+# transaction so the booking and its stats change commit together
+@receiver(post_save, sender=Booking)
+def update_salon_stats(sender, instance, created, **kwargs):
+    old_state = None if created else getattr(instance, '_stats_state', None)
+    new_state = instance.stats_state()
+    if old_state is None and not created:
+        # Saved without having been loaded from the database first
+        return
+    stats.record_booking_change(old_state, new_state, booking=instance)
+    instance._stats_state = new_state
+
+
+# A booking deleted through an instance loaded before a bulk transition
+# would take its old status out of the rollup; read the stored one. Cascades
+# and queryset deletes load their rows fresh, so only direct deletes pay.
+@receiver(pre_delete, sender=Booking)
+def load_stored_stats_state(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        stored = (
+            Booking.objects.filter(pk=instance.pk)
+            .values_list('salon_id', 'date', 'status', 'service_id').first()
+        )
+        if stored is not None:
+            instance._stats_state = tuple(stored)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_salon_stats(sender, instance, **kwargs):
+    state = getattr(instance, '_stats_state', None) or instance.stats_state()
+    stats.record_booking_change(state, None, booking=instance)
+
+
+# Archived bookings still count in the rollups, until they are deleted
+# (with their customer, say)
+@receiver(post_delete, sender=ArchivedBooking)
+def remove_archived_from_salon_stats(sender, instance, **kwargs):
+    stats.record_booking_change(instance.stats_state(), None)
+
+
+# Bulk status changes skip post_save; apply their effects once per batch
+@receiver(bookings_transitioned)
+def apply_bulk_transition(sender, salon_id, changes, notify=True, **kwargs):
+    delta = stats.StatsDelta()
+    for booking_id, old_state, new_state in changes:
+        delta.move(old_state, new_state)
+    delta.apply()
+    if notify:
+        notifications.enqueue_for_ids({booking_id: new_state[2].lower() for booking_id, _, new_state in changes})
+    transaction.on_commit(lambda: availability.invalidate_salon(salon_id))
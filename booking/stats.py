@@ -0,0 +1,139 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from salon import metrics
+from salon.models import Service
+from .models import ArchivedBooking, Booking, SalonStats
+
+STAT_FIELDS = (
+    'pending_count', 'confirmed_count', 'completed_count', 'cancelled_count',
+    'revenue', 'completed_minutes',
+)
+
+
+class StatsDelta:
+    """
+    Accumulates changes to SalonStats and PlatformMetrics rows and writes
+    them as one F()-expression UPDATE per (salon, day) and per day, so
+    concurrent writers never lose increments.
+    """
+
+    def __init__(self):
+        self.changes = defaultdict(Counter)
+        self.platform_changes = defaultdict(Counter)
+        self._service_figures = {}
+
+    def _figures(self, service_id, booking=None):
+        if service_id not in self._service_figures:
+            if booking is not None and Booking.service.is_cached(booking) and booking.service_id == service_id:
+                figures = (booking.service.price, booking.service.duration)
+            else:
+                # The service may already be gone when its bookings cascade
+                figures = Service.objects.filter(pk=service_id).values_list('price', 'duration').first() or (0, 0)
+            self._service_figures[service_id] = figures
+        return self._service_figures[service_id]
+
+    def add(self, state, sign=1, booking=None):
+        if state is None:
+            return
+        salon_id, day, status, service_id = state
+        counter = self.changes[(salon_id, day)]
+        counter[f'{status.lower()}_count'] += sign
+        platform = self.platform_changes[day]
+        platform[f'{status.lower()}_bookings'] += sign
+        if status != 'CANCELLED':
+            price, duration = self._figures(service_id, booking)
+            platform['gross_booking_value'] += sign * price
+            if status == 'COMPLETED':
+                counter['revenue'] += sign * price
+                counter['completed_minutes'] += sign * duration
+
+    def move(self, old_state, new_state, booking=None):
+        if old_state == new_state:
+            return
+        self.add(old_state, -1, booking)
+        self.add(new_state, 1, booking)
+
+    def apply(self):
+        for (salon_id, day), counter in self.changes.items():
+            metrics.increment_row(SalonStats, {'salon_id': salon_id, 'date': day}, counter)
+        for day, counter in self.platform_changes.items():
+            metrics.record(day, **counter)
+        self.changes.clear()
+        self.platform_changes.clear()
+
+
+def record_booking_change(old_state, new_state, booking=None):
+    delta = StatsDelta()
+    delta.move(old_state, new_state, booking)
+    delta.apply()
+
+
+def salon_totals(salon):
+    """Lifetime totals for a salon, summed from its daily rows in one query."""
+    totals = SalonStats.objects.filter(salon=salon).aggregate(**{field: Sum(field) for field in STAT_FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+    totals['revenue'] = Decimal(totals['revenue'])
+    totals['total_count'] = sum(totals[f] for f in STAT_FIELDS if f.endswith('_count'))
+    return totals
+
+
+def daily_trend(salon, days=14):
+    """One entry per day for the last `days` days, with bar heights for a chart."""
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    rows = {row.date: row for row in SalonStats.objects.filter(salon=salon, date__range=(start, end))}
+    trend = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        trend.append({
+            'date': day,
+            'bookings': row.total_count if row else 0,
+            'completed': row.completed_count if row else 0,
+            'revenue': row.revenue if row else Decimal(0),
+        })
+    peak = max([entry['bookings'] for entry in trend] + [1])
+    for entry in trend:
+        entry['height'] = round(entry['bookings'] * 100 / peak)
+    return trend
+
+
+def aggregate_bookings(queryset):
+    """Compute SalonStats values straight from bookings, grouped by salon and day."""
+    return (
+        queryset.order_by()
+        .values('salon_id', 'date')
+        .annotate(
+            pending_count=Count('pk', filter=Q(status='PENDING')),
+            confirmed_count=Count('pk', filter=Q(status='CONFIRMED')),
+            completed_count=Count('pk', filter=Q(status='COMPLETED')),
+            cancelled_count=Count('pk', filter=Q(status='CANCELLED')),
+            revenue=Sum('service__price', filter=Q(status='COMPLETED'), default=0),
+            completed_minutes=Sum('service__duration', filter=Q(status='COMPLETED'), default=0),
+        )
+    )
+
+
+def rebuild_for_salons(salon_ids):
+    """Replace the stats rows of the given salons with freshly computed ones."""
+    with transaction.atomic():
+        SalonStats.objects.filter(salon_id__in=salon_ids).delete()
+        # Live and archived bookings of the same day add up to one row
+        days = {}
+        for model in (Booking, ArchivedBooking):
+            for values in aggregate_bookings(model.objects.filter(salon_id__in=salon_ids)):
+                key = (values['salon_id'], values['date'])
+                if key in days:
+                    for field in STAT_FIELDS:
+                        days[key][field] += values[field]
+                else:
+                    days[key] = values
+        rows = [SalonStats(**values) for values in days.values()]
+        SalonStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from salon import catalog_cache, request_context
+from salon.models import EVERY_DAY, Salon, Service, ServiceCategory, Staff, days_to_mask
+from salon.views import PublicSalonListView, SalonDashboardView
+from . import archive, availability, exports, series, stats
+from .forms import BookingForm
+from .models import ArchivedBooking, Booking, BookingSeries, OutboxMessage, SalonStats
+from .pagination import KeysetPage
+from .transitions import MAX_BATCH, bookings_transitioned, transition_bookings
+from .views import MyBookingsView, SalonAppointmentsView
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTests(TestCase):
+    """
+    Guard the hot list queries against falling back to full table scans or
+    temporary sort B-trees when an index is dropped or a view changes its
+    filter/order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owners = []
+        cls.salons = []
+        for i in range(20):
+            owner = User.objects.create_user(
+                username=f'owner{i}@example.com', email=f'owner{i}@example.com',
+                password='pass', user_type='salon_owner', phone_number=f'98000000{i:02d}',
+            )
+            salon = Salon.objects.create(
+                owner=owner, name=f'Salon {i:02d}', description='Hair and beauty', location='Kathmandu',
+                contact_number='01-0000000', opening_time=time(9), closing_time=time(18),
+                is_approved=i % 3 != 0, is_active=i % 5 != 0,
+            )
+            cls.owners.append(owner)
+            cls.salons.append(salon)
+
+        cls.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com',
+            password='pass', phone_number='9811111111',
+        )
+        others = [
+            User.objects.create_user(username=f'c{i}@example.com', email=f'c{i}@example.com', password='pass', phone_number=f'97000000{i:02d}')
+            for i in range(10)
+        ]
+
+        bookings = []
+        for salon in cls.salons[:5]:
+            category = ServiceCategory.objects.create(salon=salon, name='Hair')
+            service = Service.objects.create(salon=salon, category=category, name='Cut', price=500, duration=30)
+            staff = Staff.objects.create(
+                salon=salon, name='Stylist', role='Stylist', phone='9800000000',
+                available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+            )
+            for day in range(40):
+                for slot, customer in enumerate([cls.customer] + others[:4]):
+                    bookings.append(Booking(
+                        customer=customer, salon=salon, service=service, staff=staff,
+                        date=date(2026, 1, 1) + timedelta(days=day), time=time(9 + slot), end_time=time(9 + slot, 30),
+                    ))
+        Booking.objects.bulk_create(bookings)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, queryset):
+        plan = self.explain(queryset)
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, f"Query sorts in a temp B-tree: {plan}")
+            if step.startswith('SCAN'):
+                self.assertIn('INDEX', step, f"Query falls back to a full table scan: {plan}")
+
+    def view_for(self, view_class, user, **kwargs):
+        view = view_class()
+        view.setup(RequestFactory().get('/'), **kwargs)
+        view.request.user = user
+        # What SalonContextMiddleware would attach
+        view.request.salon = request_context.owner_salon(user)
+        return view
+
+    def test_salon_appointments_query(self):
+        view = self.view_for(SalonAppointmentsView, self.owners[1])
+        ordering = [f'-{field}' for field in view.keyset_fields]
+        self.assertIndexedPlan(view.get_queryset().order_by(*ordering))
+
+    def test_my_bookings_query(self):
+        view = self.view_for(MyBookingsView, self.customer)
+        self.assertIndexedPlan(view.get_queryset())
+
+    def test_dashboard_recent_bookings_query(self):
+        view = self.view_for(SalonDashboardView, self.owners[1])
+        view.object = view.get_object()
+        context = view.get_context_data(object=view.object)
+        self.assertIndexedPlan(context['recent_bookings'])
+
+    def test_public_salon_list_query(self):
+        view = self.view_for(PublicSalonListView, self.customer)
+        self.assertIndexedPlan(view.get_queryset())
+
+
+def next_weekday(weekday):
+    # The first such weekday at least a week ahead, clear of "today" rules
+    start = date.today() + timedelta(days=7)
+    return start + timedelta(days=(weekday - start.weekday()) % 7)
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com',
+            password='pass', user_type='salon_owner', phone_number='9800000001',
+        )
+        cls.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com',
+            password='pass', phone_number='9811111111',
+        )
+        cls.salon = Salon.objects.create(
+            owner=owner, name='Glow', description='Hair', location='Kathmandu',
+            contact_number='01-0000000', opening_time=time(9), closing_time=time(18), is_approved=True,
+        )
+        category = ServiceCategory.objects.create(salon=cls.salon, name='Hair')
+        cls.cut = Service.objects.create(salon=cls.salon, category=category, name='Cut', price=500, duration=30)
+        cls.colour = Service.objects.create(salon=cls.salon, category=category, name='Colour', price=2000, duration=60)
+        cls.stylist = Staff.objects.create(
+            salon=cls.salon, name='Asha', role='Stylist', phone='9800000002',
+            available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+        )
+        cls.weekender = Staff.objects.create(
+            salon=cls.salon, name='Bina', role='Stylist', phone='9800000003',
+            available_from=time(9), available_to=time(18), working_days=days_to_mask(['Sat', 'Sun']),
+        )
+        cls.tuesday = next_weekday(1)
+
+    def setUp(self):
+        # Ids are reused between tests, so versions left in the cache could match
+        cache.clear()
+
+    def slots(self, service, day=None, staff=None):
+        schedule = availability.available_slots(self.salon, service, day or self.tuesday, staff_id=(staff or self.stylist).pk)
+        return schedule[0]['staff'][0]['slots'] if schedule[0]['staff'] else None
+
+    def book(self, start, service=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                customer=self.customer, salon=self.salon, service=service or self.cut,
+                staff=self.stylist, date=self.tuesday, time=start,
+            )
+
+    def test_booking_blocks_every_overlapping_start(self):
+        self.assertIn('10:00', self.slots(self.cut))
+        self.book(time(10))
+        slots = self.slots(self.cut)
+        self.assertIn('09:30', slots)
+        self.assertNotIn('09:45', slots)
+        self.assertNotIn('10:15', slots)
+        self.assertIn('10:30', slots)
+
+    def test_cancelled_booking_frees_its_slot(self):
+        booking = self.book(time(10))
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'CANCELLED'
+            booking.save()
+        self.assertIn('10:00', self.slots(self.cut))
+
+    def test_staff_not_working_that_weekday_is_left_out(self):
+        self.assertIsNone(self.slots(self.cut, staff=self.weekender))
+        self.assertIn('09:00', self.slots(self.cut, day=next_weekday(5), staff=self.weekender))
+
+    def test_service_must_finish_by_closing_time(self):
+        slots = self.slots(self.colour)
+        self.assertEqual(slots[-1], '17:00')
+        self.assertEqual(self.slots(self.cut)[-1], '17:30')
+
+    def test_booking_running_past_closing_time(self):
+        self.book(time(17, 30), service=self.colour)
+        slots = self.slots(self.cut)
+        self.assertEqual(slots[-1], '17:00')
+
+    def test_week_is_built_in_two_queries_then_cached(self):
+        with self.assertNumQueries(2):
+            availability.available_slots(self.salon, self.cut, self.tuesday, num_days=7)
+        with self.assertNumQueries(0):
+            availability.available_slots(self.salon, self.cut, self.tuesday, num_days=7)
+
+
+def make_salon(owner, **kwargs):
+    salon = Salon.objects.create(
+        owner=owner, name='Glow', description='Hair', location='Kathmandu',
+        contact_number='01-0000000', opening_time=time(9), closing_time=time(18), is_approved=True, **kwargs,
+    )
+    category = ServiceCategory.objects.create(salon=salon, name='Hair')
+    service = Service.objects.create(salon=salon, category=category, name='Cut', price=500, duration=45)
+    staff = [
+        Staff.objects.create(
+            salon=salon, name=name, role='Stylist', phone='9800000002',
+            available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+        )
+        for name in ('Asha', 'Bina')
+    ]
+    return salon, service, staff
+
+
+class DoubleBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com',
+            password='pass', user_type='salon_owner', phone_number='9800000001',
+        )
+        cls.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com',
+            password='pass', phone_number='9811111111',
+        )
+        cls.salon, cls.service, cls.staff = make_salon(owner)
+        cls.day = date.today() + timedelta(days=1)
+
+    def reserve(self, start, staff=None):
+        return Booking(
+            customer=self.customer, salon=self.salon, service=self.service,
+            staff=staff or self.staff[0], date=self.day, time=start,
+        ).reserve()
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertTrue(self.reserve(time(10)))
+        self.assertFalse(self.reserve(time(10)))
+        self.assertFalse(self.reserve(time(9, 30)))
+        self.assertFalse(self.reserve(time(10, 30)))
+        # Back to back, or with another stylist, is fine
+        self.assertTrue(self.reserve(time(10, 45)))
+        self.assertTrue(self.reserve(time(10), staff=self.staff[1]))
+
+    def test_cancelled_booking_releases_its_slot(self):
+        self.assertTrue(self.reserve(time(10)))
+        Booking.objects.update(status='CANCELLED')
+        self.assertTrue(self.reserve(time(10)))
+
+    def test_slot_outside_hours_is_rejected(self):
+        Staff.objects.filter(pk=self.staff[1].pk).update(available_from=time(12), available_to=time(16))
+        self.assertFalse(self.reserve(time(8, 30)))
+        # 45 minutes from 17:30 runs past closing
+        self.assertFalse(self.reserve(time(17, 30)))
+        self.assertTrue(self.reserve(time(17, 15)))
+        # Hours changed after the form was validated are seen
+        self.assertFalse(self.reserve(time(11), staff=self.staff[1]))
+        self.assertTrue(self.reserve(time(15, 15), staff=self.staff[1]))
+
+    def test_form_checks_the_whole_service_against_hours(self):
+        def errors(start, staff=None):
+            form = BookingForm(salon=self.salon, data={
+                'service': self.service.pk, 'staff': (staff or self.staff[0]).pk,
+                'date': self.day.isoformat(), 'time': start,
+            })
+            return form.errors.get('time', [])
+
+        self.assertEqual(errors('10:00'), [])
+        self.assertEqual(errors('17:15'), [])
+        self.assertIn('between 09:00 and 18:00', errors('17:30')[0])
+        self.assertTrue(errors('08:45'))
+        Staff.objects.filter(pk=self.staff[1].pk).update(available_to=time(13))
+        self.assertIn('Bina', errors('12:30', staff=self.staff[1])[0])
+
+
+class KeysetPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com',
+            password='pass', user_type='salon_owner', phone_number='9800000001',
+        )
+        customer = User.objects.create_user(username='customer@example.com', password='pass')
+        cls.owner = owner
+        cls.salon, service, _ = make_salon(owner)
+        # Ties on date and on (date, time), so every key field decides a boundary
+        slots = [(1, 9), (1, 9), (1, 10), (2, 9), (2, 9), (2, 9), (3, 11)]
+        Booking.objects.bulk_create([
+            Booking(customer=customer, salon=cls.salon, service=service, date=date(2026, 3, day), time=time(hour))
+            for day, hour in slots
+        ])
+        cls.newest_first = list(Booking.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        # The owner's salon snapshot is cached by user id, which repeats between tests
+        cache.clear()
+
+    def page(self, **cursor):
+        return KeysetPage(Booking.objects.filter(salon=self.salon), ('date', 'time', 'id'), 3, **cursor)
+
+    def ids(self, page):
+        return [booking.id for booking in page.object_list]
+
+    def test_forward_then_back(self):
+        first = self.page()
+        self.assertEqual(self.ids(first), self.newest_first[:3])
+        self.assertEqual((first.has_previous, first.has_next), (False, True))
+
+        second = self.page(after=first.next_cursor)
+        self.assertEqual(self.ids(second), self.newest_first[3:6])
+        last = self.page(after=second.next_cursor)
+        self.assertEqual(self.ids(last), self.newest_first[6:])
+        self.assertEqual((last.has_previous, last.has_next), (True, False))
+        self.assertIsNone(last.next_cursor)
+
+        back = self.page(before=last.previous_cursor)
+        self.assertEqual(self.ids(back), self.newest_first[3:6])
+        start = self.page(before=back.previous_cursor)
+        self.assertEqual(self.ids(start), self.newest_first[:3])
+        self.assertFalse(start.has_previous)
+        self.assertIsNone(start.previous_cursor)
+
+    def test_exact_multiple_of_page_size_has_no_empty_last_page(self):
+        Booking.objects.filter(pk=self.newest_first[-1]).delete()
+        second = self.page(after=self.page().next_cursor)
+        self.assertEqual(self.ids(second), self.newest_first[3:6])
+        self.assertFalse(second.has_next)
+
+    def test_malformed_cursor_falls_back_to_the_first_page(self):
+        for cursor in ('junk', '2026-13-01,09:00:00,1', '2026-03-01,09:00:00'):
+            self.assertEqual(self.ids(self.page(after=cursor)), self.newest_first[:3])
+
+    @mock.patch.object(SalonAppointmentsView, 'page_size', 3)
+    def test_view_links_keep_filters(self):
+        self.client.force_login(self.owner)
+        url = reverse('booking:salon_appointments')
+        response = self.client.get(url, {'status': 'PENDING'})
+        self.assertIn('status=PENDING', response.context['next_query'])
+        response = self.client.get(f"{url}?{response.context['next_query']}")
+        self.assertEqual([b.id for b in response.context['appointments']], self.newest_first[3:6])
+        self.assertIn('status=PENDING', response.context['previous_query'])
+
+
+class SalonStatsTests(TestCase):
+    """The incrementally kept rollup must always equal a recount."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com',
+            password='pass', user_type='salon_owner', phone_number='9800000001',
+        )
+        cls.customer = User.objects.create_user(username='customer@example.com', password='pass')
+        cls.salon, cls.service, _ = make_salon(owner)
+
+    def book(self, day, hour):
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service,
+            date=date(2026, 3, day), time=time(hour),
+        )
+
+    def snapshot(self):
+        # A day whose bookings all went away keeps an all-zero row; a recount has none
+        return list(
+            SalonStats.objects.exclude(pending_count=0, confirmed_count=0, completed_count=0, cancelled_count=0)
+            .order_by('salon_id', 'date')
+            .values_list('salon_id', 'date', *stats.STAT_FIELDS)
+        )
+
+    def assertMatchesRecount(self):
+        kept = self.snapshot()
+        stats.rebuild_for_salons([self.salon.pk])
+        self.assertEqual(kept, self.snapshot())
+        return kept
+
+    def test_create_change_and_delete(self):
+        bookings = [self.book(day, hour) for day in (1, 2) for hour in (9, 10, 11)]
+        self.assertMatchesRecount()
+
+        bookings[0].status = 'CONFIRMED'
+        bookings[0].save()
+        bookings[0].status = 'COMPLETED'
+        bookings[0].save()
+        transition_bookings(self.salon, [b.pk for b in bookings[1:4]], 'CONFIRMED')
+        transition_bookings(self.salon, [bookings[3].pk], 'CANCELLED')
+        kept = self.assertMatchesRecount()
+        self.assertEqual(kept[0][2:6], (0, 2, 1, 0))
+        self.assertEqual(kept[0][6], self.service.price)
+
+        # bookings[1] was confirmed in bulk after this instance was loaded
+        bookings[1].delete()
+        Booking.objects.get(pk=bookings[4].pk).delete()
+        self.customer.delete()
+        self.assertMatchesRecount()
+
+    def test_archiving_keeps_the_rollup(self):
+        booking = self.book(1, 9)
+        Booking.objects.filter(pk=booking.pk).update(status='COMPLETED')
+        stats.rebuild_for_salons([self.salon.pk])
+        before = self.snapshot()
+        archive.archive_batch(archive.cutoff_date(1))
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.assertMatchesRecount(), before)
+
+    def test_backfill_migration_fills_an_empty_table(self):
+        for day, hour in ((1, 9), (1, 10), (2, 9)):
+            self.book(day, hour)
+        kept = self.snapshot()
+        SalonStats.objects.all().delete()
+        migration = import_module('booking.migrations.0008_backfill_salon_stats')
+        migration.backfill_salon_stats(apps, None)
+        self.assertEqual(self.snapshot(), kept)
+
+
+class BookingSeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        cls.customer = User.objects.create_user(username='customer@example.com', email='customer@example.com', password='pass')
+        cls.salon, cls.service, (cls.asha, _) = make_salon(owner)
+        cls.start = next_weekday(0) + timedelta(weeks=1)
+
+    def book_series(self, at=time(10), occurrences=4):
+        with self.captureOnCommitCallbacks(execute=True):
+            return series.book_series(self.customer, self.salon, self.service, self.asha, self.start, at, 1, occurrences)
+
+    def assertMatchesRecount(self):
+        kept = list(SalonStats.objects.filter(salon=self.salon).exclude(
+            pending_count=0, confirmed_count=0, completed_count=0, cancelled_count=0,
+        ).order_by('date').values_list('date', *stats.STAT_FIELDS))
+        stats.rebuild_for_salons([self.salon.pk])
+        self.assertEqual(kept, list(SalonStats.objects.filter(salon=self.salon).order_by('date').values_list('date', *stats.STAT_FIELDS)))
+
+    def test_series_is_checked_and_written_with_one_query_each(self):
+        with CaptureQueriesContext(connection) as queries:
+            created, blocked = self.book_series(occurrences=series.MAX_OCCURRENCES)
+        # The stats rollups are one upsert per day; the bookings themselves
+        # are one clash check and one INSERT
+        booking_queries = [
+            query['sql'].split(' ', 1)[0] for query in queries
+            if 'FROM "booking_booking"' in query['sql'] or 'INTO "booking_booking"' in query['sql']
+        ]
+        self.assertEqual(booking_queries, ['SELECT', 'INSERT'])
+        self.assertEqual(blocked, {})
+        self.assertEqual(
+            list(created.bookings.order_by('date').values_list('date', flat=True)),
+            series.occurrence_dates(self.start, 1, series.MAX_OCCURRENCES),
+        )
+        self.assertEqual(
+            list(OutboxMessage.objects.filter(event='series_created').values_list('recipient', flat=True)),
+            ['customer@example.com'],
+        )
+        self.assertMatchesRecount()
+
+    def test_clash_in_the_middle_writes_nothing(self):
+        taken = self.start + timedelta(weeks=2)
+        Booking.objects.create(customer=self.customer, salon=self.salon, service=self.service, staff=self.asha, date=taken, time=time(10, 30))
+        outbox = OutboxMessage.objects.count()
+
+        created, blocked = self.book_series()
+        self.assertIsNone(created)
+        self.assertEqual(blocked, {taken: series.TAKEN})
+        self.assertFalse(BookingSeries.objects.exists())
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), outbox)
+        self.assertMatchesRecount()
+
+        created, blocked = self.book_series(at=time(17, 30))
+        self.assertIsNone(created)
+        self.assertEqual(set(blocked.values()), {series.CLOSED})
+
+    def test_cancel(self):
+        created, _ = self.book_series()
+        transition_bookings(self.salon, [created.bookings.earliest('date').pk], 'CONFIRMED')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(series.cancel_series(created), 4)
+        self.assertEqual(set(created.bookings.values_list('status', flat=True)), {'CANCELLED'})
+        self.assertEqual(series.cancel_series(created), 0)
+        self.assertMatchesRecount()
+        # The freed slots can be booked again
+        self.assertIsNotNone(self.book_series()[0])
+
+    def test_shift_moves_everything_or_nothing(self):
+        created, _ = self.book_series()
+        first = created.bookings.earliest('date')
+        transition_bookings(self.salon, [first.pk], 'CONFIRMED')
+        Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service, staff=self.asha,
+            date=self.start + timedelta(weeks=3, days=1), time=time(14),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved, blocked = series.shift_series(created, new_time=time(14), days=1)
+        self.assertEqual((moved, blocked), (0, {self.start + timedelta(weeks=3, days=1): series.TAKEN}))
+        self.assertEqual(set(created.bookings.values_list('time', flat=True)), {time(10)})
+
+        # Moving onto its own slots does not count as a clash
+        with self.captureOnCommitCallbacks(execute=True):
+            moved, blocked = series.shift_series(created, new_time=time(10, 30))
+        self.assertEqual((moved, blocked), (4, {}))
+        first.refresh_from_db()
+        self.assertEqual((first.date, first.time, first.end_time, first.status), (self.start, time(10, 30), time(11, 15), 'PENDING'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved, blocked = series.shift_series(created, days=-1)
+        self.assertEqual((moved, blocked), (4, {}))
+        created.refresh_from_db()
+        self.assertEqual((created.start_date, created.time), (self.start - timedelta(days=1), time(10, 30)))
+        self.assertEqual(
+            list(created.bookings.order_by('date').values_list('date', flat=True)),
+            series.occurrence_dates(self.start - timedelta(days=1), 1, 4),
+        )
+        self.assertMatchesRecount()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        cls.customer = User.objects.create_user(username='customer@example.com', email='customer@example.com', password='pass')
+        cls.salon, cls.service, cls.staff = make_salon(cls.owner)
+        old = date.today() - timedelta(days=400)
+        cls.old = [
+            cls.book(old + timedelta(days=n), cls.staff[n % 2], status)
+            for n, status in enumerate(['COMPLETED'] * 5 + ['CANCELLED'])
+        ]
+        cls.live = [
+            cls.book(old, cls.staff[0], 'PENDING', time(15)),
+            cls.book(date.today() - timedelta(days=2), cls.staff[0], 'COMPLETED'),
+        ]
+        cls.message = OutboxMessage.objects.create(
+            booking=cls.old[0], event='booking_confirmed', channel='email', recipient='customer@example.com', body='Confirmed',
+        )
+
+    @classmethod
+    def book(cls, day, staff, status, at=time(10)):
+        return Booking.objects.create(
+            customer=cls.customer, salon=cls.salon, service=cls.service, staff=staff, date=day, time=at, status=status,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_bookings', *args, stdout=out)
+        return out.getvalue()
+
+    def test_command_walks_the_primary_key_in_batches(self):
+        stats_before = list(SalonStats.objects.order_by('date').values_list('date', *stats.STAT_FIELDS))
+        ids = [booking.pk for booking in self.old]
+        with mock.patch.object(archive, 'archive_batch', wraps=archive.archive_batch) as archive_batch:
+            output = self.archive('--batch-size', '4')
+        self.assertEqual([c.kwargs['after_id'] for c in archive_batch.call_args_list], [0, ids[3], ids[5]])
+        self.assertIn(f'Archived 4 booking(s) up to id {ids[3]}', output)
+        self.assertIn(f'Archived 2 booking(s) up to id {ids[5]}', output)
+        self.assertIn('Archived 6 booking(s) from before', output)
+
+        self.assertEqual(sorted(ArchivedBooking.objects.values_list('pk', flat=True)), ids)
+        self.assertEqual(sorted(Booking.objects.values_list('pk', flat=True)), [b.pk for b in self.live])
+        archived = ArchivedBooking.objects.get(pk=ids[0])
+        self.assertEqual((archived.status, archived.staff_id, archived.time), ('COMPLETED', self.staff[0].pk, time(10)))
+        # The notification is kept, detached as after a normal delete
+        self.message.refresh_from_db()
+        self.assertIsNone(self.message.booking_id)
+        self.assertEqual(list(SalonStats.objects.order_by('date').values_list('date', *stats.STAT_FIELDS)), stats_before)
+
+        self.assertIn('Archived 0 booking(s)', self.archive())
+
+    def test_dry_run_and_bad_arguments(self):
+        self.assertIn('6 booking(s) from before', self.archive('--dry-run'))
+        self.assertEqual(Booking.objects.count(), 8)
+        self.assertFalse(ArchivedBooking.objects.exists())
+        with self.assertRaisesMessage(CommandError, '--older-than-days must be at least 1.'):
+            self.archive('--older-than-days', '0')
+        self.assertIn('0 booking(s)', self.archive('--dry-run', '--older-than-days', '500'))
+
+    def test_history_views_and_exports_read_the_archive(self):
+        self.archive()
+        old_ids = sorted(booking.pk for booking in self.old)
+
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('booking:my_bookings'), {'history': '1'})
+        self.assertTrue(all(isinstance(b, ArchivedBooking) for b in response.context['bookings']))
+        self.assertEqual(sorted(b.pk for b in response.context['bookings']), old_ids)
+        live = self.client.get(reverse('booking:my_bookings')).context['bookings']
+        self.assertEqual(sorted(b.pk for b in live), [b.pk for b in self.live])
+
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('booking:salon_appointments'), {'history': 'on'})
+        self.assertEqual(sorted(b.pk for b in response.context['appointments']), old_ids)
+        response = self.client.get(reverse('booking:salon_appointments'), {'history': 'on', 'status': 'CANCELLED'})
+        self.assertEqual([b.pk for b in response.context['appointments']], [self.old[5].pk])
+        response = self.client.get(reverse('booking:salon_appointments'))
+        self.assertEqual(sorted(b.pk for b in response.context['appointments']), [b.pk for b in self.live])
+
+        response = self.client.get(reverse('booking:export_appointments_csv'), {'history': 'on'})
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1 + len(self.old))
+        response = self.client.get(reverse('booking:appointments_calendar'), {
+            'history': 'on', 'date_from': self.old[0].date.isoformat(),
+        })
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('BEGIN:VEVENT'), len(self.old))
+        self.assertIn(f'UID:booking-{self.old[0].pk}@', content)
+
+
+class BulkStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        cls.customer = User.objects.create_user(username='customer@example.com', email='customer@example.com', password='pass')
+        cls.salon, cls.service, cls.staff = make_salon(cls.owner)
+        other_salon, other_service, _ = make_salon(User.objects.create_user(username='other@example.com', password='pass'))
+        cls.day = next_weekday(2)
+        cls.pending, cls.confirmed, cls.completed = [
+            Booking.objects.create(
+                customer=cls.customer, salon=cls.salon, service=cls.service, date=cls.day, time=time(hour), status=status,
+            )
+            for hour, status in ((9, 'PENDING'), (10, 'CONFIRMED'), (11, 'COMPLETED'))
+        ]
+        cls.elsewhere = Booking.objects.create(
+            customer=cls.customer, salon=other_salon, service=other_service, date=cls.day, time=time(9),
+        )
+        Booking.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+        self.url = reverse('booking:bulk_update_status')
+
+    def post_json(self, data):
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def day_counts(self):
+        return SalonStats.objects.filter(salon=self.salon, date=self.day).values_list(
+            'pending_count', 'confirmed_count', 'completed_count', 'cancelled_count',
+        ).get()
+
+    def test_json_reports_every_id(self):
+        ids = [self.pending.pk, self.confirmed.pk, self.completed.pk, self.elsewhere.pk, 999999]
+        received = []
+        bookings_transitioned.connect(lambda **kwargs: received.append(kwargs['changes']), weak=False, dispatch_uid='test')
+        self.addCleanup(bookings_transitioned.disconnect, dispatch_uid='test')
+
+        response = self.post_json({'ids': ids, 'status': 'CONFIRMED'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'status': 'CONFIRMED',
+            'updated': 1,
+            'results': {
+                str(self.pending.pk): {'result': 'updated', 'status': 'CONFIRMED'},
+                str(self.confirmed.pk): {'result': 'unchanged', 'status': 'CONFIRMED'},
+                str(self.completed.pk): {'result': 'invalid_transition', 'status': 'COMPLETED'},
+                # Another salon's booking is indistinguishable from a missing one
+                str(self.elsewhere.pk): {'result': 'not_found', 'status': None},
+                '999999': {'result': 'not_found', 'status': None},
+            },
+        })
+
+        self.assertEqual([[change[0] for change in changes] for changes in received], [[self.pending.pk]])
+        self.assertEqual(self.day_counts(), (0, 2, 1, 0))
+        recent = timezone.now() - timedelta(minutes=1)
+        self.assertEqual(
+            set(Booking.objects.filter(updated_at__gt=recent).values_list('pk', flat=True)), {self.pending.pk},
+        )
+        self.assertEqual(Booking.objects.get(pk=self.elsewhere.pk).status, 'PENDING')
+
+    def test_form_post_returns_to_next(self):
+        next_url = reverse('booking:salon_appointments') + '?status=PENDING'
+        response = self.client.post(self.url, {
+            'ids': [self.pending.pk, self.completed.pk], 'status': 'CANCELLED', 'next': next_url,
+        })
+        self.assertRedirects(response, next_url, fetch_redirect_response=False)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ['2 booking(s) marked cancelled.'],
+        )
+        self.assertEqual(self.day_counts(), (0, 1, 0, 2))
+
+        # Never off-site
+        response = self.client.post(self.url, {'ids': [self.confirmed.pk], 'status': 'COMPLETED', 'next': 'https://example.org/'})
+        self.assertRedirects(response, reverse('booking:salon_appointments'), fetch_redirect_response=False)
+
+    def test_rejected_requests_change_nothing(self):
+        too_many = list(range(1, MAX_BATCH + 2))
+        response = self.post_json({'ids': too_many, 'status': 'CONFIRMED'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['ids'], [f'Select at most {MAX_BATCH} bookings.'])
+        self.assertEqual(self.post_json({'ids': [self.pending.pk], 'status': 'PENDING'}).status_code, 400)
+        self.assertEqual(self.post_json({'ids': ['one'], 'status': 'CONFIRMED'}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.post_json([self.pending.pk]).status_code, 400)
+
+        response = self.client.post(self.url, {'ids': too_many, 'status': 'CONFIRMED'})
+        self.assertRedirects(response, reverse('booking:salon_appointments'), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ['Select at least one booking and a status.'],
+        )
+        self.assertEqual(self.day_counts(), (1, 1, 1, 0))
+        self.assertFalse(Booking.objects.filter(updated_at__gt=timezone.now() - timedelta(hours=1)).exists())
+
+
+class SeedAndBenchmarkCommandTests(TestCase):
+    """Smoke runs of the data and benchmark commands at toy sizes."""
+
+    def call(self, name, *args, **options):
+        out = StringIO()
+        call_command(name, *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_seed_data_then_benchmark_views(self):
+        output = self.call('seed_data', customers=20, salons=4, staff=2, bookings=400, days=5, seed=7, batch_size=100)
+        self.assertIn('Seeded 25 users, 4 salons', output)
+        self.assertEqual(Booking.objects.count(), 400)
+
+        # No stylist holds two overlapping bookings
+        held = {}
+        for staff_id, day, start, end in (
+            Booking.objects.holding_slot().filter(staff__isnull=False)
+            .values_list('staff_id', 'date', 'time', 'end_time')
+        ):
+            held.setdefault((staff_id, day), []).append((start, end))
+        self.assertTrue(held)
+        for spans in held.values():
+            spans.sort()
+            for (_, end), (start, _) in zip(spans, spans[1:]):
+                self.assertLessEqual(end, start)
+        self.assertTrue(Booking.objects.filter(staff__isnull=True).exists())
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output_path = f'{directory}/views.json'
+        self.call('benchmark_views', iterations=1, warmup=0, only='salon', output=output_path)
+        with open(output_path) as handle:
+            views = json.load(handle)['views']
+        self.assertIn('salon:public_salon_list', views)
+        self.assertTrue(all('skipped' in result or result['status'] < 500 for result in views.values()))
+
+
+class ConcurrentBenchmarkCommandTests(TransactionTestCase):
+    """The threaded benchmarks need committed data, as against a real database."""
+
+    def test_booking_race(self):
+        out = StringIO()
+        call_command('benchmark_booking_race', attempts=4, threads=4, stdout=out)
+        self.assertIn('succeeded:   1\n', out.getvalue())
+        self.assertIn('Exactly one booking won the slot.', out.getvalue())
+
+    def test_db_writes(self):
+        out = StringIO()
+        call_command('benchmark_db_writes', writers=2, readers=1, bookings=3, json=True, stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['profile'], settings.DB_PROFILE)
+
+
+class BookingRaceTests(TransactionTestCase):
+    """Parallel reserve() calls for one slot, each on its own connection."""
+    ATTEMPTS = 8
+
+    def test_only_one_parallel_booking_wins_the_slot(self):
+        owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        customers = [User.objects.create_user(username=f'c{i}@example.com', password='pass') for i in range(self.ATTEMPTS)]
+        salon, service, staff = make_salon(owner)
+        day = date.today() + timedelta(days=1)
+        gate = threading.Barrier(self.ATTEMPTS)
+
+        def attempt(customer):
+            try:
+                gate.wait()
+                booking = Booking(customer=customer, salon=salon, service=service, staff=staff[0], date=day, time=time(10))
+                return booking.reserve()
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.ATTEMPTS) as pool:
+            results = list(pool.map(attempt, customers))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Booking.objects.filter(staff=staff[0], date=day).count(), 1)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        cls.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com', password='pass',
+            first_name='=cmd|', last_name='-2+3',
+        )
+        cls.salon, cls.service, cls.staff = make_salon(cls.owner)
+        cls.booking = Booking.objects.create(
+            customer=cls.customer, salon=cls.salon, service=cls.service, staff=cls.staff[0],
+            date=date.today() + timedelta(days=1), time=time(10),
+            notes='@SUM(A1) please, and ' + 'नमस्ते ' * 20,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_url(self, token=None):
+        return reverse('booking:calendar_feed', args=[token or exports.feed_token(self.salon.pk)])
+
+    def test_csv_escapes_formulas(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('booking:export_appointments_csv'))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(",'=cmd|,'-2+3,", content)
+        self.assertIn('"\'@SUM(A1) please, and', content)
+
+    def test_ics_lines_are_folded_at_75_octets(self):
+        content = b''.join(self.client.get(self.feed_url()).streaming_content).decode()
+        lines = content.split('\r\n')
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertGreater(sum(line.startswith(' ') for line in lines), 2)
+        unfolded = content.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Staff: Asha\\nNotes: @SUM(A1) please\\, and ' + 'नमस्ते ' * 19, unfolded)
+
+    def test_tampered_invalid_and_revoked_tokens_are_rejected(self):
+        token = exports.feed_token(self.salon.pk)
+        self.assertEqual(self.client.get(self.feed_url(token)).status_code, 200)
+        self.assertEqual(self.client.get(self.feed_url(token[:-2] + 'xx')).status_code, 404)
+        self.assertEqual(self.client.get(self.feed_url('not-a-token')).status_code, 404)
+        other = signing.dumps({'salon': self.salon.pk, 'staff': None, 'v': 1}, salt='another.salt', compress=True)
+        self.assertEqual(self.client.get(self.feed_url(other)).status_code, 404)
+
+        self.client.force_login(self.owner)
+        self.client.post(reverse('booking:reset_calendar_feed'))
+        self.assertEqual(self.client.get(self.feed_url(token)).status_code, 404)
+        self.assertEqual(self.client.get(self.feed_url()).status_code, 200)
+
+    def test_salon_edit_does_not_undo_a_feed_reset(self):
+        token = exports.feed_token(self.salon.pk)
+        # Loaded before the reset, saved after it, as by a concurrent edit
+        salon = Salon.objects.get(pk=self.salon.pk)
+        exports.rotate_feed_links(self.salon.pk)
+        catalog_cache.invalidate_salon(self.salon.pk)
+        salon.description = 'Hair and nails'
+        salon.save()
+
+        saved = Salon.objects.get(pk=self.salon.pk)
+        self.assertEqual(saved.description, 'Hair and nails')
+        self.assertEqual(saved.calendar_feed_version, salon.calendar_feed_version + 1)
+        self.assertEqual(saved.catalog_version, salon.catalog_version + 1)
+        self.assertEqual(self.client.get(self.feed_url(token)).status_code, 404)
+
+    def test_feed_answers_304_until_its_bookings_change(self):
+        def etag_status(etag):
+            return self.client.get(self.feed_url(), headers={'if_none_match': etag}).status_code
+
+        etag = self.client.get(self.feed_url())['ETag']
+        self.assertFalse(self.client.get(self.feed_url()).has_header('Last-Modified'))
+        self.assertEqual(etag_status(etag), 304)
+        Booking.objects.filter(pk=self.booking.pk).update(status='CONFIRMED', updated_at=timezone.now())
+        self.assertEqual(etag_status(etag), 200)
+
+        # A booking leaving the feed, however old its timestamp
+        old = Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service, staff=self.staff[1],
+            date=self.booking.date, time=time(14),
+        )
+        Booking.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=30))
+        etag = self.client.get(self.feed_url())['ETag']
+        Booking.objects.filter(pk=old.pk).delete()
+        self.assertEqual(etag_status(etag), 200)
+
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class FailingBackend:
+    def send(self, message):
+        raise ConnectionError("gateway down")
+
+
+# Django's test runner swaps EMAIL_BACKEND for the in-memory backend, which
+# stands in for the SMTP server here
+@override_settings(NOTIFICATION_BACKENDS={
+    'email': 'booking.notifications.EmailBackend',
+    'sms': 'booking.tests.FailingBackend',
+})
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com',
+            password='pass', user_type='salon_owner', phone_number='9800000001',
+        )
+        cls.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com',
+            password='pass', phone_number='9811111111',
+        )
+        cls.salon = Salon.objects.create(
+            owner=cls.owner, name='Glow', description='Hair', location='Kathmandu',
+            contact_number='01-0000000', opening_time=time(9), closing_time=time(18), is_approved=True,
+        )
+        category = ServiceCategory.objects.create(salon=cls.salon, name='Hair')
+        cls.service = Service.objects.create(salon=cls.salon, category=category, name='Cut', price=500, duration=30)
+
+    def book(self):
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service,
+            date=date.today() + timedelta(days=1), time=time(10),
+        )
+
+    def drain(self):
+        call_command('process_outbox', once=True, stdout=StringIO())
+
+    def test_booking_writes_outbox_rows_in_its_transaction(self):
+        booking = self.book()
+        self.assertEqual(
+            sorted(booking.outbox_messages.values_list('channel', 'recipient')),
+            [('email', 'customer@example.com'), ('email', 'owner@example.com'), ('sms', '9811111111')],
+        )
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.book()
+            raise RuntimeError("roll back")
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+    def test_worker_delivers_email_and_retries_with_backoff(self):
+        self.book()
+        self.drain()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['customer@example.com', 'owner@example.com'])
+        self.assertEqual(OutboxMessage.objects.filter(status='SENT').count(), 2)
+        sms = OutboxMessage.objects.get(channel='sms')
+        self.assertEqual((sms.status, sms.attempts), ('PENDING', 1))
+        self.assertIn('gateway down', sms.last_error)
+        self.assertGreater(sms.available_at, timezone.now())
+
+    def test_worker_gives_up_after_max_attempts(self):
+        self.book()
+        with self.assertLogs('booking.notifications', 'ERROR'):
+            for _ in range(3):
+                OutboxMessage.objects.filter(status='PENDING').update(available_at=timezone.now())
+                call_command('process_outbox', once=True, max_attempts=3, stdout=StringIO())
+        sms = OutboxMessage.objects.get(channel='sms')
+        self.assertEqual((sms.status, sms.attempts), ('FAILED', 3))
+
+    def test_bulk_transition_queues_one_batch(self):
+        bookings = [self.book() for _ in range(3)]
+        OutboxMessage.objects.all().delete()
+        transition_bookings(self.salon, [b.pk for b in bookings], 'CONFIRMED')
+        self.assertEqual(OutboxMessage.objects.filter(event='confirmed').count(), 6)
+
+
+class FlakySMTPHandler:
+    """Turns the first `failures` messages away with a temporary error."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.received = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures:
+            self.failures -= 1
+            return '451 4.3.0 Try again later'
+        self.received.append((envelope.rcpt_tos, envelope.content.decode()))
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@skipUnless(Controller is not None, "aiosmtpd is not installed")
+class SMTPDeliveryTests(TestCase):
+    """The outbox worker against a real SMTP server on localhost."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        # Email only: no phone number, and the salon owner has no address
+        cls.customer = User.objects.create_user(username='customer@example.com', email='customer@example.com', password='pass')
+        cls.salon, cls.service, _ = make_salon(owner)
+
+    def smtp_settings(self, port):
+        return override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=port, EMAIL_TIMEOUT=1,
+            NOTIFICATION_BACKENDS={'email': 'booking.notifications.EmailBackend'},
+        )
+
+    def drain(self):
+        call_command('process_outbox', once=True, stdout=StringIO())
+
+    def book(self):
+        Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service,
+            date=date.today() + timedelta(days=1), time=time(10),
+        )
+        return OutboxMessage.objects.get()
+
+    def test_temporary_rejection_is_retried_after_backoff(self):
+        handler = FlakySMTPHandler(failures=1)
+        controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+        controller.start()
+        self.addCleanup(controller.stop)
+        message = self.book()
+
+        with self.smtp_settings(controller.port):
+            self.drain()
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+            self.assertIn('451', message.last_error)
+            self.assertGreater(message.available_at, timezone.now() + timedelta(seconds=20))
+
+            # Not due yet: the worker leaves it alone
+            self.drain()
+            self.assertEqual(handler.received, [])
+
+            OutboxMessage.objects.update(available_at=timezone.now())
+            self.drain()
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('SENT', 2, ''))
+        [(recipients, content)] = handler.received
+        self.assertEqual(recipients, ['customer@example.com'])
+        self.assertIn('Subject: Booking request received - Glow', content)
+
+    def test_stalled_server_times_out_and_is_retried(self):
+        # Accepts connections but never sends its greeting
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen()
+            message = self.book()
+            with self.smtp_settings(listener.getsockname()[1]):
+                self.drain()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+        self.assertIn('timed out', message.last_error)
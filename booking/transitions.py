@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Booking
+
+# Statuses a booking may be moved out of, per target status
+ALLOWED_SOURCES = {
+    'CONFIRMED': ('PENDING',),
+    'COMPLETED': ('CONFIRMED',),
+    'CANCELLED': ('PENDING', 'CONFIRMED', 'COMPLETED'),
+}
+MAX_BATCH = 500
+
+# Sent once per batch, inside the transaction, with `salon_id` and
+# `changes`: a list of (booking_id, old_state, new_state) where the states are
+# Booking.stats_state() tuples, and `notify`, False when the caller sends its
+# own notification. Bulk UPDATEs bypass post_save, so anything that reacts to
+# status changes listens here as well.
+bookings_transitioned = Signal()
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid_transition'
+
+
+class TransitionError(ValueError):
+    pass
+
+
+def transition_bookings(salon, booking_ids, status, notify=True):
+    """
+    Move the given bookings of `salon` to `status` with one conditional
+    UPDATE. Returns {booking_id: (result, current_status)} where result is
+    one of UPDATED, UNCHANGED, NOT_FOUND or INVALID. With notify=False no
+    per-booking notifications are queued.
+    """
+    status = status.upper()
+    if status not in ALLOWED_SOURCES:
+        raise TransitionError(f"Unknown target status '{status}'.")
+    booking_ids = list(dict.fromkeys(int(pk) for pk in booking_ids))
+    if len(booking_ids) > MAX_BATCH:
+        raise TransitionError(f"At most {MAX_BATCH} bookings can be updated at once.")
+    sources = ALLOWED_SOURCES[status]
+
+    results = {pk: (NOT_FOUND, None) for pk in booking_ids}
+    with transaction.atomic():
+        # Lock the rows so the states read here are the ones the UPDATE
+        # changes (row locks on PostgreSQL/MySQL, the IMMEDIATE write lock on
+        # SQLite)
+        rows = list(
+            Booking.objects.select_for_update()
+            .filter(salon=salon, pk__in=booking_ids)
+            .values_list('pk', 'salon_id', 'date', 'status', 'service_id')
+        )
+        movable = []
+        for pk, salon_id, day, current, service_id in rows:
+            if current == status:
+                results[pk] = (UNCHANGED, current)
+            elif current in sources:
+                movable.append((pk, (salon_id, day, current, service_id)))
+            else:
+                results[pk] = (INVALID, current)
+
+        if movable:
+            # auto_now only applies to save(), so set updated_at explicitly
+            updated = Booking.objects.filter(
+                pk__in=[pk for pk, _ in movable], status__in=sources,
+            ).update(status=status, updated_at=timezone.now())
+            if updated != len(movable):
+                raise TransitionError("Bookings changed while being updated; please retry.")
+            changes = []
+            for pk, old_state in movable:
+                results[pk] = (UPDATED, status)
+                changes.append((pk, old_state, old_state[:2] + (status,) + old_state[3:]))
+            bookings_transitioned.send(sender=Booking, salon_id=salon.pk, changes=changes, notify=notify)
+    return results
@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Async variant when serving over ASGI (SERVER_INTERFACE)
+availability_view = views.AsyncAvailabilityView if settings.ASYNC_VIEWS else views.AvailabilityView
+
 app_name = 'booking'
 
 urlpatterns = [
     path('book/<int:salon_id>/', views.BookServiceView.as_view(), name='book_service'),
+    path('availability/<int:salon_id>/', availability_view.as_view(), name='availability'),
     path('my-bookings/', views.MyBookingsView.as_view(), name='my_bookings'),
+    path('my-bookings/series/<int:pk>/cancel/', views.CancelSeriesView.as_view(), name='cancel_series'),
+    path('my-bookings/series/<int:pk>/move/', views.ShiftSeriesView.as_view(), name='shift_series'),
     path('salon/appointments/', views.SalonAppointmentsView.as_view(), name='salon_appointments'),
+    path('salon/appointments/bulk-status/', views.BulkUpdateBookingStatusView.as_view(), name='bulk_update_status'),
     path('salon/appointments/<int:pk>/update/<str:status>/', views.UpdateBookingStatusView.as_view(), name='update_status'),
+    path('salon/appointments/export.csv', views.ExportAppointmentsCSVView.as_view(), name='export_appointments_csv'),
+    path('salon/appointments/calendar.ics', views.AppointmentsCalendarView.as_view(), name='appointments_calendar'),
+    path('salon/appointments/calendar-feed/reset/', views.ResetCalendarFeedView.as_view(), name='reset_calendar_feed'),
+    path('calendar/<str:token>.ics', views.CalendarFeedView.as_view(), name='calendar_feed'),
 ]
@@ -1,13 +1,28 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import json
+from datetime import date
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.views.generic import ListView, CreateView, UpdateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
-from .models import Booking
-from .forms import BookingForm
+from django.db.models import Count, Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import Booking, BookingSeries
+from .forms import BookingForm, AppointmentFilterForm, BulkStatusForm, SeriesShiftForm
+from .pagination import KeysetPage
+from .transitions import INVALID, UNCHANGED, UPDATED, TransitionError, transition_bookings
+from . import archive, availability, exports, series as booking_series
 from salon.models import Salon, Service
 from django.utils import timezone
 
+def owner_salon(request):
+    # The signed-in owner's cached salon, set by SalonContextMiddleware
+    if not request.salon:
+        raise Http404("No salon is registered for this account.")
+    return request.salon
+
 class BookServiceView(LoginRequiredMixin, CreateView):
     model = Booking
     form_class = BookingForm
@@ -35,8 +50,29 @@ class BookServiceView(LoginRequiredMixin, CreateView):
         salon_id = self.kwargs.get('salon_id')
         form.instance.customer = self.request.user
         form.instance.salon = get_object_or_404(Salon, pk=salon_id)
+        if form.cleaned_data.get('repeat'):
+            return self._book_series(form)
+        if not form.instance.reserve():
+            form.add_error('time', "That time is no longer available with this stylist. Please pick another slot.")
+            return self.form_invalid(form)
+        self.object = form.instance
         messages.success(self.request, "Booking requested! Please wait for confirmation.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
+
+    def _book_series(self, form):
+        booking = form.instance
+        series, blocked = booking_series.book_series(
+            booking.customer, booking.salon, booking.service, booking.staff, booking.date, booking.time,
+            form.cleaned_data['repeat'], form.cleaned_data['occurrences'], notes=booking.notes,
+        )
+        if series is None:
+            # Nothing is booked unless every date is free
+            form.add_error('date', "Not all of those dates are available: " + "; ".join(
+                f"{day:%b %d} ({booking_series.REASON_TEXT[reason]})" for day, reason in sorted(blocked.items())
+            ) + ". Please pick another time or stylist.")
+            return self.form_invalid(form)
+        messages.success(self.request, f"{series.occurrences} recurring appointment(s) requested! Please wait for confirmation.")
+        return redirect(self.get_success_url())
 
 class MyBookingsView(LoginRequiredMixin, ListView):
     model = Booking
@@ -44,25 +80,289 @@ class MyBookingsView(LoginRequiredMixin, ListView):
     context_object_name = 'bookings'
 
     def get_queryset(self):
-        return Booking.objects.filter(customer=self.request.user).order_by('-created_at')
+        # ?history=1 lists the archived (older finished) bookings instead
+        self.history = self.request.GET.get('history') == '1'
+        return (
+            archive.bookings(archived=self.history).filter(customer=self.request.user)
+            .select_related('salon', 'service', 'staff').order_by('-created_at')
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['history'] = self.history
+        context['series_list'] = (
+            BookingSeries.objects.filter(customer=self.request.user)
+            .select_related('salon', 'service', 'staff')
+            .annotate(upcoming_count=Count('bookings', filter=Q(
+                bookings__date__gte=timezone.localdate(),
+                bookings__status__in=booking_series.ACTIVE_STATUSES,
+            )))
+            .order_by('-created_at')
+        )
+        context['shift_form'] = SeriesShiftForm()
+        return context
+
+class CancelSeriesView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        series = get_object_or_404(BookingSeries, pk=pk, customer=request.user)
+        cancelled = booking_series.cancel_series(series)
+        messages.success(request, f"{cancelled} upcoming appointment(s) cancelled.")
+        return redirect('booking:my_bookings')
+
+# Move every upcoming appointment of a series to a new time and/or a few days
+# earlier or later; nothing moves unless all of them can
+class ShiftSeriesView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        series = get_object_or_404(BookingSeries.objects.select_related('salon', 'service', 'staff'), pk=pk, customer=request.user)
+        form = SeriesShiftForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, next(iter(form.errors.values()))[0])
+            return redirect('booking:my_bookings')
+        moved, blocked = booking_series.shift_series(
+            series, new_time=form.cleaned_data.get('time'), days=form.cleaned_data.get('days') or 0,
+        )
+        if blocked:
+            messages.error(request, "Nothing was moved. " + "; ".join(
+                f"{day:%b %d}: {booking_series.REASON_TEXT[reason]}" for day, reason in sorted(blocked.items())
+            ) + ".")
+        else:
+            messages.success(request, f"{moved} upcoming appointment(s) moved; the salon will confirm them again.")
+        return redirect('booking:my_bookings')
 
 class SalonAppointmentsView(LoginRequiredMixin, ListView):
     model = Booking
     template_name = 'booking/salon_bookings.html'
     context_object_name = 'appointments'
+    page_size = 25
+    # Keyset pagination on the (salon, date, time) index, newest first
+    keyset_fields = ('date', 'time', 'id')
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
-        return Booking.objects.filter(salon=salon).order_by('-date', '-time')
+        self.salon = owner_salon(self.request)
+        self.filter_form = AppointmentFilterForm(self.request.GET, salon=self.salon)
+        queryset = (
+            archive.bookings(archived=self.filter_form.wants_history()).filter(salon=self.salon)
+            .select_related('customer', 'service', 'staff')
+            .only(
+                'id', 'date', 'time', 'status',
+                'customer__first_name', 'customer__last_name', 'customer__email',
+                'service__name', 'staff__name',
+            )
+        )
+        if self.filter_form.is_valid():
+            queryset = self.filter_form.filter_queryset(queryset)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        page = KeysetPage(
+            self.object_list, self.keyset_fields, self.page_size,
+            after=self.request.GET.get('after'), before=self.request.GET.get('before'),
+        )
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context['page'] = page
+        context['filter_form'] = self.filter_form
+        context['history'] = self.filter_form.wants_history()
+        context['next_query'] = self._page_query('after', page.next_cursor)
+        context['previous_query'] = self._page_query('before', page.previous_cursor)
+        context['bulk_form'] = BulkStatusForm()
+        context['export_query'] = self._page_query(None, None)
+        staff = self.filter_form.cleaned_data.get('staff') if self.filter_form.is_valid() else None
+        context['calendar_feed_url'] = self.request.build_absolute_uri(
+            reverse('booking:calendar_feed', args=[exports.feed_token(self.salon.pk, staff.pk if staff else None)])
+        )
+        return context
+
+    def _page_query(self, direction, cursor):
+        # Without a direction: the current filters alone, for the export links
+        if direction and cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query.pop('after', None)
+        query.pop('before', None)
+        if direction:
+            query[direction] = cursor
+        return query.urlencode()
 
 class UpdateBookingStatusView(LoginRequiredMixin, View):
     def post(self, request, pk, status):
-        salon = get_object_or_404(Salon, owner=request.user)
-        booking = get_object_or_404(Booking, pk=pk, salon=salon)
-        
-        if status.upper() in ['CONFIRMED', 'COMPLETED', 'CANCELLED']:
-            booking.status = status.upper()
-            booking.save()
+        salon = owner_salon(request)
+        try:
+            result, current = transition_bookings(salon, [pk], status)[pk]
+        except TransitionError:
+            return redirect('booking:salon_appointments')
+
+        if result == UPDATED:
             messages.success(request, f"Booking status updated to {status.capitalize()}.")
-        
+        elif result == INVALID:
+            messages.error(request, f"A {current.lower()} booking cannot be marked {status.lower()}.")
+        elif result != UNCHANGED:
+            raise Http404("No such booking.")
         return redirect('booking:salon_appointments')
+
+# Change the status of many appointments at once. Accepts a form post
+# (ids=1&ids=2&status=CONFIRMED) or a JSON body {"ids": [...], "status": ...};
+# JSON callers get the outcome for every id.
+class BulkUpdateBookingStatusView(LoginRequiredMixin, View):
+    def post(self, request):
+        salon = owner_salon(request)
+        wants_json = request.content_type == 'application/json'
+        if wants_json:
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+            if not isinstance(data, dict):
+                return JsonResponse({'error': 'Expected a JSON object.'}, status=400)
+        else:
+            data = request.POST
+
+        form = BulkStatusForm(data)
+        if not form.is_valid():
+            if wants_json:
+                return JsonResponse({'errors': form.errors}, status=400)
+            messages.error(request, "Select at least one booking and a status.")
+            return self._redirect(request)
+
+        status = form.cleaned_data['status']
+        results = transition_bookings(salon, form.cleaned_data['ids'], status)
+        updated = sum(1 for result, _ in results.values() if result == UPDATED)
+
+        if wants_json:
+            return JsonResponse({
+                'status': status,
+                'updated': updated,
+                'results': {str(pk): {'result': result, 'status': current} for pk, (result, current) in results.items()},
+            })
+        skipped = len(results) - updated
+        messages.success(request, f"{updated} booking(s) marked {status.lower()}.")
+        if skipped:
+            messages.warning(request, f"{skipped} booking(s) were skipped because they could not move to {status.lower()}.")
+        return self._redirect(request)
+
+    def _redirect(self, request):
+        # Return to the same filtered page the owner submitted from
+        next_url = request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            return redirect(next_url)
+        return redirect('booking:salon_appointments')
+
+def _filtered_appointments(request, salon):
+    filter_form = AppointmentFilterForm(request.GET, salon=salon)
+    queryset = archive.bookings(archived=filter_form.wants_history()).filter(salon=salon)
+    if filter_form.is_valid():
+        queryset = filter_form.filter_queryset(queryset)
+    return queryset, filter_form
+
+def _calendar_response(request, queryset, name, filename):
+    # Calendar apps poll feeds; answer 304 while the bookings in it are the
+    # same. No Last-Modified: it could not move when a booking leaves the feed
+    etag = exports.feed_etag(queryset, name)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = StreamingHttpResponse(
+        exports.ics_lines(queryset, name, request.get_host()), content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-cache'
+    response['ETag'] = etag
+    return response
+
+# The owner's appointments (same filters as the list) streamed as CSV
+class ExportAppointmentsCSVView(LoginRequiredMixin, View):
+    def get(self, request):
+        salon = owner_salon(request)
+        queryset, _ = _filtered_appointments(request, salon)
+        response = StreamingHttpResponse(exports.csv_rows(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="appointments-{timezone.localdate():%Y%m%d}.csv"'
+        return response
+
+# The owner's appointments as an .ics download
+class AppointmentsCalendarView(LoginRequiredMixin, View):
+    def get(self, request):
+        salon = owner_salon(request)
+        queryset, filter_form = _filtered_appointments(request, salon)
+        if not (filter_form.is_valid() and filter_form.cleaned_data.get('date_from')):
+            queryset = queryset.filter(date__gte=exports.default_feed_start())
+        return _calendar_response(request, queryset, f'{salon.name} appointments', 'appointments.ics')
+
+# Revoke every calendar feed link handed out so far, e.g. after one leaked
+class ResetCalendarFeedView(LoginRequiredMixin, View):
+    def post(self, request):
+        salon = owner_salon(request)
+        exports.rotate_feed_links(salon.pk)
+        messages.success(request, "Calendar feed links were reset. Subscribe again with the new link.")
+        return redirect('booking:salon_appointments')
+
+# Subscribable feed for calendar apps, which cannot log in: the signed token
+# in the URL names the salon and optionally one stylist
+class CalendarFeedView(View):
+    def get(self, request, token):
+        scope = exports.read_feed_token(token)
+        if scope is None:
+            raise Http404("Unknown calendar feed.")
+        salon_id, staff_id, version = scope
+        # A link from before the owner last reset them is revoked
+        salon = get_object_or_404(Salon.objects.only('id', 'name'), pk=salon_id, calendar_feed_version=version)
+        queryset = Booking.objects.filter(salon=salon, date__gte=exports.default_feed_start())
+        name = f'{salon.name} appointments'
+        if staff_id:
+            queryset = queryset.filter(staff_id=staff_id)
+            name = f"{salon.name} - {salon.staff.filter(pk=staff_id).values_list('name', flat=True).first() or 'staff'}"
+        return _calendar_response(request, queryset, name, 'calendar.ics')
+
+# Public JSON endpoint used by the booking page to show free start times
+class AvailabilityView(View):
+    def get(self, request, salon_id):
+        salon = get_object_or_404(Salon, pk=salon_id, is_approved=True, is_active=True)
+        params = self.parse(request)
+        if isinstance(params, JsonResponse):
+            return params
+        service_id, start_date, num_days, staff_id = params
+        try:
+            service = Service.objects.only('id', 'duration').get(pk=service_id, salon=salon, is_active=True)
+        except Service.DoesNotExist:
+            return self.unknown_service()
+        schedule = availability.available_slots(salon, service, start_date, num_days, staff_id=staff_id)
+        return self.respond(salon, service, schedule)
+
+    def parse(self, request):
+        # (service_id, start_date, num_days, staff_id), or the 400/404 to send
+        service_id = request.GET.get('service')
+        if not service_id:
+            return JsonResponse({'error': "The 'service' parameter is required."}, status=400)
+        if not service_id.isdigit():
+            return self.unknown_service()
+        try:
+            start_date = date.fromisoformat(request.GET['date']) if request.GET.get('date') else timezone.localdate()
+            num_days = int(request.GET.get('days', 1))
+            staff_id = int(request.GET['staff']) if request.GET.get('staff') else None
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date, days or staff parameter.'}, status=400)
+        return int(service_id), start_date, num_days, staff_id
+
+    def unknown_service(self):
+        return JsonResponse({'error': 'Unknown service.'}, status=404)
+
+    def respond(self, salon, service, schedule):
+        return JsonResponse({
+            'salon': salon.pk,
+            'service': service.pk,
+            'slot_minutes': availability.SLOT_MINUTES,
+            'days': schedule,
+        })
+
+# AvailabilityView for ASGI, with its lookups through the async ORM
+class AsyncAvailabilityView(AvailabilityView):
+    async def get(self, request, salon_id):
+        salon = await aget_object_or_404(Salon, pk=salon_id, is_approved=True, is_active=True)
+        params = self.parse(request)
+        if isinstance(params, JsonResponse):
+            return params
+        service_id, start_date, num_days, staff_id = params
+        try:
+            service = await Service.objects.only('id', 'duration').aget(pk=service_id, salon=salon, is_active=True)
+        except Service.DoesNotExist:
+            return self.unknown_service()
+        schedule = await availability.aavailable_slots(salon, service, start_date, num_days, staff_id=staff_id)
+        return self.respond(salon, service, schedule)
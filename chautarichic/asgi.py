@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chautarichic.settings')
+# Serve the async variants of the public views (see SERVER_INTERFACE)
+os.environ.setdefault('DJANGO_SERVER', 'asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,142 @@
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('chautarichic.requests')
+
+# Timings of the request being handled on this thread/task; None outside
+# ServerTimingMiddleware, which leaves template rendering untimed
+_current = ContextVar('request_timings', default=None)
+_NUMBERS = re.compile(r'\b\d+\b')
+
+
+def current_timings():
+    return _current.get()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+        self.view = 0.0
+        self.view_started = None
+        # db and template time spent before the view ran
+        self.view_offset = (0.0, 0.0)
+        self.view_name = ''
+        # SQL text (with literals folded) -> [count, seconds]
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db += elapsed
+            entry = self.statements[_NUMBERS.sub('?', sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    @contextmanager
+    def timing_template(self):
+        # Only the outermost render is timed; one rendered from inside
+        # another (render_to_string in a template tag) is part of it
+        self.template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.template_depth -= 1
+            if not self.template_depth:
+                self.template += time.perf_counter() - started
+
+    def top_statements(self, limit):
+        repeated = sorted(self.statements.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [
+            {'sql': sql[:500], 'count': count, 'ms': round(seconds * 1000, 2)}
+            for sql, (count, seconds) in repeated[:limit]
+        ]
+
+
+class ServerTimingMiddleware:
+    """
+    Opt-in (SERVER_TIMING = True) per-request instrumentation. Adds a
+    Server-Timing header with total, view, SQL and template time plus the
+    query count, and logs requests slower than SLOW_REQUEST_THRESHOLD_MS as
+    JSON together with their most repeated SQL statements. The view phase
+    is the view's own code: its SQL and templates are reported apart from
+    it. Templates are timed by chautarichic.template_backends.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500) / 1000
+        self.top_sql = getattr(settings, 'SLOW_REQUEST_TOP_SQL', 5)
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        wrappers = [connection.execute_wrapper(timings) for connection in connections.all()]
+        try:
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _current.reset(token)
+        total = time.perf_counter() - started
+        if timings.view_started is not None:
+            db_before, template_before = timings.view_offset
+            timings.view = max(0.0, (
+                time.perf_counter() - timings.view_started
+                - (timings.db - db_before) - (timings.template - template_before)
+            ))
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'view;dur={timings.view * 1000:.1f}',
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template * 1000:.1f}',
+        ])
+        if total >= self.threshold:
+            self.log_slow_request(request, response, timings, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+            timings.view_offset = (timings.db, timings.template)
+            # Class-based views are named by their class, not the as_view() closure
+            view = getattr(view_func, 'view_class', view_func)
+            timings.view_name = f'{view.__module__}.{view.__qualname__}'
+
+    def log_slow_request(self, request, response, timings, total):
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'view': timings.view_name,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'view_ms': round(timings.view * 1000, 1),
+            'db_ms': round(timings.db * 1000, 1),
+            'template_ms': round(timings.template * 1000, 1),
+            'queries': timings.queries,
+            'top_sql': timings.top_statements(self.top_sql),
+        }))
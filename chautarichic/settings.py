@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,19 +48,34 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Collected static files, answered before sessions, auth and the rest
+    'chautarichic.static_assets.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'salon.request_context.SalonContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request instrumentation: DJANGO_SERVER_TIMING=1 adds a Server-Timing header
+# (total, view, SQL and template time) to every response and logs requests
+# slower than SLOW_REQUEST_THRESHOLD_MS with their most repeated SQL.
+SERVER_TIMING = os.environ.get('DJANGO_SERVER_TIMING', '') == '1'
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '500'))
+SLOW_REQUEST_TOP_SQL = 5
+
+if SERVER_TIMING:
+    # Outermost, so the timings cover the other middleware too
+    MIDDLEWARE.insert(0, 'chautarichic.middleware.ServerTimingMiddleware')
+
 ROOT_URLCONF = 'chautarichic.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request when SERVER_TIMING is on
+        'BACKEND': 'chautarichic.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'frontend'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,18 +89,141 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'chautarichic.wsgi.application'
+ASGI_APPLICATION = 'chautarichic.asgi.application'
+
+# Serving interface: 'wsgi' (threaded sync views) or 'asgi'. chautarichic.asgi
+# defaults it to 'asgi', which routes the public salon pages and the
+# availability endpoint to their async views; `manage.py serve` runs either
+# under uvicorn and `manage.py benchmark_servers` compares the two.
+SERVER_INTERFACE = os.environ.get('DJANGO_SERVER', 'wsgi')
+ASYNC_VIEWS = SERVER_INTERFACE == 'asgi'
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_PROFILE picks the database setup:
+#   sqlite         (default) WAL journal, tuned pragmas, persistent connections
+#   sqlite-legacy  the original rollback-journal setup, kept for benchmarking
+#   postgres       PostgreSQL from POSTGRES_* variables; DJANGO_DB_POOL=1 uses
+#                  psycopg 3's connection pool (pip install "psycopg[pool]")
+# `manage.py benchmark_db_writes --compare sqlite-legacy sqlite` measures them.
+
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'sqlite')
+DB_PROFILES = ('sqlite', 'sqlite-legacy', 'postgres')
+if DB_PROFILE not in DB_PROFILES:
+    raise ImproperlyConfigured(
+        f"DJANGO_DB_PROFILE must be one of {', '.join(DB_PROFILES)}; got {DB_PROFILE!r}."
+    )
+# Seconds a connection is reused across requests; checked before reuse
+DB_CONN_MAX_AGE = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '300'))
+
+SQLITE_PRAGMAS = [
+    # Readers no longer block the writer, and commits only append to the WAL
+    'PRAGMA journal_mode=WAL',
+    # Safe with WAL: a power loss can drop the last commits, never corrupt
+    'PRAGMA synchronous=NORMAL',
+    # Wait for the write lock instead of failing with "database is locked"
+    f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+    # 64 MB page cache (negative is KiB) and 256 MB memory-mapped reads
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+]
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'chautarichic'),
+            'USER': os.environ.get('POSTGRES_USER', 'chautarichic'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.environ.get('DJANGO_DB_POOL') == '1':
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN', '2')),
+            'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX', '10')),
+            'timeout': 10,
+        }
+        # The pool owns connection reuse; Django requires persistent connections off
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts so booking
+                # conflict checks and inserts are serialized
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # A file rather than the shared in-memory database, whose
+            # connections fail at once on a held lock instead of waiting,
+            # so the booking race tests see the locking production has
+            'TEST': {'NAME': os.environ.get('DJANGO_TEST_DB_NAME', str(BASE_DIR / 'test_db.sqlite3'))},
+        }
+    }
+    if DB_PROFILE == 'sqlite-legacy':
+        # journal_mode is stored in the database file, so switch it back explicitly
+        DATABASES['default']['OPTIONS']['init_command'] = 'PRAGMA journal_mode=DELETE'
+    else:
+        DATABASES['default']['OPTIONS']['init_command'] = '; '.join(SQLITE_PRAGMAS)
+        DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+if ASYNC_VIEWS and 'pool' not in DATABASES['default']['OPTIONS']:
+    # Each ASGI request runs its queries on a thread of its own, so a
+    # persistent connection would never be picked up again
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+
+# Cache
+# Local memory by default. Set DJANGO_CACHE_BACKEND=file or =db so several
+# worker processes share cached pages (run `manage.py createcachetable` for db).
+
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'django_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chautarichic',
+        }
+    }
+
+# How long a reverse proxy may serve an anonymous visitor's copy of the public
+# salon list and salon pages before revalidating it (a cheap 304 while the
+# catalog is unchanged). Browsers always revalidate.
+PUBLIC_PAGE_CACHE_SECONDS = int(os.environ.get('PUBLIC_PAGE_CACHE_SECONDS', '60'))
+
+# Sessions
+# cached_db (default) serves session reads from the cache and keeps the
+# database copy for durability. DJANGO_SESSION_ENGINE=cache skips the
+# database entirely (sessions are lost if the cache is cleared); =db is the
+# old behaviour. With several worker processes, use a shared cache backend
+# (see above) so a logout or user change is seen by every process.
 
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'cached_db')
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -119,6 +260,24 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = Path(os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles'))
+
+# Release build: `manage.py extract_inline_css` (once, when templates gain
+# inline <style> blocks) then `manage.py collectstatic`, which writes
+# content-hashed copies plus .gz/.br variants. StaticAssetMiddleware serves
+# the hashed names with an immutable, year-long Cache-Control. Hashed names
+# need the collected manifest, so they are off by default under DEBUG.
+STATIC_MANIFEST = os.environ.get('DJANGO_STATIC_MANIFEST', '' if DEBUG else '1') == '1'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'chautarichic.static_assets.PrecompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
@@ -126,8 +285,71 @@ AUTH_USER_MODEL = 'accounts.User'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Threads resizing uploaded images into srcset derivatives (salon.images)
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', '2'))
 
 # Authentication
+# The signed-in user is read from the cache instead of the database on each
+# request (salon.request_context), checked against a per-user version number
+# in the database that every save of the user bumps.
+AUTHENTICATION_BACKENDS = ['salon.request_context.CachedModelBackend']
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Outgoing mail (booking notifications are sent by `manage.py process_outbox`)
+EMAIL_BACKEND = os.environ.get('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+# Seconds before a stalled SMTP server counts as a failed delivery (retried
+# with backoff) instead of blocking the outbox worker
+EMAIL_TIMEOUT = float(os.environ.get('EMAIL_TIMEOUT', '10'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'ChautariChic <no-reply@chautarichic.com>')
+
+# Delivery backend per outbox channel
+NOTIFICATION_BACKENDS = {
+    'email': os.environ.get('NOTIFICATION_EMAIL_BACKEND', 'booking.notifications.EmailBackend'),
+    'sms': os.environ.get('NOTIFICATION_SMS_BACKEND', 'booking.notifications.ConsoleBackend'),
+}
+SMS_GATEWAY_URL = os.environ.get('SMS_GATEWAY_URL', '')
+SMS_GATEWAY_TOKEN = os.environ.get('SMS_GATEWAY_TOKEN', '')
+
+# Booking archive: `manage.py archive_bookings` moves completed and
+# cancelled bookings whose day is older than this into ArchivedBooking
+BOOKING_ARCHIVE_AFTER_DAYS = int(os.environ.get('BOOKING_ARCHIVE_AFTER_DAYS', '180'))
+
+# Logging
+# Slow requests are logged as one JSON object per line so they can be
+# shipped to a log aggregator as-is; set SLOW_REQUEST_LOG to also append
+# them to a file.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json_line',
+        },
+    },
+    'loggers': {
+        'chautarichic.requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+if os.environ.get('SLOW_REQUEST_LOG'):
+    LOGGING['handlers']['slow_requests_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': os.environ['SLOW_REQUEST_LOG'],
+        'formatter': 'json_line',
+    }
+    LOGGING['loggers']['chautarichic.requests']['handlers'].append('slow_requests_file')
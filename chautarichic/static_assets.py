@@ -0,0 +1,166 @@
+import gzip
+import mimetypes
+import os
+import stat
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; gzip ones are still written
+    brotli = None
+
+# Text assets worth precompressing; images and fonts are compressed already
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.ico')
+MIN_COMPRESS_SIZE = 256
+# Keep a variant only if it saves at least this fraction of the bytes
+MIN_SAVING = 0.05
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Served in this order of preference when the client accepts them
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed names, e.g. css/salon/base.3a9c1e0f2b7d.css)
+    that also writes .gz and, when the brotli package is installed, .br
+    variants of each hashed text asset for StaticAssetMiddleware to serve.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Only the final names: earlier passes over CSS can leave superseded hashes
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE):
+                self.precompress(name)
+
+    def precompress(self, name):
+        with self.open(name) as handle:
+            content = handle.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(content, mode=brotli.MODE_TEXT, quality=11)
+        for suffix, data in variants.items():
+            if len(data) > len(content) * (1 - MIN_SAVING):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self.save(name + suffix, ContentFile(data))
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = params.replace(' ', '')
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """
+    Serves STATIC_ROOT ahead of the rest of the middleware stack. Hashed
+    names from the staticfiles manifest are sent with a far-future immutable
+    Cache-Control, so browsers never ask for them again; other files are
+    revalidated with Last-Modified. The precompressed .br or .gz variant is
+    sent to clients that accept it. Under DEBUG, files not collected yet are
+    looked up with the staticfiles finders.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        # Static files served from another host (a CDN) never reach Django
+        if not settings.STATIC_URL or '//' in settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        # Local stat() and read() calls; cheaper than a hop to a thread
+        response = self.serve(request)
+        return response if response is not None else await self.get_response(request)
+
+    def find(self, name):
+        if self.root:
+            try:
+                path = safe_join(self.root, name)
+            except SuspiciousFileOperation:
+                return None
+            if os.path.isfile(path):
+                return path
+        if settings.DEBUG:
+            return finders.find(name)
+        return None
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        name = request.path[len(self.prefix):]
+        path = self.find(name)
+        if path is None:
+            return None
+        stats = os.stat(path)
+        if not stat.S_ISREG(stats.st_mode):
+            return None
+
+        cache_control = IMMUTABLE if name in self.hashed_names else REVALIDATE
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stats.st_mtime):
+            response = HttpResponseNotModified()
+            response['Cache-Control'] = cache_control
+            return response
+
+        content_type, _ = mimetypes.guess_type(name)
+        served, content_encoding, varies = path, None, False
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                varies = True
+                if content_encoding is None and encoding in accepted:
+                    served, content_encoding = path + suffix, encoding
+
+        size = os.path.getsize(served)
+        body = b''
+        if request.method == 'GET':
+            with open(served, 'rb') as handle:
+                body = handle.read()
+        response = HttpResponse(body, content_type=content_type or 'application/octet-stream')
+        response['Content-Length'] = str(size)
+        response['Last-Modified'] = http_date(stats.st_mtime)
+        response['Cache-Control'] = cache_control
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        if varies:
+            response['Vary'] = 'Accept-Encoding'
+        return response
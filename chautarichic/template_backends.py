@@ -0,0 +1,27 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import current_timings
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings()
+        if timings is None:
+            return super().render(context, request)
+        with timings.timing_template():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with each top-level render (render(),
+    TemplateResponse, render_to_string) timed for ServerTimingMiddleware
+    while it handles a request. {% include %} and {% extends %} render
+    inside it through the engine and are not timed apart.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
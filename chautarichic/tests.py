@@ -0,0 +1,291 @@
+import gzip
+import importlib
+import importlib.util
+import os
+import re
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.template.base import Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+
+from booking.models import Booking
+from salon import catalog_cache
+from salon.models import EVERY_DAY, Salon, Service, ServiceCategory, Staff
+
+from . import static_assets
+from .middleware import current_timings
+
+SERVER_TIMING_ENTRY = re.compile(r'^(\w+);dur=(\d+\.\d)(?:;desc="(\d+) queries")?$')
+
+
+@override_settings(
+    SERVER_TIMING=True, SLOW_REQUEST_THRESHOLD_MS=60_000,
+    MIDDLEWARE=['chautarichic.middleware.ServerTimingMiddleware'] + settings.MIDDLEWARE,
+)
+class ServerTimingTests(TestCase):
+    def timings(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            match = SERVER_TIMING_ENTRY.match(entry)
+            self.assertIsNotNone(match, entry)
+            entries[match[1]] = (float(match[2]), match[3])
+        return entries
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_header_splits_the_request_into_phases(self):
+        with self.assertLogs('chautarichic.requests', 'WARNING') as logs:
+            response = self.client.get(reverse('salon:public_salon_list'))
+        timings = self.timings(response)
+        self.assertEqual(list(timings), ['total', 'view', 'db', 'tpl'])
+        self.assertGreater(timings['tpl'][0], 0)
+        self.assertGreater(int(timings['db'][1]), 0)
+        # SQL and templates are not counted again as view time
+        phases = sum(timings[name][0] for name in ('view', 'db', 'tpl'))
+        self.assertLessEqual(phases, timings['total'][0] + 0.3)
+        self.assertIn('"view": "salon.views.PublicSalonListView"', logs.output[0])
+
+    def test_rendering_is_untouched_outside_a_request(self):
+        render = Template.render
+        self.client.get(reverse('salon:public_salon_list'))
+        self.assertIs(Template.render, render)
+        self.assertIsNone(current_timings())
+
+
+def reload_urlconf():
+    # The URL modules pick the sync or async views when they are imported
+    for name in ('salon.urls', 'booking.urls', settings.ROOT_URLCONF):
+        importlib.reload(sys.modules[name])
+    clear_url_caches()
+
+
+@contextmanager
+def async_views():
+    try:
+        with override_settings(ASYNC_VIEWS=True):
+            reload_urlconf()
+            yield
+    finally:
+        reload_urlconf()
+
+
+class AsyncViewTests(TestCase):
+    """The ASGI variants of the public pages answer exactly like the sync ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user(username='owner@example.com', password='pass', user_type='salon_owner')
+        cls.customer = get_user_model().objects.create_user(username='customer@example.com', password='pass')
+        cls.salon = Salon.objects.create(
+            owner=owner, name='Glow', description='Hair and beauty', location='Kathmandu', contact_number='01-0000000',
+            latitude=27.7154, longitude=85.3123, opening_time=time(9), closing_time=time(18), is_approved=True,
+        )
+        category = ServiceCategory.objects.create(salon=cls.salon, name='Hair')
+        cls.service = Service.objects.create(salon=cls.salon, category=category, name='Keratin', price=500, duration=45)
+        cls.staff = Staff.objects.create(
+            salon=cls.salon, name='Asha', role='Stylist', phone='9800000002',
+            available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+        )
+        cls.day = date.today() + timedelta(days=7)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_both(self, url, **headers):
+        """(sync response, async response) for `url`, each from a cold cache."""
+        path = url.split('?')[0]
+        self.assertFalse(resolve(path).func.view_class.view_is_async)
+        sync_response = self.client.get(url, headers=headers)
+        cache.clear()
+        with async_views():
+            self.assertTrue(resolve(path).func.view_class.view_is_async)
+            async_response = async_to_sync(self.async_client.get)(url, headers=headers)
+        cache.clear()
+        return sync_response, async_response
+
+    def assertSameResponse(self, url, **headers):
+        sync_response, async_response = self.get_both(url, **headers)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.content, sync_response.content)
+        for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Content-Type'):
+            self.assertEqual(async_response.get(header), sync_response.get(header), header)
+        return sync_response
+
+    def public_pages(self):
+        salons = reverse('salon:public_salon_list')
+        return [
+            salons,
+            f'{salons}?q=keratin',
+            f'{salons}?near=27.7043,85.3074&radius=5',
+            f'{salons}?near=27.7043,85.3074&radius=5&q=glow',
+            reverse('salon:public_salon_detail', args=[self.salon.pk]),
+        ]
+
+    def test_public_pages(self):
+        for url in self.public_pages():
+            with self.subTest(url=url):
+                response = self.assertSameResponse(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Glow')
+                self.assertTrue(response.has_header('ETag'))
+
+    def test_not_modified_until_the_catalog_changes(self):
+        validators = {url: self.client.get(url) for url in self.public_pages()}
+        for url, response in validators.items():
+            with self.subTest(url=url):
+                sync_response, async_response = self.get_both(url, if_none_match=response['ETag'])
+                self.assertEqual((sync_response.status_code, async_response.status_code), (304, 304))
+                self.assertEqual(async_response['ETag'], sync_response['ETag'])
+                sync_response, async_response = self.get_both(url, if_modified_since=response['Last-Modified'])
+                self.assertEqual((sync_response.status_code, async_response.status_code), (304, 304))
+
+        catalog_cache.invalidate_salon(self.salon.pk)
+        for url, response in validators.items():
+            with self.subTest(url=url):
+                fresh = self.assertSameResponse(url, if_none_match=response['ETag'])
+                self.assertEqual(fresh.status_code, 200)
+                self.assertNotEqual(fresh['ETag'], response['ETag'])
+
+    def test_availability(self):
+        url = reverse('booking:availability', args=[self.salon.pk])
+        query = f'{url}?service={self.service.pk}&date={self.day.isoformat()}'
+        for params in ('', '&days=3', f'&staff={self.staff.pk}', '&days=abc'):
+            with self.subTest(params=params):
+                self.assertSameResponse(query + params)
+        self.assertEqual(self.assertSameResponse(url).status_code, 400)
+        self.assertEqual(self.assertSameResponse(f'{url}?service=999').status_code, 404)
+        self.assertEqual(self.assertSameResponse(reverse('booking:availability', args=[999]) + '?service=1').status_code, 404)
+
+        before = self.assertSameResponse(query).json()['days'][0]['staff'][0]['slots']
+        Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service, staff=self.staff,
+            date=self.day, time=time(10),
+        )
+        after = self.assertSameResponse(query).json()['days'][0]['staff'][0]['slots']
+        self.assertIn('10:00', before)
+        self.assertNotIn('10:00', after)
+
+
+class StaticBuildTests(SimpleTestCase):
+    """collectstatic into a scratch STATIC_ROOT with the release storage."""
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.source, self.root = directory / 'src', directory / 'root'
+        (self.source / 'css').mkdir(parents=True)
+        self.write('css/tiny.css', 'a { color: #b03a5b; }\n')
+        self.write('css/site.css', '@import url("tiny.css");\n' + ''.join(
+            f'.salon-card-{n} {{ margin: {n}px; padding: {n}px; }}\n' for n in range(40)
+        ))
+        override = override_settings(
+            # Only the scratch stylesheets, not every app's static files
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_DIRS=[str(self.source)], STATIC_ROOT=str(self.root),
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'chautarichic.static_assets.PrecompressedManifestStaticFilesStorage',
+            }},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, name, text):
+        (self.source / name).write_text(text)
+
+    def collect(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        return staticfiles_storage.manifest_hash
+
+    def test_text_assets_get_gzip_siblings(self):
+        self.collect()
+        name = staticfiles_storage.stored_name('css/site.css')
+        self.assertRegex(name, r'^css/site\.[0-9a-f]{12}\.css$')
+        content = (self.root / name).read_bytes()
+        self.assertEqual(gzip.decompress((self.root / f'{name}.gz').read_bytes()), content)
+        # Too small to be worth it, and unhashed copies are never served as immutable
+        self.assertFalse((self.root / f"{staticfiles_storage.stored_name('css/tiny.css')}.gz").exists())
+        self.assertFalse((self.root / 'css/site.css.gz').exists())
+
+    @skipUnless(static_assets.brotli, "brotli is not installed")
+    def test_text_assets_get_brotli_siblings(self):
+        self.collect()
+        name = staticfiles_storage.stored_name('css/site.css')
+        content = (self.root / name).read_bytes()
+        self.assertEqual(static_assets.brotli.decompress((self.root / f'{name}.br').read_bytes()), content)
+
+    def test_manifest_hash_follows_the_stylesheets(self):
+        first = self.collect()
+        self.assertTrue(first)
+        site = staticfiles_storage.stored_name('css/site.css')
+        self.assertEqual(self.collect(), first)
+
+        # site.css imports tiny.css by its hashed name, so both change
+        self.write('css/tiny.css', 'a { color: #1d6b57; }\n')
+        second = self.collect()
+        self.assertNotEqual(second, first)
+        self.assertNotEqual(staticfiles_storage.stored_name('css/site.css'), site)
+        self.assertTrue((self.root / f"{staticfiles_storage.stored_name('css/site.css')}.gz").exists())
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    """DJANGO_DB_PROFILE picks the DATABASES setup, and a typo is refused."""
+
+    def load(self, profile, **env):
+        """A fresh copy of the settings module executed under `env`; the live settings are untouched."""
+        spec = importlib.util.spec_from_file_location('profile_settings', Path(__file__).with_name('settings.py'))
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, {'DJANGO_DB_PROFILE': profile, **env}):
+            for name in ('DJANGO_SERVER', 'DJANGO_DB_POOL', 'DJANGO_DB_CONN_MAX_AGE'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            spec.loader.exec_module(module)
+        return module.DATABASES['default']
+
+    def test_sqlite_uses_wal_and_persistent_connections(self):
+        db = self.load('sqlite')
+        self.assertEqual(db['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(db['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', db['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL', db['OPTIONS']['init_command'])
+        self.assertEqual(db['CONN_MAX_AGE'], 300)
+        self.assertTrue(db['CONN_HEALTH_CHECKS'])
+
+    def test_sqlite_legacy_restores_the_rollback_journal(self):
+        db = self.load('sqlite-legacy')
+        self.assertEqual(db['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(db['OPTIONS'], {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=DELETE',
+        })
+        self.assertNotIn('CONN_MAX_AGE', db)
+
+    def test_postgres_with_and_without_the_pool(self):
+        db = self.load('postgres', POSTGRES_DB='salons')
+        self.assertEqual(db['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(db['NAME'], 'salons')
+        self.assertEqual(db['OPTIONS'], {})
+        self.assertEqual(db['CONN_MAX_AGE'], 300)
+
+        db = self.load('postgres', DJANGO_DB_POOL='1', DJANGO_DB_POOL_MIN='1', DJANGO_DB_POOL_MAX='4')
+        self.assertEqual(db['OPTIONS'], {'pool': {'min_size': 1, 'max_size': 4, 'timeout': 10}})
+        self.assertEqual(db['CONN_MAX_AGE'], 0)
+
+    def test_asgi_drops_persistent_connections(self):
+        self.assertEqual(self.load('sqlite', DJANGO_SERVER='asgi')['CONN_MAX_AGE'], 0)
+
+    def test_unknown_profile_fails_loudly(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "got 'postgresql'"):
+            self.load('postgresql')
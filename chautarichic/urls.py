@@ -17,6 +17,7 @@ urlpatterns = [
     
     # App URLs
     path('api/accounts/', include('accounts.urls')),
+    path('api/catalog/', include('salon.api_urls')),
     path('salon/', include('salon.urls')),
     path('bookings/', include('booking.urls')),
 ]
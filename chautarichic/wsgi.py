@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chautarichic.settings')
 
 application = get_wsgi_application()
+
+
+def threaded_application():
+    """
+    `application` behind uvicorn's WSGI adapter with WSGI_THREADS worker
+    threads, for `manage.py serve --interface wsgi`.
+    """
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+
+    return WSGIMiddleware(application, workers=int(os.environ.get('WSGI_THREADS', '10')))
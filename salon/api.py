@@ -0,0 +1,132 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.db.models import Prefetch
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from . import catalog_cache, geo
+from .models import Salon, ServiceCategory, Service, Staff
+from .serializers import (
+    SalonSerializer, ServiceCategorySerializer, ServiceSerializer, StaffSerializer, requested_fields,
+)
+
+
+class CatalogCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'id'
+
+
+def catalog_state(request):
+    # Read once per request; both validators below need it
+    if not hasattr(request, '_catalog_state'):
+        request._catalog_state = catalog_cache.catalog_state()
+    return request._catalog_state
+
+
+def catalog_etag(request, *args, **kwargs):
+    # Every response is a function of the catalog version and the request, so
+    # the ETag is known before any other query runs
+    key = '|'.join([
+        catalog_state(request)[0],
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(catalog_state(request)[1], tz=timezone.utc)
+
+
+# Clients must revalidate, which costs them a 304 while nothing has changed
+@method_decorator([
+    cache_control(public=True, max_age=0, must_revalidate=True),
+    condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified),
+], name='dispatch')
+class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    pagination_class = CatalogCursorPagination
+    # Query parameter -> lookup, for narrowing the list to one salon etc.
+    filter_params = {}
+
+    def wants(self, field):
+        requested = requested_fields(self.request)
+        return not requested or field in requested
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        for param, lookup in self.filter_params.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            if not value.isdigit():
+                raise ValidationError({param: "Expected a numeric id."})
+            queryset = queryset.filter(**{lookup: int(value)})
+        return queryset
+
+
+class SalonViewSet(CatalogViewSet):
+    """
+    ?near=<lat>,<lng>[&radius=<km>] lists the salons within the radius,
+    nearest first, as one unpaginated page of at most geo.MAX_RESULTS.
+    """
+    serializer_class = SalonSerializer
+
+    def list(self, request, *args, **kwargs):
+        if 'near' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        point = geo.parse_point(request.query_params['near'])
+        if point is None:
+            raise ValidationError({'near': "Expected '<latitude>,<longitude>'."})
+        radius = geo.parse_radius(request.query_params.get('radius'))
+        salons = geo.nearby(self.filter_queryset(self.get_queryset()), *point, radius_km=radius)
+        serializer = self.get_serializer(salons, many=True)
+        return Response({'radius_km': radius, 'count': len(salons), 'results': serializer.data})
+
+    def get_queryset(self):
+        queryset = Salon.objects.filter(is_approved=True, is_active=True)
+        if self.wants('categories'):
+            queryset = queryset.prefetch_related(
+                Prefetch('categories', queryset=ServiceCategory.objects.only('id', 'salon_id', 'name').order_by('name'))
+            )
+        return queryset
+
+
+class ServiceCategoryViewSet(CatalogViewSet):
+    serializer_class = ServiceCategorySerializer
+    filter_params = {'salon': 'salon_id'}
+
+    def get_queryset(self):
+        return ServiceCategory.objects.filter(salon__is_approved=True, salon__is_active=True)
+
+
+class ServiceViewSet(CatalogViewSet):
+    serializer_class = ServiceSerializer
+    filter_params = {'salon': 'salon_id', 'category': 'category_id'}
+
+    def get_queryset(self):
+        queryset = Service.objects.filter(is_active=True, salon__is_approved=True, salon__is_active=True)
+        if self.wants('category_name'):
+            queryset = queryset.select_related('category')
+        return queryset
+
+
+class StaffViewSet(CatalogViewSet):
+    serializer_class = StaffSerializer
+    filter_params = {'salon': 'salon_id'}
+
+    def get_queryset(self):
+        return Staff.objects.filter(is_active=True, salon__is_approved=True, salon__is_active=True)
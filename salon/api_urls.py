@@ -0,0 +1,13 @@
+from rest_framework.routers import DefaultRouter
+
+from . import api
+
+app_name = 'catalog_api'
+
+router = DefaultRouter()
+router.register('salons', api.SalonViewSet, basename='salon')
+router.register('categories', api.ServiceCategoryViewSet, basename='category')
+router.register('services', api.ServiceViewSet, basename='service')
+router.register('staff', api.StaffViewSet, basename='staff')
+
+urlpatterns = router.urls
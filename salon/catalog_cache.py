@@ -0,0 +1,151 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import CatalogVersion, Salon, Service, Staff
+
+# Per-salon cache of the public catalog (services grouped by category, staff
+# list and the rendered HTML fragment). Keys carry the salon row's
+# catalog_version, the same number behind the public page's ETag; any catalog
+# change bumps it so stale entries are never read again, in any process.
+CATALOG_TIMEOUT = 15 * 60
+# Expired entries are kept this much longer and served while one request
+# rebuilds them, so a popular salon expiring does not stampede the database
+STALE_GRACE = 60
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT = 2.0
+REBUILD_POLL_INTERVAL = 0.05
+
+
+# The CatalogVersion row; created by migration, or on first use after a flush
+CATALOG_VERSION_ID = 1
+
+
+def invalidate_salon(salon_id):
+    """
+    Move a salon's catalog to a new version, which every process reads from
+    its row, and with it the version of every listing.
+    """
+    now = timezone.now()
+    Salon.objects.filter(pk=salon_id).update(catalog_version=F('catalog_version') + 1, catalog_updated_at=now)
+    _bump_catalog_version(now)
+
+
+def _bump_catalog_version(now):
+    rows = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID)
+    if not rows.update(version=F('version') + 1, updated_at=now):
+        try:
+            with transaction.atomic():
+                CatalogVersion.objects.create(pk=CATALOG_VERSION_ID, updated_at=now)
+        except IntegrityError:
+            # Created concurrently by another invalidation
+            rows.update(version=F('version') + 1, updated_at=now)
+
+
+def _state(row):
+    if row is None:
+        return '0', 0.0
+    version, modified = row
+    return str(version), modified.timestamp()
+
+
+def _state_query():
+    return CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).values_list('version', 'updated_at')
+
+
+def catalog_state():
+    """
+    (version, last-modified timestamp) of the whole catalog, read from the
+    CatalogVersion row so every process agrees on it. Every salon change
+    moves it, listed or not, hidden or deleted.
+    """
+    return _state(_state_query().first())
+
+
+async def acatalog_state():
+    """catalog_state() for async views."""
+    return _state(await _state_query().afirst())
+
+
+def _get_or_build(key, builder, timeout=CATALOG_TIMEOUT):
+    entry = cache.get(key)
+    if entry is not None:
+        expires_at, value = entry
+        if time.time() < expires_at:
+            return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        try:
+            value = builder()
+            cache.set(key, (time.time() + timeout, value), timeout + STALE_GRACE)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    # Someone else is rebuilding: serve the stale copy if there is one,
+    # otherwise wait briefly for theirs before giving up and building too
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return builder()
+
+
+def _build_catalog(salon):
+    services = (
+        Service.objects.filter(salon=salon, is_active=True)
+        .select_related('category')
+        .order_by('category__name', 'name')
+    )
+    grouped_services = {}
+    for service in services:
+        cat_name = service.category.name if service.category else "Uncategorized"
+        grouped_services.setdefault(cat_name, []).append(service)
+    return {
+        'grouped_services': grouped_services,
+        'staff_members': list(Staff.objects.filter(salon=salon, is_active=True)),
+    }
+
+
+def _html_key(salon):
+    return f'salon:{salon.pk}:catalog_html:{salon.catalog_version}'
+
+
+def get_catalog(salon):
+    """Services grouped by category name and the active staff for a salon."""
+    return _get_or_build(f'salon:{salon.pk}:catalog:{salon.catalog_version}', lambda: _build_catalog(salon))
+
+
+def get_catalog_html(salon):
+    """
+    The rendered services/staff section of the public salon page, for the
+    catalog_version of the `salon` row passed in.
+    """
+    def render():
+        context = dict(get_catalog(salon), salon=salon)
+        return str(render_to_string('salon/public_salon_catalog.html', context))
+
+    return mark_safe(_get_or_build(_html_key(salon), render))
+
+
+async def aget_catalog_html(salon):
+    """
+    get_catalog_html() for async views: a fresh cached fragment is read with
+    the async cache API; anything else (a miss, a stale entry, a rebuild
+    lock) falls back to the sync path on a thread.
+    """
+    entry = await cache.aget(_html_key(salon))
+    if entry is not None and time.time() < entry[0]:
+        return mark_safe(entry[1])
+    return await sync_to_async(get_catalog_html)(salon)
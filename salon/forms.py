@@ -1,5 +1,5 @@
 from django import forms
-from .models import Salon, SalonPhoto, ServiceCategory, Service, Staff
+from .models import Salon, SalonPhoto, ServiceCategory, Service, Staff, days_to_mask
 
 class SalonRegistrationForm(forms.ModelForm):
     class Meta:
@@ -44,7 +44,7 @@ class ServiceForm(forms.ModelForm):
         salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
         if salon:
-            self.fields['category'].queryset = ServiceCategory.objects.filter(salon=salon)
+            self.fields['category'].queryset = ServiceCategory.objects.filter(salon=salon).select_related('salon')
 
 class StaffForm(forms.ModelForm):
     DAYS_CHOICES = [
@@ -78,13 +78,19 @@ class StaffForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.working_days:
-            # Pre-populate the working_days_list from the comma-separated string
-            self.fields['working_days_list'].initial = self.instance.working_days.split(',')
+            # Pre-populate the working_days_list from the weekday bitmask
+            self.fields['working_days_list'].initial = self.instance.working_day_codes
 
     def save(self, commit=True):
         instance = super().save(commit=False)
-        # Convert list of days to comma-separated string
-        instance.working_days = ','.join(self.cleaned_data['working_days_list'])
+        # Convert list of days to the weekday bitmask
+        instance.working_days = days_to_mask(self.cleaned_data['working_days_list'])
         if commit:
             instance.save()
         return instance
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="A .csv or .xlsx file with a header row.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-input', 'accept': '.csv,.xlsx'}),
+    )
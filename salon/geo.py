@@ -0,0 +1,174 @@
+import math
+
+from django.db.models import Q
+
+# "Salons near me" without PostGIS. Every located salon stores a geohash of
+# its coordinates in an indexed column; nearby salons share a prefix, so a
+# radius search becomes a handful of index range scans over the cells that
+# cover the search box, a bounding-box filter, and an exact haversine
+# distance on the few candidates that remain.
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9  # about 5 m x 5 m
+MAX_RADIUS_KM = 100
+DEFAULT_RADIUS_KM = 10
+# Use the finest cell size whose covering needs at most this many prefixes
+MAX_CELLS = 16
+MAX_RESULTS = 100
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        span, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(latitude degrees, longitude degrees) covered by one cell."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles; widen the box to match
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lng_delta = min(180.0, lat_delta / cos_lat)
+    return (
+        max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta),
+        max(-180.0, longitude - lng_delta), min(180.0, longitude + lng_delta),
+    )
+
+
+def _cells(box, precision):
+    min_lat, max_lat, min_lng, max_lng = box
+    lat_step, lng_step = cell_size(precision)
+    # Sample one point per cell across the box, plus its far edges
+    lats = [min_lat + i * lat_step for i in range(int((max_lat - min_lat) / lat_step) + 1)] + [max_lat]
+    lngs = [min_lng + i * lng_step for i in range(int((max_lng - min_lng) / lng_step) + 1)] + [max_lng]
+    return {encode(lat, lng, precision) for lat in lats for lng in lngs}
+
+
+def covering_prefixes(box):
+    """The fewest geohash prefixes (up to MAX_CELLS) whose cells cover `box`."""
+    best = {''}
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lng_step = cell_size(precision)
+        estimate = ((box[1] - box[0]) / lat_step + 2) * ((box[3] - box[2]) / lng_step + 2)
+        if estimate > MAX_CELLS * 4:
+            break
+        cells = _cells(box, precision)
+        if len(cells) > MAX_CELLS:
+            break
+        best = cells
+    return sorted(best)
+
+
+def prefix_ranges(prefixes):
+    """
+    [low, high) geohash ranges covering the prefixes, with neighbouring
+    cells of the same parent ("tuutk", "tuutm") merged into one range.
+    """
+    ranges = []
+    for prefix in sorted(prefixes):
+        if ranges:
+            last = ranges[-1][1][:-1]
+            if (len(last) == len(prefix) and last[:-1] == prefix[:-1]
+                    and _BASE32.index(prefix[-1]) == _BASE32.index(last[-1]) + 1):
+                ranges[-1] = (ranges[-1][0], prefix + '~')
+                continue
+        # '~' sorts after every geohash character
+        ranges.append((prefix, prefix + '~'))
+    return ranges
+
+
+def prefix_filter(prefixes):
+    # Plain range comparisons, so every backend answers them from the
+    # geohash index (SQLite as a MULTI-INDEX OR of range searches)
+    condition = Q()
+    for low, high in prefix_ranges(prefix for prefix in prefixes if prefix):
+        condition |= Q(geohash__gte=low, geohash__lt=high)
+    return condition
+
+
+def candidates(queryset, latitude, longitude, radius_km):
+    """`queryset` narrowed to located salons inside the search box, via the geohash index."""
+    box = bounding_box(latitude, longitude, radius_km)
+    return queryset.filter(
+        prefix_filter(covering_prefixes(box)),
+        latitude__range=(box[0], box[1]),
+        longitude__range=(box[2], box[3]),
+    )
+
+
+def _rank(salons, latitude, longitude, radius_km, limit):
+    results = []
+    for salon in salons:
+        distance = haversine_km(latitude, longitude, salon.latitude, salon.longitude)
+        if distance <= radius_km:
+            results.append((distance, salon.pk, salon))
+    results.sort(key=lambda result: result[:2])
+    for distance, _, salon in results[:limit]:
+        salon.distance_km = round(distance, 2)
+    return [salon for _, _, salon in results[:limit]]
+
+
+def nearby(queryset, latitude, longitude, radius_km=DEFAULT_RADIUS_KM, limit=MAX_RESULTS):
+    """
+    Salons from `queryset` within `radius_km` of the point, nearest first,
+    each with a `distance_km` attribute. Returns a list.
+    """
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    return _rank(candidates(queryset, latitude, longitude, radius_km), latitude, longitude, radius_km, limit)
+
+
+async def anearby(queryset, latitude, longitude, radius_km=DEFAULT_RADIUS_KM, limit=MAX_RESULTS):
+    """nearby() through the async ORM."""
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    salons = [salon async for salon in candidates(queryset, latitude, longitude, radius_km)]
+    return _rank(salons, latitude, longitude, radius_km, limit)
+
+
+def parse_point(value):
+    """(latitude, longitude) from "27.71,85.32", or None when malformed or out of range."""
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def parse_radius(value, default=DEFAULT_RADIUS_KM):
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return default
+    if not math.isfinite(radius) or radius <= 0:
+        return default
+    return min(radius, MAX_RADIUS_KM)
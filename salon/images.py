@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from . import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Resized copies of uploaded images, written next to MEDIA_ROOT under a path
+# derived from the SHA-256 of the original bytes, so identical uploads share
+# one set of files. Each model keeps a `<field>_variants` JSON column that
+# templates read to build srcset attributes without touching storage.
+IMAGE_FIELDS = (
+    ('salon.Salon', 'logo'),
+    ('salon.SalonPhoto', 'image'),
+    ('salon.Service', 'image'),
+    ('salon.Staff', 'photo'),
+)
+DERIVATIVE_ROOT = 'derivatives'
+WIDTHS = (160, 320, 640, 1280)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def derivative_name(digest, width, ext):
+    return f'{DERIVATIVE_ROOT}/{digest[:2]}/{digest}/{width}.{ext}'
+
+
+def _manifest_name(digest):
+    return f'{DERIVATIVE_ROOT}/{digest[:2]}/{digest}/manifest.json'
+
+
+def _target_widths(width):
+    widths = [w for w in WIDTHS if w < width]
+    # Never upscale: the largest variant is the original width when it is
+    # smaller than the biggest configured size
+    widths.append(min(width, WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _save_once(name, content, overwrite=False):
+    # Content-addressed names never change meaning, so an existing file is
+    # already the right one unless a rebuild was forced
+    if default_storage.exists(name):
+        if not overwrite:
+            return
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def build_derivatives(fieldfile, force=False):
+    """
+    Create (or reuse) the resized WebP and JPEG copies of an uploaded image
+    and return their manifest. With `force`, existing copies are encoded
+    again, e.g. after FORMATS or WIDTHS changed or files were damaged.
+    """
+    fieldfile.open('rb')
+    try:
+        data = fieldfile.read()
+    finally:
+        fieldfile.close()
+    digest = hashlib.sha256(data).hexdigest()
+
+    manifest_name = _manifest_name(digest)
+    if not force and default_storage.exists(manifest_name):
+        with default_storage.open(manifest_name, 'rb') as manifest:
+            return json.loads(manifest.read())
+
+    with Image.open(BytesIO(data)) as original:
+        # Let the JPEG decoder downscale while reading very large photos
+        original.draft('RGB', (WIDTHS[-1] * 2, WIDTHS[-1] * 2))
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        widths = _target_widths(width)
+        # Resize largest first and derive each smaller size from the previous
+        # one; every step is at most a 2x reduction so quality holds up
+        current = image
+        for target in reversed(widths):
+            if current.width != target:
+                current = current.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+            for ext in FORMATS:
+                _save_once(derivative_name(digest, target, ext), _encode(current, ext), overwrite=force)
+
+    manifest = {'digest': digest, 'width': width, 'height': height, 'widths': widths, 'formats': list(FORMATS)}
+    _save_once(manifest_name, json.dumps(manifest).encode(), overwrite=force)
+    return manifest
+
+
+def needs_refresh(instance, field_name):
+    name = getattr(instance, field_name).name or ''
+    return name != getattr(instance, variants_field(field_name)).get('source', '')
+
+
+def process(model, pk, field_name, name, force=False):
+    """Build the derivatives for one stored image and record them on its row."""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or getattr(instance, field_name).name != name:
+        # Deleted or re-uploaded since the job was queued
+        return False
+    variants = dict(build_derivatives(getattr(instance, field_name), force=force), source=name)
+    # Conditional UPDATE so a newer upload is never overwritten, and no
+    # post_save fires to queue the same work again
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(**{variants_field(field_name): variants})
+    if updated:
+        salon_id = instance.pk if model._meta.label == 'salon.Salon' else instance.salon_id
+        catalog_cache.invalidate_salon(salon_id)
+    return bool(updated)
+
+
+def _run_job(label, pk, field_name, name):
+    try:
+        process(apps.get_model(label), pk, field_name, name)
+    except Exception:
+        logger.exception("Could not build image derivatives for %s %s.%s", label, pk, field_name)
+    finally:
+        # Worker threads open their own connections; do not leak them
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                thread_name_prefix='image-derivatives',
+            )
+        return _executor
+
+
+def schedule(instance, field_name):
+    """Queue derivative generation for after the current transaction commits."""
+    name = getattr(instance, field_name).name
+    if not name:
+        # Image cleared: drop the stale variants right away
+        type(instance).objects.filter(pk=instance.pk).update(**{variants_field(field_name): {}})
+        return
+    label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run_job, label, pk, field_name, name))
+
+
+def variant_urls(variants, ext):
+    return [(width, default_storage.url(derivative_name(variants['digest'], width, ext))) for width in variants['widths']]
+
+
+def srcset(variants, ext):
+    return ', '.join(f'{url} {width}w' for width, url in variant_urls(variants, ext))
@@ -0,0 +1,250 @@
+import csv
+import io
+import re
+
+from django import forms
+from django.db import transaction
+
+from booking import availability
+from . import catalog_cache, search
+from .forms import ServiceForm, StaffForm
+from .models import Service, ServiceCategory, Staff
+
+# Bulk onboarding of a salon's services or staff from a CSV/XLSX sheet. Every
+# row is validated with the same rules as the one-at-a-time forms; if any row
+# fails nothing is saved and the owner gets the full list of problems.
+MAX_ROWS = 5000
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+
+SERVICE_COLUMNS = ['category', 'name', 'price', 'duration', 'description', 'is_active']
+STAFF_COLUMNS = ['name', 'role', 'phone', 'available_from', 'available_to', 'working_days', 'is_active']
+
+TRUE_VALUES = {'1', 'y', 'yes', 'true', 'active'}
+FALSE_VALUES = {'0', 'n', 'no', 'false', 'inactive'}
+DAY_CODES = [code for code, _ in StaffForm.DAYS_CHOICES]
+
+
+class UploadError(Exception):
+    """The upload as a whole could not be read (wrong format, no header, too big)."""
+
+
+class ServiceImportForm(ServiceForm):
+    # The sheet names categories; they are resolved or created after validation
+    category_name = forms.CharField(max_length=ServiceCategory._meta.get_field('name').max_length)
+
+    class Meta(ServiceForm.Meta):
+        fields = ['name', 'price', 'duration', 'description', 'is_active']
+
+
+class StaffImportForm(StaffForm):
+    class Meta(StaffForm.Meta):
+        fields = ['name', 'role', 'phone', 'available_from', 'available_to', 'is_active']
+
+
+def _header(value):
+    return re.sub(r'[^a-z0-9]+', '_', str(value or '').strip().lower()).strip('_')
+
+
+def read_rows(upload):
+    """
+    Rows of a CSV or XLSX upload as dicts keyed by normalised header
+    ("Available From" -> "available_from"), paired with their sheet row number.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise UploadError(f"The file is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+    name = upload.name.lower()
+    if name.endswith('.xlsx'):
+        rows = _xlsx_rows(upload)
+    elif name.endswith('.csv'):
+        rows = _csv_rows(upload)
+    else:
+        raise UploadError("Upload a .csv or .xlsx file.")
+
+    try:
+        header = [_header(cell) for cell in next(rows)]
+    except StopIteration:
+        raise UploadError("The file is empty.")
+    records = []
+    for number, values in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in values if value is not None):
+            continue
+        if len(records) >= MAX_ROWS:
+            raise UploadError(f"Import at most {MAX_ROWS} rows at a time.")
+        records.append((number, dict(zip(header, values))))
+    return header, records
+
+
+def _csv_rows(upload):
+    try:
+        text = upload.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise UploadError("The CSV file must be UTF-8 encoded.")
+    return iter(csv.reader(io.StringIO(text)))
+
+
+def _xlsx_rows(upload):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise UploadError("XLSX import needs the openpyxl package; upload a CSV instead.")
+    try:
+        workbook = load_workbook(upload, read_only=True, data_only=True)
+    except Exception:
+        raise UploadError("The file is not a readable XLSX workbook.")
+    return workbook.active.iter_rows(values_only=True)
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _boolean(value, row_errors):
+    text = _text(value).lower()
+    if not text or text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    row_errors.append(f"is_active: '{value}' is not yes/no.")
+    return True
+
+
+def _working_days(value, row_errors):
+    # "Mon, Tue, Wed", "mon tue" or "Monday;Friday"
+    codes = []
+    for part in re.split(r'[\s,;/]+', _text(value)):
+        if not part:
+            continue
+        code = part[:3].capitalize()
+        if code not in DAY_CODES:
+            row_errors.append(f"working_days: '{part}' is not a weekday.")
+        elif code not in codes:
+            codes.append(code)
+    return codes
+
+
+# Form fields reported under the sheet's column name
+COLUMN_NAMES = {'category_name': 'category', 'working_days_list': 'working_days', '__all__': 'row'}
+
+
+def _form_errors(form, row_errors):
+    reported = {message.split(':', 1)[0] for message in row_errors}
+    for field, messages in form.errors.items():
+        column = COLUMN_NAMES.get(field, field)
+        # A column that could not be parsed already has its own message
+        if column not in reported:
+            row_errors.extend(f"{column}: {message}" for message in messages)
+
+
+def _missing_columns(header, required):
+    missing = [column for column in required if column not in header]
+    if missing:
+        raise UploadError(f"Missing column(s): {', '.join(missing)}.")
+
+
+def import_services(salon, upload):
+    """
+    Validate and create the services in `upload` for `salon`, creating
+    categories that do not exist yet. Returns (created count, errors) where
+    errors maps sheet row numbers to messages; nothing is saved unless every
+    row is valid.
+    """
+    header, records = read_rows(upload)
+    _missing_columns(header, ['category', 'name', 'price', 'duration'])
+
+    # Category names match case-insensitively so "hair" reuses "Hair"
+    categories = {category.name.lower(): category for category in ServiceCategory.objects.filter(salon=salon)}
+    existing = set(
+        (category_id, name.lower())
+        for category_id, name in Service.objects.filter(salon=salon).values_list('category_id', 'name')
+    )
+    seen = set()
+    errors, valid = {}, []
+    for number, row in records:
+        row_errors = []
+        is_active = _boolean(row.get('is_active'), row_errors)
+        form = ServiceImportForm(data={
+            'category_name': _text(row.get('category')),
+            'name': _text(row.get('name')),
+            'price': _text(row.get('price')),
+            'duration': _text(row.get('duration')),
+            'description': _text(row.get('description')),
+            # An unchecked checkbox is simply missing from the data
+            **({'is_active': 'on'} if is_active else {}),
+        })
+        if not form.is_valid():
+            _form_errors(form, row_errors)
+        else:
+            category_key = form.cleaned_data['category_name'].lower()
+            name_key = form.cleaned_data['name'].lower()
+            category = categories.get(category_key)
+            if (category_key, name_key) in seen:
+                row_errors.append(f"name: '{form.cleaned_data['name']}' appears twice in this category.")
+            elif category is not None and (category.pk, name_key) in existing:
+                row_errors.append(f"name: '{form.cleaned_data['name']}' already exists in {category.name}.")
+            seen.add((category_key, name_key))
+        if row_errors:
+            errors[number] = row_errors
+        else:
+            valid.append(form)
+    if errors or not valid:
+        return 0, errors
+
+    with transaction.atomic():
+        new_names = {}
+        for form in valid:
+            name = form.cleaned_data['category_name']
+            if name.lower() not in categories:
+                new_names.setdefault(name.lower(), name)
+        created = ServiceCategory.objects.bulk_create(
+            [ServiceCategory(salon=salon, name=name) for name in new_names.values()]
+        )
+        categories.update({category.name.lower(): category for category in created})
+
+        services = []
+        for form in valid:
+            service = form.save(commit=False)
+            service.salon = salon
+            service.category = categories[form.cleaned_data['category_name'].lower()]
+            services.append(service)
+        Service.objects.bulk_create(services)
+        # bulk_create skips the post_save signals that keep these in step
+        search.reindex_salons([salon.pk])
+        transaction.on_commit(lambda: catalog_cache.invalidate_salon(salon.pk))
+    return len(services), {}
+
+
+def import_staff(salon, upload):
+    """Like import_services() for staff members. Returns (created count, errors)."""
+    header, records = read_rows(upload)
+    _missing_columns(header, ['name', 'role', 'phone', 'available_from', 'available_to', 'working_days'])
+
+    errors, members = {}, []
+    for number, row in records:
+        row_errors = []
+        is_active = _boolean(row.get('is_active'), row_errors)
+        form = StaffImportForm(data={
+            'name': _text(row.get('name')),
+            'role': _text(row.get('role')),
+            'phone': _text(row.get('phone')),
+            # XLSX cells may already be datetime.time values
+            'available_from': row.get('available_from') or '',
+            'available_to': row.get('available_to') or '',
+            'working_days_list': _working_days(row.get('working_days'), row_errors),
+            **({'is_active': 'on'} if is_active else {}),
+        })
+        if not form.is_valid():
+            _form_errors(form, row_errors)
+        if row_errors:
+            errors[number] = row_errors
+            continue
+        member = form.save(commit=False)
+        member.salon = salon
+        members.append(member)
+    if errors or not members:
+        return 0, errors
+
+    with transaction.atomic():
+        Staff.objects.bulk_create(members)
+        transaction.on_commit(lambda: catalog_cache.invalidate_salon(salon.pk))
+        transaction.on_commit(lambda: availability.invalidate_salon(salon.pk))
+    return len(members), {}
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from salon import images
+
+
+class Command(BaseCommand):
+    help = "Build resized WebP/JPEG derivatives for uploaded images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Images processed in parallel.")
+        parser.add_argument('--force', action='store_true', help="Rebuild the variants of every image.")
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label, field_name in images.IMAGE_FIELDS:
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in rows.only('pk', field_name, images.variants_field(field_name)).iterator():
+                if options['force'] or images.needs_refresh(instance, field_name):
+                    jobs.append((model, instance.pk, field_name, getattr(instance, field_name).name))
+
+        def run(job):
+            try:
+                return images.process(*job, force=options['force'])
+            except Exception as exc:
+                self.stderr.write(f"{job[0]._meta.label} {job[1]}.{job[2]}: {exc}")
+                return False
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            built = sum(pool.map(run, jobs))
+
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {built} of {len(jobs)} images."))
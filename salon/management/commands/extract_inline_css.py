@@ -0,0 +1,106 @@
+import re
+import textwrap
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# A whole <style> element, with the indentation in front of it
+STYLE_BLOCK = re.compile(r'^([ \t]*)<style[^>]*>(.*?)</style>[ \t]*\n?', re.S | re.M)
+LOAD_TAG = re.compile(r'\{%\s*load\s+([^%]*?)\s*%\}')
+EXTENDS_TAG = re.compile(r'\{%\s*extends\s[^%]*%\}[ \t]*\n?')
+
+
+def template_dirs():
+    """The project's own template directories (not those of installed packages)."""
+    base = Path(settings.BASE_DIR).resolve()
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    dirs += [Path(app.path) / 'templates' for app in apps.get_app_configs()]
+    return [d for d in dirs if d.is_dir() and d.resolve().is_relative_to(base)]
+
+
+def stylesheet_name(template_name):
+    # salon/dashboard.html -> css/salon/dashboard.css
+    return 'css/' + str(Path(template_name).with_suffix('.css')).replace('\\', '/')
+
+
+def ensure_static_loaded(source):
+    match = LOAD_TAG.search(source)
+    if match:
+        if 'static' in match.group(1).split():
+            return source
+        return source[:match.end(1)] + ' static' + source[match.end(1):]
+    extends = EXTENDS_TAG.search(source)
+    at = extends.end() if extends else 0
+    return source[:at] + '{% load static %}\n' + source[at:]
+
+
+def extract(source, stylesheet):
+    """
+    (new template source, extracted CSS) with every static <style> block
+    replaced by one <link> to `stylesheet`. Blocks that use template syntax
+    stay inline, since their CSS differs per request.
+    """
+    link = f'<link rel="stylesheet" href="{{% static \'{stylesheet}\' %}}">'
+    linked = link in source
+    css = []
+
+    def replace(match):
+        nonlocal linked
+        indent, body = match.groups()
+        if '{{' in body or '{%' in body:
+            return match.group(0)
+        css.append(textwrap.dedent(body).strip('\n') + '\n')
+        if linked:
+            return ''
+        linked = True
+        return f'{indent}{link}\n'
+
+    source = STYLE_BLOCK.sub(replace, source)
+    if css:
+        source = ensure_static_loaded(source)
+    return source, '\n'.join(css)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move inline <style> blocks out of the project's templates into static "
+        "stylesheets (css/<template path>.css) linked with {% static %}, so "
+        "collectstatic can hash, precompress and long-cache them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only list templates with inline CSS; fail if there are any.")
+
+    def handle(self, *args, **options):
+        if not settings.STATICFILES_DIRS:
+            raise CommandError("STATICFILES_DIRS is empty; there is nowhere to write the stylesheets.")
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+        pending = []
+        for directory in template_dirs():
+            for path in sorted(directory.rglob('*.html')):
+                template_name = path.relative_to(directory).as_posix()
+                source = path.read_text(encoding='utf-8-sig')
+                stylesheet = stylesheet_name(template_name)
+                new_source, css = extract(source, stylesheet)
+                if not css:
+                    continue
+                pending.append(template_name)
+                if options['check']:
+                    continue
+                target = static_dir / stylesheet
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # A re-run after someone added another <style> appends to it
+                existing = target.read_text(encoding='utf-8') if target.exists() else ''
+                target.write_text(existing + ('\n' if existing else '') + css, encoding='utf-8')
+                bom = '\ufeff' if path.read_bytes().startswith(b'\xef\xbb\xbf') else ''
+                path.write_text(bom + new_source, encoding='utf-8')
+                self.stdout.write(f"{template_name} -> {stylesheet}")
+
+        if options['check']:
+            if pending:
+                raise CommandError("Inline CSS in: " + ', '.join(pending) + ". Run extract_inline_css.")
+            self.stdout.write(self.style.SUCCESS("No inline CSS left."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Extracted CSS from {len(pending)} template(s)."))
@@ -0,0 +1,123 @@
+import csv
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from salon import catalog_cache
+from salon.models import Salon
+
+# GeoNames dump columns (tab separated, no header): the place names and
+# coordinates used here, and population to prefer the bigger of two places
+# with the same name
+GEONAMES_NAME, GEONAMES_ASCII, GEONAMES_ALTERNATES, GEONAMES_LAT, GEONAMES_LNG = 1, 2, 3, 4, 5
+GEONAMES_POPULATION = 14
+
+
+def normalise(name):
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+
+def load_gazetteer(path):
+    """
+    {normalised place name: (latitude, longitude)} from a CSV with
+    name/latitude/longitude columns or a GeoNames .txt dump.
+    """
+    places = {}
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as handle:
+            if path.endswith('.txt'):
+                _read_geonames(csv.reader(handle, delimiter='\t', quoting=csv.QUOTE_NONE), places)
+            else:
+                _read_csv(csv.DictReader(handle), places)
+    except OSError as exc:
+        raise CommandError(f"Cannot read gazetteer: {exc}")
+    return {name: point for name, (point, _) in places.items()}
+
+
+def _add(places, name, point, population=0):
+    key = normalise(name)
+    if key and (key not in places or population > places[key][1]):
+        places[key] = (point, population)
+
+
+def _read_csv(reader, places):
+    columns = {normalise(column): column for column in reader.fieldnames or []}
+    try:
+        name, lat, lng = (columns[key] for key in ('name', 'latitude', 'longitude'))
+    except KeyError:
+        raise CommandError("A CSV gazetteer needs name, latitude and longitude columns.")
+    population = columns.get('population')
+    for row in reader:
+        try:
+            point = (float(row[lat]), float(row[lng]))
+            size = int(row[population] or 0) if population else 0
+        except (TypeError, ValueError):
+            continue
+        _add(places, row[name] or '', point, size)
+
+
+def _read_geonames(reader, places):
+    for row in reader:
+        if len(row) <= GEONAMES_POPULATION:
+            continue
+        try:
+            point = (float(row[GEONAMES_LAT]), float(row[GEONAMES_LNG]))
+            population = int(row[GEONAMES_POPULATION] or 0)
+        except ValueError:
+            continue
+        names = [row[GEONAMES_NAME], row[GEONAMES_ASCII]] + row[GEONAMES_ALTERNATES].split(',')
+        for name in names:
+            _add(places, name, point, population)
+
+
+def lookup(places, location):
+    # "Thamel, Kathmandu": the whole text first, then each part from the
+    # most specific one
+    candidates = [location] + re.split(r'[,;/]', location)
+    for candidate in candidates:
+        point = places.get(normalise(candidate))
+        if point:
+            return point
+    return None
+
+
+class Command(BaseCommand):
+    help = "Fill in salon coordinates offline by matching their location text against a local gazetteer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('gazetteer', help="CSV with name,latitude,longitude columns or a GeoNames .txt dump")
+        parser.add_argument('--all', action='store_true', help="Re-geocode salons that already have coordinates")
+        parser.add_argument('--dry-run', action='store_true', help="Report matches without saving")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        places = load_gazetteer(options['gazetteer'])
+        self.stdout.write(f"Loaded {len(places)} place names.")
+
+        salons = Salon.objects.only('id', 'location', 'latitude', 'longitude', 'geohash')
+        if not options['all']:
+            salons = salons.filter(latitude__isnull=True)
+
+        located, unmatched = [], {}
+        for salon in salons.iterator(chunk_size=options['batch_size']):
+            point = lookup(places, salon.location)
+            if point is None:
+                unmatched[salon.location] = unmatched.get(salon.location, 0) + 1
+                continue
+            salon.latitude, salon.longitude = point
+            # bulk_update() bypasses save(), which normally keeps this in step
+            salon.geohash = salon.compute_geohash()
+            located.append(salon)
+
+        if not options['dry_run'] and located:
+            with transaction.atomic():
+                Salon.objects.bulk_update(located, ['latitude', 'longitude', 'geohash'], batch_size=options['batch_size'])
+            # Salon coordinates are part of the catalog API
+            for salon_id in {salon.pk for salon in located}:
+                catalog_cache.invalidate_salon(salon_id)
+
+        verb = "Would locate" if options['dry_run'] else "Located"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(located)} salon(s)."))
+        for location, count in sorted(unmatched.items(), key=lambda item: -item[1])[:20]:
+            self.stdout.write(f"  no match for '{location}' ({count} salon(s))")
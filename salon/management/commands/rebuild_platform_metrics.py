@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from salon import metrics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PlatformMetrics daily rollup from users, salons and bookings."
+
+    def handle(self, *args, **options):
+        rows = metrics.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily rows."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from salon import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the salon full-text search index from the catalog tables."
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stdout.write("Full-text search index is only used on SQLite; nothing to do.")
+            return
+        with transaction.atomic():
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
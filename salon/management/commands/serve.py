@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TARGETS = {
+    # Async public views, everything else through Django's ASGI handler
+    'asgi': ['chautarichic.asgi:application'],
+    # The classic threaded deployment: sync views on a pool of WSGI threads
+    'wsgi': ['--factory', 'chautarichic.wsgi:threaded_application'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the site with uvicorn. --interface asgi (the default) runs the async "
+        "public salon pages and availability endpoint; wsgi runs the sync views on a "
+        "thread pool behind the same HTTP server, so the two can be compared directly."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interface', choices=sorted(TARGETS), default='asgi')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--workers', type=int, default=1, help="Server processes.")
+        parser.add_argument('--threads', type=int, default=10, help="WSGI threads per process.")
+        parser.add_argument('--access-log', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("serve needs uvicorn: pip install uvicorn")
+        interface = options['interface']
+        # Settings are read afresh by the server process, so SERVER_INTERFACE
+        # (and everything that depends on it) matches the interface served
+        env = {
+            **os.environ,
+            'DJANGO_SERVER': interface,
+            'WSGI_THREADS': str(options['threads']),
+        }
+        command = [
+            sys.executable, '-m', 'uvicorn', *TARGETS[interface],
+            '--host', options['host'], '--port', str(options['port']),
+            '--workers', str(options['workers']), '--app-dir', str(settings.BASE_DIR),
+            '--access-log' if options['access_log'] else '--no-access-log',
+        ]
+        self.stdout.write(f"Serving {interface.upper()} on http://{options['host']}:{options['port']}/")
+        sys.stdout.flush()
+        if os.name == 'posix':
+            # Become the server, so signals reach uvicorn directly
+            os.execvpe(sys.executable, command, env)
+        try:
+            returncode = subprocess.call(command, env=env)
+        except KeyboardInterrupt:
+            returncode = 0
+        if returncode:
+            raise CommandError(f"uvicorn exited with status {returncode}.")
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PlatformMetrics, Salon
+
+SIGNUP_FIELDS = {
+    'customer': 'customer_signups',
+    'salon_owner': 'owner_signups',
+    'super_admin': 'admin_signups',
+}
+COUNT_FIELDS = (
+    'customer_signups', 'owner_signups', 'admin_signups',
+    'salons_registered', 'salon_approvals', 'salon_revocations',
+    'pending_bookings', 'confirmed_bookings', 'completed_bookings', 'cancelled_bookings',
+)
+SUM_FIELDS = COUNT_FIELDS + ('gross_booking_value',)
+
+
+def increment_row(model, lookup, values):
+    """
+    Add `values` to the row of `model` matching `lookup`, creating it when
+    needed. Uses F() increments so concurrent writers never lose updates.
+    """
+    values = {field: amount for field, amount in values.items() if amount}
+    if not values:
+        return
+    rows = model.objects.filter(**lookup)
+    increments = {field: F(field) + amount for field, amount in values.items()}
+    if rows.update(**increments):
+        return
+    if all(amount <= 0 for amount in values.values()):
+        # Nothing to take away from a row that does not exist (e.g. its
+        # parent is being deleted in the same transaction)
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **values)
+    except IntegrityError:
+        # Another writer created the row first
+        rows.update(**increments)
+
+
+def record(day=None, **values):
+    increment_row(PlatformMetrics, {'date': day or timezone.localdate()}, values)
+
+
+def platform_totals():
+    """All-time totals summed from the daily rows (one row per day, not per event)."""
+    totals = PlatformMetrics.objects.aggregate(**{field: Sum(field) for field in SUM_FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+    totals['gross_booking_value'] = Decimal(totals['gross_booking_value'])
+    totals['users'] = totals['customer_signups'] + totals['owner_signups'] + totals['admin_signups']
+    totals['bookings'] = sum(totals[f'{status}_bookings'] for status in ('pending', 'confirmed', 'completed', 'cancelled'))
+    return totals
+
+
+def daily_series(days=30):
+    """One entry per day for the last `days` days, with bar heights for charts."""
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    rows = {row.date: row for row in PlatformMetrics.objects.filter(date__range=(start, end))}
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        series.append({
+            'date': day,
+            'signups': row.signups if row else 0,
+            'bookings': row.bookings if row else 0,
+            'approvals': row.salon_approvals if row else 0,
+            'gross_booking_value': row.gross_booking_value if row else Decimal(0),
+        })
+    for key in ('signups', 'bookings', 'gross_booking_value'):
+        peak = max([entry[key] for entry in series] + [1])
+        for entry in series:
+            entry[f'{key}_height'] = round(entry[key] * 100 / peak)
+    return series
+
+
+def _by_day(queryset, date_field, **annotations):
+    return (
+        queryset.order_by()
+        .annotate(day=TruncDate(date_field))
+        .values('day')
+        .annotate(**annotations)
+    )
+
+
+def rebuild():
+    """
+    Recompute every PlatformMetrics row from the source tables. Approvals
+    are not timestamped, so approved salons count on their registration day.
+    """
+    from booking.models import ArchivedBooking, Booking
+
+    User = get_user_model()
+    days = {}
+
+    def row(day):
+        return days.setdefault(day, PlatformMetrics(date=day))
+
+    for entry in _by_day(User.objects.all(), 'date_joined', **{
+        field: Count('pk', filter=Q(user_type=user_type)) for user_type, field in SIGNUP_FIELDS.items()
+    }):
+        for field in SIGNUP_FIELDS.values():
+            setattr(row(entry['day']), field, entry[field])
+
+    for entry in _by_day(Salon.objects.all(), 'created_at', registered=Count('pk'), approved=Count('pk', filter=Q(is_approved=True))):
+        metrics = row(entry['day'])
+        metrics.salons_registered = entry['registered']
+        metrics.salon_approvals = entry['approved']
+
+    # Archived bookings still count, on top of the live ones
+    for model in (Booking, ArchivedBooking):
+        bookings = (
+            model.objects.order_by().values('date').annotate(
+                pending=Count('pk', filter=Q(status='PENDING')),
+                confirmed=Count('pk', filter=Q(status='CONFIRMED')),
+                completed=Count('pk', filter=Q(status='COMPLETED')),
+                cancelled=Count('pk', filter=Q(status='CANCELLED')),
+                value=Sum('service__price', filter=~Q(status='CANCELLED'), default=0),
+            )
+        )
+        for entry in bookings:
+            metrics = row(entry['date'])
+            metrics.pending_bookings += entry['pending']
+            metrics.confirmed_bookings += entry['confirmed']
+            metrics.completed_bookings += entry['completed']
+            metrics.cancelled_bookings += entry['cancelled']
+            metrics.gross_booking_value += entry['value']
+
+    with transaction.atomic():
+        PlatformMetrics.objects.all().delete()
+        PlatformMetrics.objects.bulk_create(days.values(), batch_size=500)
+    return len(days)
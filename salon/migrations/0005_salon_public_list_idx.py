@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0004_staff'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['name'], condition=models.Q(is_approved=True, is_active=True), name='salon_public_list_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+WEEKDAY_CODES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def strings_to_mask(apps, schema_editor):
+    Staff = apps.get_model('salon', 'Staff')
+    for member in Staff.objects.only('id', 'working_days').iterator():
+        mask = 0
+        for code in (member.working_days or '').split(','):
+            code = code.strip()[:3].title()
+            if code in WEEKDAY_CODES:
+                mask |= 1 << WEEKDAY_CODES.index(code)
+        Staff.objects.filter(pk=member.pk).update(working_days_mask=mask)
+
+
+def mask_to_strings(apps, schema_editor):
+    Staff = apps.get_model('salon', 'Staff')
+    for member in Staff.objects.only('id', 'working_days_mask').iterator():
+        days = [code for i, code in enumerate(WEEKDAY_CODES) if member.working_days_mask >> i & 1]
+        Staff.objects.filter(pk=member.pk).update(working_days=','.join(days))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0005_salon_public_list_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staff',
+            name='working_days_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(strings_to_mask, mask_to_strings),
+        # Give the old column a default so the migration can be reversed
+        migrations.AlterField(
+            model_name='staff',
+            name='working_days',
+            field=models.CharField(default='', help_text='Comma-separated days, e.g. Mon,Tue,Wed', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='staff',
+            name='working_days',
+        ),
+        migrations.RenameField(
+            model_name='staff',
+            old_name='working_days_mask',
+            new_name='working_days',
+        ),
+        migrations.AlterField(
+            model_name='staff',
+            name='working_days',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Bitmask of working weekdays, bit 0 = Monday'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:40
+
+from django.db import migrations
+
+# The index as salon.search defined it when this migration was written;
+# copied rather than imported so later changes there cannot alter history
+CREATE_INDEX_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS salon_search USING fts5("
+    "name, location, services, categories, description, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+FILL_INDEX_SQL = (
+    "INSERT INTO salon_search (rowid, name, location, services, categories, description) "
+    "SELECT s.id, s.name, s.location, "
+    "COALESCE((SELECT group_concat(sv.name, ' ') FROM salon_service sv WHERE sv.salon_id = s.id AND sv.is_active), ''), "
+    "COALESCE((SELECT group_concat(c.name, ' ') FROM salon_servicecategory c WHERE c.salon_id = s.id), ''), "
+    "s.description "
+    "FROM salon_salon s"
+)
+DROP_INDEX_SQL = "DROP TABLE IF EXISTS salon_search"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX_SQL)
+    schema_editor.execute(FILL_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0006_staff_working_days_bitmask'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0007_salon_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('customer_signups', models.IntegerField(default=0)),
+                ('owner_signups', models.IntegerField(default=0)),
+                ('admin_signups', models.IntegerField(default=0)),
+                ('salons_registered', models.IntegerField(default=0)),
+                ('salon_approvals', models.IntegerField(default=0)),
+                ('salon_revocations', models.IntegerField(default=0)),
+                ('pending_bookings', models.IntegerField(default=0)),
+                ('confirmed_bookings', models.IntegerField(default=0)),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('gross_booking_value', models.DecimalField(decimal_places=2, default=0, help_text='Price of all non-cancelled bookings', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Platform metrics',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['created_at', 'id'], name='salon_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['created_at'], name='salon_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0008_platform_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized derivatives, filled in by salon.images'),
+        ),
+        migrations.AddField(
+            model_name='salonphoto',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized derivatives, filled in by salon.images'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized derivatives, filled in by salon.images'),
+        ),
+        migrations.AddField(
+            model_name='staff',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized derivatives, filled in by salon.images'),
+        ),
+    ]
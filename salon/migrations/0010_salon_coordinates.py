@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Filled in from the coordinates, for nearby search', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['geohash'], name='salon_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 15:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0010_salon_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='catalog_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='catalog_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='servicecategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='staff',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:30
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+# salon.metrics.rebuild() as it stood when this migration was written;
+# copied so later changes to the app cannot alter it
+SIGNUP_FIELDS = {
+    'customer': 'customer_signups',
+    'salon_owner': 'owner_signups',
+    'super_admin': 'admin_signups',
+}
+
+
+def _by_day(queryset, date_field, **annotations):
+    return (
+        queryset.order_by()
+        .annotate(day=TruncDate(date_field))
+        .values('day')
+        .annotate(**annotations)
+    )
+
+
+def backfill_platform_metrics(apps, schema_editor):
+    """
+    PlatformMetrics was created empty, so the super-admin dashboard missed
+    everything before it. Recompute every row from users, salons and the
+    live and archived bookings. Revocations are not recorded anywhere else,
+    so the counts already kept are carried over.
+    """
+    PlatformMetrics = apps.get_model('salon', 'PlatformMetrics')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Salon = apps.get_model('salon', 'Salon')
+    revocations = dict(PlatformMetrics.objects.filter(salon_revocations__gt=0).values_list('date', 'salon_revocations'))
+    days = {}
+
+    def row(day):
+        return days.setdefault(day, PlatformMetrics(date=day, salon_revocations=revocations.get(day, 0)))
+
+    for entry in _by_day(User.objects.all(), 'date_joined', **{
+        field: Count('pk', filter=Q(user_type=user_type)) for user_type, field in SIGNUP_FIELDS.items()
+    }):
+        for field in SIGNUP_FIELDS.values():
+            setattr(row(entry['day']), field, entry[field])
+
+    for entry in _by_day(Salon.objects.all(), 'created_at', registered=Count('pk'), approved=Count('pk', filter=Q(is_approved=True))):
+        metrics = row(entry['day'])
+        metrics.salons_registered = entry['registered']
+        metrics.salon_approvals = entry['approved']
+
+    for model_name in ('Booking', 'ArchivedBooking'):
+        bookings = (
+            apps.get_model('booking', model_name).objects.order_by().values('date').annotate(
+                pending=Count('pk', filter=Q(status='PENDING')),
+                confirmed=Count('pk', filter=Q(status='CONFIRMED')),
+                completed=Count('pk', filter=Q(status='COMPLETED')),
+                cancelled=Count('pk', filter=Q(status='CANCELLED')),
+                value=Sum('service__price', filter=~Q(status='CANCELLED'), default=0),
+            )
+        )
+        for entry in bookings:
+            metrics = row(entry['date'])
+            metrics.pending_bookings += entry['pending']
+            metrics.confirmed_bookings += entry['confirmed']
+            metrics.completed_bookings += entry['completed']
+            metrics.cancelled_bookings += entry['cancelled']
+            metrics.gross_booking_value += entry['value']
+
+    for day in revocations:
+        row(day)
+    PlatformMetrics.objects.all().delete()
+    PlatformMetrics.objects.bulk_create(days.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0007_archivedbooking'),
+        ('salon', '0011_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_platform_metrics, migrations.RunPython.noop),
+    ]
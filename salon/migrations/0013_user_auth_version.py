@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserAuthVersion = apps.get_model('salon', 'UserAuthVersion')
+    UserAuthVersion.objects.bulk_create(
+        [UserAuthVersion(user_id=pk) for pk in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('salon', '0012_backfill_platform_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAuthVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
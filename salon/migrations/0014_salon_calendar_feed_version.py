@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0013_user_auth_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='calendar_feed_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
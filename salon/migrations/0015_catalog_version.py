@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_catalog_version(apps, schema_editor):
+    Salon = apps.get_model('salon', 'Salon')
+    CatalogVersion = apps.get_model('salon', 'CatalogVersion')
+    latest = Salon.objects.aggregate(latest=Max('catalog_updated_at'))['latest']
+    CatalogVersion.objects.create(pk=1, updated_at=latest or django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0014_salon_calendar_feed_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,35 @@
+from datetime import date
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
+
+from . import geo
+
+# Staff.working_days is a 7-bit mask: bit 0 is Monday ... bit 6 is Sunday,
+# matching date.weekday()
+WEEKDAY_CODES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+EVERY_DAY = 0b1111111
+
+
+def weekday_bit(day):
+    # Accepts a weekday number (0 = Monday), a date or a 'Mon'-style code
+    if isinstance(day, date):
+        day = day.weekday()
+    elif isinstance(day, str):
+        day = WEEKDAY_CODES.index(day.strip()[:3].title())
+    return 1 << day
+
+
+def days_to_mask(days):
+    mask = 0
+    for day in days:
+        mask |= weekday_bit(day)
+    return mask
+
+
+def mask_to_days(mask):
+    return [code for i, code in enumerate(WEEKDAY_CODES) if mask >> i & 1]
 
 class Salon(models.Model):
     owner = models.OneToOneField(
@@ -10,17 +40,75 @@ class Salon(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, help_text="Filled in from the coordinates, for nearby search")
     contact_number = models.CharField(max_length=20)
     opening_time = models.TimeField()
     closing_time = models.TimeField()
     logo = models.ImageField(upload_to='salon_logos/', null=True, blank=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized derivatives, filled in by salon.images")
     is_approved = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Bumped whenever the salon or its categories, services or staff change
+    # (catalog_cache.invalidate_salon), for conditional GETs of its public page
+    catalog_version = models.PositiveIntegerField(default=1, editable=False)
+    catalog_updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Signed into calendar feed links (booking.exports); bumping it revokes
+    # every link handed out so far
+    calendar_feed_version = models.PositiveIntegerField(default=1, editable=False)
+    # Only ever changed with F() updates, never by save()
+    COUNTER_FIELDS = ('catalog_version', 'catalog_updated_at', 'calendar_feed_version')
+
+    class Meta:
+        indexes = [
+            # Public listing: approved + active salons ordered by name
+            models.Index(fields=['name'], condition=models.Q(is_approved=True, is_active=True), name='salon_public_list_idx'),
+            # Super-admin salon list, newest first
+            models.Index(fields=['created_at', 'id'], name='salon_created_idx'),
+            # Super-admin "pending requests" count only touches pending rows
+            models.Index(fields=['created_at'], condition=models.Q(is_approved=False), name='salon_pending_idx'),
+            # Nearby search: geohash prefix ranges. Not partial, because
+            # SQLite will not use a partial index for an OR of ranges
+            models.Index(fields=['geohash'], name='salon_geohash_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Never write back the counters this instance happened to load;
+            # a concurrent bump (say a feed link reset) would be undone
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name not in self.COUNTER_FIELDS
+            ]
+        elif update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geo.encode(self.latitude, self.longitude)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets platform metrics spot approval changes on save
+        if 'is_approved' in field_names:
+            instance._loaded_is_approved = instance.is_approved
+        # ...and owner changes, so the previous owner's cached salon is dropped
+        if 'owner_id' in field_names:
+            instance._loaded_owner_id = instance.owner_id
+        return instance
+
 class SalonPhoto(models.Model):
     salon = models.ForeignKey(
         Salon, 
@@ -28,6 +116,7 @@ class SalonPhoto(models.Model):
         related_name='photos'
     )
     image = models.ImageField(upload_to='salon_photos/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized derivatives, filled in by salon.images")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -37,6 +126,7 @@ class ServiceCategory(models.Model):
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Service Categories"
@@ -53,26 +143,110 @@ class Service(models.Model):
     duration = models.PositiveIntegerField(help_text="Duration in minutes")
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='service_images/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized derivatives, filled in by salon.images")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.salon.name}"
 
+class StaffQuerySet(models.QuerySet):
+    def working_on(self, *days):
+        # Staff working on any of the given days, filtered in SQL with a
+        # bitwise AND on the working_days mask
+        mask = days_to_mask(days)
+        return self.alias(working_days_hit=F('working_days').bitand(mask)).filter(working_days_hit__gt=0)
+
+
 class Staff(models.Model):
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='staff')
     name = models.CharField(max_length=150)
     role = models.CharField(max_length=100, help_text="e.g. Hairdresser, Makeup Artist")
     phone = models.CharField(max_length=20)
     photo = models.ImageField(upload_to='staff_photos/', null=True, blank=True)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized derivatives, filled in by salon.images")
     available_from = models.TimeField()
     available_to = models.TimeField()
-    working_days = models.CharField(max_length=100, help_text="Comma-separated days, e.g. Mon,Tue,Wed")
+    working_days = models.PositiveSmallIntegerField(default=0, help_text="Bitmask of working weekdays, bit 0 = Monday")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StaffQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "Staff"
 
     def __str__(self):
         return f"{self.name} ({self.role}) - {self.salon.name}"
+
+    @property
+    def working_day_codes(self):
+        return mask_to_days(self.working_days)
+
+    def works_on(self, day):
+        return bool(self.working_days & weekday_bit(day))
+
+
+class PlatformMetrics(models.Model):
+    """
+    Platform-wide daily rollup for the super-admin dashboard. Signups and
+    salon events are counted on the day they happen; booking figures are
+    keyed by appointment date like booking.SalonStats.
+    """
+    date = models.DateField(unique=True)
+    customer_signups = models.IntegerField(default=0)
+    owner_signups = models.IntegerField(default=0)
+    admin_signups = models.IntegerField(default=0)
+    salons_registered = models.IntegerField(default=0)
+    salon_approvals = models.IntegerField(default=0)
+    salon_revocations = models.IntegerField(default=0)
+    pending_bookings = models.IntegerField(default=0)
+    confirmed_bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    gross_booking_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Price of all non-cancelled bookings")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Platform metrics"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Platform metrics {self.date}"
+
+    @property
+    def signups(self):
+        return self.customer_signups + self.owner_signups + self.admin_signups
+
+    @property
+    def bookings(self):
+        return self.pending_bookings + self.confirmed_bookings + self.completed_bookings + self.cancelled_bookings
+
+
+class CatalogVersion(models.Model):
+    """
+    A single row bumped alongside every salon's catalog_version, so the
+    validators of listings any salon can appear in (the public salon list,
+    the catalog API) cost one primary-key read instead of an aggregate over
+    every salon.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+
+class UserAuthVersion(models.Model):
+    """
+    Bumped with every save of a user, in the same transaction, so all
+    processes stop using their cached snapshot of that user (see
+    salon.request_context) as soon as the change commits.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    version = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"Auth version {self.version} of user {self.user_id}"
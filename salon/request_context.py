@@ -0,0 +1,121 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject
+
+from .models import Salon, UserAuthVersion
+
+# Snapshots of the signed-in user and of the salon they own, so an
+# authenticated page view does not re-read either row from the database.
+# The user snapshot is keyed by the user's UserAuthVersion, bumped in the
+# same transaction as every save, so one primary-key read tells every
+# process whether its copy is current. It holds the session verification
+# hash but never the password hash. Signals drop the salon entries on
+# every save/delete; the timeout bounds how long a change made with
+# QuerySet.update() can go unnoticed.
+SNAPSHOT_TIMEOUT = 5 * 60
+_MISSING = object()
+
+
+def _user_key(user_id, version):
+    return f'auth:user:{user_id}:v{version}'
+
+
+def _owner_salon_key(user_id):
+    return f'auth:user:{user_id}:salon'
+
+
+def _snapshot_fields(User):
+    return [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def _take_snapshot(user):
+    values = [getattr(user, name) for name in _snapshot_fields(type(user))]
+    return values, user.get_session_auth_hash()
+
+
+def _from_snapshot(User, snapshot):
+    values, session_auth_hash = snapshot
+    # The password column is left deferred: anything that does need it (a
+    # password check, SECRET_KEY_FALLBACKS) loads it from the database
+    user = User.from_db('default', _snapshot_fields(User), values)
+    user.get_session_auth_hash = lambda: session_auth_hash
+    return user
+
+
+def bump_user_version(user_id):
+    """Retire every process's snapshot of this user; call inside the transaction that changes it."""
+    if not UserAuthVersion.objects.filter(user_id=user_id).update(version=F('version') + 1):
+        try:
+            with transaction.atomic():
+                UserAuthVersion.objects.create(user_id=user_id)
+        except IntegrityError:
+            # Created concurrently by another save of the same user
+            UserAuthVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+def cached_user(user_id):
+    """The User with this pk, from the cache when possible (None if it does not exist)."""
+    User = get_user_model()
+    version = UserAuthVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    if version is None:
+        # Deleted along with the user (or not created yet): nothing to reuse
+        return User._default_manager.filter(pk=user_id).first()
+    key = _user_key(user_id, version)
+    snapshot = cache.get(key, _MISSING)
+    if snapshot is _MISSING:
+        user = User._default_manager.filter(pk=user_id).first()
+        cache.set(key, None if user is None else _take_snapshot(user), SNAPSHOT_TIMEOUT)
+        return user
+    return None if snapshot is None else _from_snapshot(User, snapshot)
+
+
+def owner_salon(user):
+    """The salon `user` owns, from the cache when possible (None if they have none)."""
+    if not user.is_authenticated or user.user_type != 'salon_owner':
+        return None
+    key = _owner_salon_key(user.pk)
+    salon = cache.get(key, _MISSING)
+    if salon is _MISSING:
+        salon = Salon.objects.filter(owner_id=user.pk).first()
+        cache.set(key, salon, SNAPSHOT_TIMEOUT)
+    return salon
+
+
+def invalidate_owner_salon(user_id):
+    cache.delete(_owner_salon_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is served by cached_user()."""
+
+    def get_user(self, user_id):
+        user = cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class SalonContextMiddleware:
+    """
+    Sets request.salon to the signed-in owner's salon (None for everyone
+    else). Lazy, so pages that never look at it cost nothing. Runs natively
+    under ASGI too, so async views are not pushed onto a thread by it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.salon = SimpleLazyObject(lambda: owner_salon(request.user))
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
@@ -0,0 +1,133 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Salon, Service, ServiceCategory
+
+# Full-text index over salons and their catalog. On SQLite this is an FTS5
+# virtual table keyed by salon id (rowid); other backends fall back to a plain
+# filter so the list view keeps working.
+INDEX_TABLE = 'salon_search'
+MAX_RESULTS = 100
+
+# bm25 column weights: name, location, services, categories, description
+RANK_WEIGHTS = (10.0, 4.0, 5.0, 3.0, 1.0)
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+    "name, location, services, categories, description, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {INDEX_TABLE}"
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def reindex_sql(where):
+    salon = Salon._meta.db_table
+    service = Service._meta.db_table
+    category = ServiceCategory._meta.db_table
+    return (
+        f"INSERT INTO {INDEX_TABLE} (rowid, name, location, services, categories, description) "
+        f"SELECT s.id, s.name, s.location, "
+        f"COALESCE((SELECT group_concat(sv.name, ' ') FROM {service} sv WHERE sv.salon_id = s.id AND sv.is_active), ''), "
+        f"COALESCE((SELECT group_concat(c.name, ' ') FROM {category} c WHERE c.salon_id = s.id), ''), "
+        f"s.description "
+        f"FROM {salon} s {where}"
+    )
+
+
+def reindex_salons(salon_ids):
+    """Refresh the index rows for the given salons in two statements."""
+    if not is_enabled():
+        return
+    salon_ids = [int(pk) for pk in salon_ids if pk is not None]
+    if not salon_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(salon_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})", salon_ids)
+        cursor.execute(reindex_sql(f"WHERE s.id IN ({placeholders})"), salon_ids)
+
+
+def remove_salon(salon_id):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid = %s", [salon_id])
+
+
+def rebuild_index():
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+        cursor.execute(reindex_sql(''))
+
+
+def build_match_expression(query):
+    # Quote every word so user input can never be parsed as FTS5 syntax; the
+    # last word is a prefix match so partial words still find results.
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _matching_ids(match, limit):
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    salon = Salon._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {INDEX_TABLE}.rowid FROM {INDEX_TABLE} "
+            f"JOIN {salon} ON {salon}.id = {INDEX_TABLE}.rowid "
+            f"WHERE {INDEX_TABLE} MATCH %s AND {salon}.is_approved AND {salon}.is_active "
+            f"ORDER BY bm25({INDEX_TABLE}, {weights}) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query) | Q(location__icontains=query) | Q(description__icontains=query)
+        | Q(services__name__icontains=query, services__is_active=True) | Q(categories__name__icontains=query)
+    ).distinct()
+
+
+def _ranked(queryset, ids):
+    if not ids:
+        return queryset.none()
+    ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(ranking)
+
+
+def search_salons(queryset, query, limit=MAX_RESULTS):
+    """
+    Narrow `queryset` to salons matching `query`, best bm25 match first.
+    """
+    match = build_match_expression(query)
+    if not match:
+        return queryset.none()
+    if not is_enabled():
+        return _fallback_search(queryset, query)
+    return _ranked(queryset, _matching_ids(match, limit))
+
+
+async def asearch_salons(queryset, query, limit=MAX_RESULTS):
+    """search_salons() for async views; returns the same lazy queryset."""
+    match = build_match_expression(query)
+    if not match:
+        return queryset.none()
+    if not is_enabled():
+        return _fallback_search(queryset, query)
+    # Raw cursors have no async API; only the MATCH query runs on a thread
+    return _ranked(queryset, await sync_to_async(_matching_ids)(match, limit))
@@ -0,0 +1,85 @@
+from rest_framework import serializers
+
+from . import images
+from .models import Salon, ServiceCategory, Service, Staff
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients ask for a subset of fields with ?fields=id,name. Unknown
+    names are ignored; an empty selection returns every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    if request is None:
+        return set()
+    raw = request.query_params.get('fields', '')
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class VariantsField(serializers.ReadOnlyField):
+    """srcset strings for an image's resized derivatives, or null until they exist."""
+
+    def to_representation(self, variants):
+        if not variants.get('digest'):
+            return None
+        return {
+            'width': variants['width'],
+            'height': variants['height'],
+            'srcset': {ext: images.srcset(variants, ext) for ext in variants['formats']},
+        }
+
+
+class SalonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    logo_variants = VariantsField()
+    categories = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    # Only set on ?near= searches
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Salon
+        fields = (
+            'id', 'name', 'description', 'location', 'latitude', 'longitude', 'distance_km', 'contact_number',
+            'opening_time', 'closing_time', 'logo', 'logo_variants', 'categories',
+        )
+
+    def get_distance_km(self, salon):
+        return getattr(salon, 'distance_km', None)
+
+
+class ServiceCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ServiceCategory
+        fields = ('id', 'salon', 'name')
+
+
+class ServiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    image_variants = VariantsField()
+
+    class Meta:
+        model = Service
+        fields = (
+            'id', 'salon', 'category', 'category_name', 'name', 'description',
+            'price', 'duration', 'image', 'image_variants',
+        )
+
+
+class StaffSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    working_days = serializers.ListField(source='working_day_codes', read_only=True)
+    photo_variants = VariantsField()
+
+    class Meta:
+        model = Staff
+        fields = (
+            'id', 'salon', 'name', 'role', 'photo', 'photo_variants',
+            'available_from', 'available_to', 'working_days',
+        )
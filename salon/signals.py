@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog_cache, images, metrics, request_context, search
+from .models import Salon, SalonPhoto, Service, ServiceCategory, Staff
+
+
+# Keep the full-text search index in step with the catalog
+@receiver(post_save, sender=Salon)
+def index_salon(sender, instance, **kwargs):
+    search.reindex_salons([instance.pk])
+
+
+@receiver(post_delete, sender=Salon)
+def unindex_salon(sender, instance, **kwargs):
+    search.remove_salon(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=ServiceCategory)
+def reindex_catalog(sender, instance, **kwargs):
+    search.reindex_salons([instance.salon_id])
+
+
+# Any catalog edit makes that salon's cached public page stale
+@receiver([post_save, post_delete], sender=Salon)
+def invalidate_salon_catalog(sender, instance, **kwargs):
+    salon_id = instance.pk
+    transaction.on_commit(lambda: catalog_cache.invalidate_salon(salon_id))
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=ServiceCategory)
+@receiver([post_save, post_delete], sender=Staff)
+def invalidate_catalog_entries(sender, instance, **kwargs):
+    salon_id = instance.salon_id
+    transaction.on_commit(lambda: catalog_cache.invalidate_salon(salon_id))
+
+
+# Cached user and owner-salon snapshots used by the request fast path. The
+# version moves with the user row itself; a deleted user takes it along.
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    request_context.bump_user_version(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_salon_snapshot(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: request_context.invalidate_owner_salon(user_id))
+
+
+@receiver([post_save, post_delete], sender=Salon)
+def invalidate_owner_salon_snapshot(sender, instance, **kwargs):
+    owner_ids = {instance.owner_id, getattr(instance, '_loaded_owner_id', instance.owner_id)}
+    instance._loaded_owner_id = instance.owner_id
+
+    def invalidate():
+        for owner_id in owner_ids:
+            request_context.invalidate_owner_salon(owner_id)
+
+    transaction.on_commit(invalidate)
+
+
+# Resize new uploads in the background worker pool
+@receiver(post_save, sender=Salon)
+@receiver(post_save, sender=SalonPhoto)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Staff)
+def queue_image_derivatives(sender, instance, **kwargs):
+    for label, field_name in images.IMAGE_FIELDS:
+        if label == sender._meta.label and images.needs_refresh(instance, field_name):
+            images.schedule(instance, field_name)
+
+
+# Platform-wide rollups for the super-admin dashboard
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_signup(sender, instance, created, **kwargs):
+    field = metrics.SIGNUP_FIELDS.get(instance.user_type)
+    if created and field:
+        metrics.record(timezone.localdate(instance.date_joined), **{field: 1})
+
+
+@receiver(post_save, sender=Salon)
+def count_salon_events(sender, instance, created, **kwargs):
+    was_approved = getattr(instance, '_loaded_is_approved', False)
+    if created:
+        metrics.record(salons_registered=1)
+    if instance.is_approved and not was_approved:
+        metrics.record(salon_approvals=1)
+    elif was_approved and not instance.is_approved:
+        metrics.record(salon_revocations=1)
+    instance._loaded_is_approved = instance.is_approved
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def uncount_signup(sender, instance, **kwargs):
+    field = metrics.SIGNUP_FIELDS.get(instance.user_type)
+    if field:
+        metrics.record(timezone.localdate(instance.date_joined), **{field: -1})
+
+
+@receiver(post_delete, sender=Salon)
+def uncount_salon(sender, instance, **kwargs):
+    metrics.record(timezone.localdate(instance.created_at), salons_registered=-1)
+    if instance.is_approved:
+        metrics.record(salon_revocations=1)
@@ -0,0 +1,38 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from salon import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(fieldfile, sizes, alt='', **attrs):
+    """
+    Render an uploaded image as a <picture> with WebP and JPEG srcsets.
+    `sizes` is the rendered width, e.g. "50px" or "(max-width: 600px) 100vw, 300px".
+    Falls back to the original file until its derivatives have been built.
+    """
+    if not fieldfile:
+        return ''
+    variants = getattr(fieldfile.instance, images.variants_field(fieldfile.field.name), None) or {}
+    attrs = {key.replace('_', '-'): value for key, value in attrs.items()}
+    attrs.update(alt=alt, loading=attrs.get('loading', 'lazy'), decoding='async')
+    if not variants.get('digest') or variants.get('source') != fieldfile.name:
+        return format_html('<img src="{}"{}>', fieldfile.url, flatatt(attrs))
+
+    jpeg = images.variant_urls(variants, 'jpg')
+    # The smallest derivative at least 320px wide is a sensible src for
+    # browsers that ignore srcset
+    fallback = next((url for width, url in jpeg if width >= 320), jpeg[-1][1])
+    largest = variants['widths'][-1]
+    attrs.update(width=largest, height=round(variants['height'] * largest / variants['width']))
+    return format_html(
+        '<picture style="display: contents;">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        '</picture>',
+        images.srcset(variants, 'webp'), sizes,
+        fallback, images.srcset(variants, 'jpg'), sizes, flatatt(attrs),
+    )
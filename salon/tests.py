@@ -1,3 +1,687 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from openpyxl import Workbook
+from PIL import Image
+
+from booking.models import Booking
+from booking.transitions import transition_bookings
+from . import catalog_cache, geo, images, imports, metrics, request_context, search
+from .management.commands import geocode_salons
+from .models import (
+    EVERY_DAY, CatalogVersion, PlatformMetrics, Salon, Service, ServiceCategory, Staff, UserAuthVersion, days_to_mask, mask_to_days,
+)
+
+User = get_user_model()
+
+
+def make_owner(n=0):
+    return User.objects.create_user(
+        username=f'owner{n}@example.com', email=f'owner{n}@example.com',
+        password='pass', user_type='salon_owner', phone_number=f'98000000{n:02d}',
+    )
+
+
+def make_salon(owner, **kwargs):
+    fields = dict(
+        name='Glow', description='Hair and beauty', location='Kathmandu', contact_number='01-0000000',
+        opening_time=time(9), closing_time=time(18), is_approved=True,
+    )
+    fields.update(kwargs)
+    return Salon.objects.create(owner=owner, **fields)
+
+
+class StaffWorkingDaysTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = make_salon(make_owner())
+        cls.weekdays = cls.staff('Asha', days_to_mask(['Mon', 'Tue', 'Wed', 'Thu', 'Fri']))
+        cls.weekends = cls.staff('Bina', days_to_mask(['Sat', 'Sun']))
+        cls.always = cls.staff('Chandra', EVERY_DAY)
+        cls.never = cls.staff('Dipa', 0)
+
+    @classmethod
+    def staff(cls, name, mask):
+        return Staff.objects.create(
+            salon=cls.salon, name=name, role='Stylist', phone='9800000000',
+            available_from=time(9), available_to=time(18), working_days=mask,
+        )
+
+    def test_mask_round_trip(self):
+        self.assertEqual(days_to_mask(['mon', 'Wednesday', 'Sun']), 0b1000101)
+        self.assertEqual(mask_to_days(0b1000101), ['Mon', 'Wed', 'Sun'])
+        self.assertEqual(days_to_mask([date(2026, 10, 17)]), 1 << 5)  # a Saturday
+
+    def test_working_on_filters_in_sql(self):
+        def names(*days):
+            return sorted(Staff.objects.working_on(*days).values_list('name', flat=True))
+
+        saturday, monday = date(2026, 10, 17), date(2026, 10, 19)
+        self.assertEqual(names(saturday), ['Bina', 'Chandra'])
+        self.assertEqual(names(monday), ['Asha', 'Chandra'])
+        self.assertEqual(names(saturday, monday), ['Asha', 'Bina', 'Chandra'])
+        self.assertNotIn('Dipa', names(*[date(2026, 10, d) for d in range(12, 19)]))
+
+    def test_works_on(self):
+        self.assertTrue(self.weekends.works_on('Sat'))
+        self.assertFalse(self.weekends.works_on(date(2026, 10, 19)))
+        self.assertEqual(self.weekdays.working_day_codes, ['Mon', 'Tue', 'Wed', 'Thu', 'Fri'])
+
+
+@skipUnless(connection.vendor == 'sqlite', "The FTS5 index is SQLite specific")
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bridal = make_salon(make_owner(1), name='Bridal Studio', description='Wedding makeup and mehendi')
+        cls.glow = make_salon(make_owner(2), name='Glow Salon', location='Pokhara', description='Bridal packages too')
+        cls.hidden = make_salon(make_owner(3), name='Bridal Hidden', is_approved=False)
+        category = ServiceCategory.objects.create(salon=cls.glow, name='Nails')
+        cls.manicure = Service.objects.create(salon=cls.glow, category=category, name='Gel manicure', price=900, duration=45)
+
+    def names(self, query):
+        return [salon.name for salon in search.search_salons(Salon.objects.all(), query)]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.names('bridal'), ['Bridal Studio', 'Glow Salon'])
+
+    def test_prefix_diacritics_and_catalog_columns(self):
+        self.assertEqual(self.names('mehen'), ['Bridal Studio'])
+        self.assertEqual(self.names('pókhara'), ['Glow Salon'])
+        self.assertEqual(self.names('manicure'), ['Glow Salon'])
+        self.assertEqual(self.names('nails'), ['Glow Salon'])
+
+    def test_catalog_edits_update_the_index(self):
+        self.manicure.name = 'Pedicure'
+        self.manicure.save()
+        self.assertEqual(self.names('manicure'), [])
+        self.assertEqual(self.names('pedicure'), ['Glow Salon'])
+        self.glow.delete()
+        self.assertEqual(self.names('pedicure'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.names('bridal OR "'), [])
+        self.assertEqual(self.names('name:glow'), [])
+        self.assertEqual(self.names('  ?! '), [])
+
+
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salons = [make_salon(make_owner(n), name=f'Salon {n}') for n in range(5)]
+        for salon in cls.salons:
+            for name in ('Hair', 'Nails'):
+                ServiceCategory.objects.create(salon=salon, name=name)
+        make_salon(make_owner(9), name='Hidden', is_approved=False)
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_pages_follow_the_cursor_with_a_fixed_query_count(self):
+        url = reverse('catalog_api:salon-list') + '?page_size=2'
+        names = []
+        while url:
+            # Catalog state, the salons, and their categories
+            with self.assertNumQueries(3):
+                page = self.get(url).json()
+            names += [salon['name'] for salon in page['results']]
+            self.assertEqual([c for s in page['results'] for c in s['categories']], ['Hair', 'Nails'] * len(page['results']))
+            url = page['next']
+        self.assertEqual(names, [f'Salon {n}' for n in range(5)])
+
+    def test_fields_selects_columns_and_skips_the_prefetch(self):
+        url = reverse('catalog_api:salon-list') + '?fields=id,name'
+        with self.assertNumQueries(2):
+            results = self.get(url).json()['results']
+        self.assertEqual(set(results[0]), {'id', 'name'})
+
+    def test_not_modified_until_the_catalog_changes(self):
+        url = reverse('catalog_api:category-list') + f'?salon={self.salons[0].pk}'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceCategory.objects.create(salon=self.salons[1], name='Spa')
+        response = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # The validators are one primary-key read, however many salons exist
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+
+        # What another process's invalidate_salon() leaves behind: the
+        # database row changes, this process's cache does not
+        CatalogVersion.objects.update(version=F('version') + 1)
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 200)
+
+
+class PublicPageValidatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.glow = make_salon(make_owner(1), name='Glow Salon')
+        category = ServiceCategory.objects.create(salon=cls.glow, name='Hair')
+        cls.cut = Service.objects.create(salon=cls.glow, category=category, name='Classic cut', price=500, duration=30)
+        cls.pending = make_salon(make_owner(2), name='Pending Studio', is_approved=False)
+        # Far enough back that a change in this test moves Last-Modified
+        Salon.objects.update(catalog_updated_at=F('catalog_updated_at') - timedelta(hours=1))
+        CatalogVersion.objects.update(updated_at=F('updated_at') - timedelta(hours=1))
+
+    def setUp(self):
+        # Ids and catalog versions repeat between tests, and so would the keys
+        cache.clear()
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_approving_a_salon_ends_the_list_304(self):
+        url = reverse('salon:public_salon_list')
+        response = self.get(url)
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.assertNotContains(response, 'Pending Studio')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+        self.assertEqual(self.get(url, if_modified_since=modified).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pending.is_approved = True
+            self.pending.save()
+        self.assertContains(self.get(url, if_none_match=etag), 'Pending Studio')
+        self.assertEqual(self.get(url, if_modified_since=modified).status_code, 200)
+
+    def test_catalog_fragment_follows_the_row_version(self):
+        url = reverse('salon:public_salon_detail', args=[self.glow.pk])
+        etag = self.get(url)['ETag']
+        # A write that reached the database but not this process's cache
+        Service.objects.filter(pk=self.cut.pk).update(name='Layered cut')
+        self.assertContains(self.get(url), 'Classic cut')
+        Salon.objects.filter(pk=self.glow.pk).update(catalog_version=F('catalog_version') + 1)
+        response = self.get(url, if_none_match=etag)
+        self.assertContains(response, 'Layered cut')
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='c@example.com', email='c@example.com', password='old-pass')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def snapshot_key(self):
+        version = UserAuthVersion.objects.get(user=self.user).version
+        return f'auth:user:{self.user.pk}:v{version}'
+
+    def test_snapshot_costs_one_query_and_keeps_no_password(self):
+        request_context.cached_user(self.user.pk)
+        with self.assertNumQueries(1):
+            user = request_context.cached_user(self.user.pk)
+        self.assertEqual((user.pk, user.email, user.user_type), (self.user.pk, 'c@example.com', 'customer'))
+        self.assertNotIn(self.user.password, repr(cache.get(self.snapshot_key())))
+        # Still usable for a password check, loaded on demand
+        self.assertTrue(user.check_password('old-pass'))
+
+    def test_password_change_ends_existing_sessions(self):
+        url = reverse('booking:my_bookings')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        old_key = self.snapshot_key()
+
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-pass')
+        user.save()
+        # The old snapshot is not deleted (another process would not see
+        # that anyway); the version in the database retires it
+        self.assertIsNotNone(cache.get(old_key))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(settings.LOGIN_URL))
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = make_salon(make_owner())
+        cls.hair = ServiceCategory.objects.create(salon=cls.salon, name='Hair')
+        Service.objects.create(salon=cls.salon, category=cls.hair, name='Blow dry', price=300, duration=20)
+
+    def csv(self, *lines):
+        return SimpleUploadedFile('catalog.csv', '\n'.join(lines).encode('utf-8-sig'), content_type='text/csv')
+
+    def xlsx(self, *rows):
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        buffer = BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile('staff.xlsx', buffer.getvalue())
+
+    def test_services_csv_is_all_or_nothing_with_sheet_row_numbers(self):
+        header = 'Category,Name,Price,Duration,Description,Is Active'
+        created, errors = imports.import_services(self.salon, self.csv(
+            header,
+            'hair,Keratin treatment,4500,120,,yes',
+            'Nails,Gel polish,abc,30,,',
+            ',,,,,',
+            'Hair,blow dry,300,20,,',
+            'Nails,Gel polish,900,30,,maybe',
+            'Nails,Gel polish,900,30,,',
+        ))
+        self.assertEqual(created, 0)
+        self.assertEqual(sorted(errors), [3, 5, 6, 7])
+        self.assertTrue(errors[3][0].startswith('price:'))
+        self.assertIn('already exists in Hair', errors[5][0])
+        self.assertEqual(errors[6], ["is_active: 'maybe' is not yes/no."])
+        self.assertIn('appears twice', errors[7][0])
+        self.assertEqual(Service.objects.filter(salon=self.salon).count(), 1)
+        self.assertFalse(ServiceCategory.objects.filter(name='Nails').exists())
+
+    def test_services_import_updates_the_search_index_and_catalog(self):
+        version = self.salon.catalog_version
+        with self.captureOnCommitCallbacks(execute=True):
+            created, errors = imports.import_services(self.salon, self.csv(
+                'category,name,price,duration',
+                'hair,Keratin treatment,4500,120',
+                'Nails,Gel polish,900,30',
+            ))
+        self.assertEqual((created, errors), (2, {}))
+        self.assertEqual(
+            sorted(Service.objects.filter(salon=self.salon).values_list('category__name', 'name')),
+            [('Hair', 'Blow dry'), ('Hair', 'Keratin treatment'), ('Nails', 'Gel polish')],
+        )
+        self.salon.refresh_from_db()
+        self.assertGreater(self.salon.catalog_version, version)
+        found = search.search_salons(Salon.objects.all(), 'keratin')
+        self.assertEqual([salon.pk for salon in found], [self.salon.pk])
+
+    def test_staff_xlsx(self):
+        header = ('Name', 'Role', 'Phone', 'Available From', 'Available To', 'Working Days')
+        created, errors = imports.import_staff(self.salon, self.xlsx(
+            header,
+            ('Asha', 'Stylist', '9800000001', time(9), time(17), 'Mon, Tue'),
+            ('Bina', 'Stylist', '9800000002', time(9), None, 'Funday'),
+        ))
+        self.assertEqual(created, 0)
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(errors[3][0], "working_days: 'Funday' is not a weekday.")
+        self.assertTrue(errors[3][1].startswith('available_to:'))
+        self.assertFalse(Staff.objects.filter(salon=self.salon).exists())
+
+        version = self.salon.catalog_version
+        with self.captureOnCommitCallbacks(execute=True):
+            created, errors = imports.import_staff(self.salon, self.xlsx(
+                header,
+                ('Asha', 'Stylist', '9800000001', time(9), time(17), 'Mon, Tue'),
+                ('Bina', 'Colourist', '9800000002', '10:00', '18:00', 'saturday;sun'),
+            ))
+        self.assertEqual((created, errors), (2, {}))
+        self.assertEqual(
+            sorted(Staff.objects.filter(salon=self.salon).values_list('name', 'working_days', 'available_from')),
+            [('Asha', 0b11, time(9)), ('Bina', 0b1100000, time(10))],
+        )
+        self.salon.refresh_from_db()
+        self.assertGreater(self.salon.catalog_version, version)
+
+    def test_unreadable_uploads(self):
+        with self.assertRaisesMessage(imports.UploadError, 'Missing column(s): duration.'):
+            imports.import_services(self.salon, self.csv('category,name,price', 'Hair,Cut,500'))
+        with self.assertRaisesMessage(imports.UploadError, '.csv or .xlsx'):
+            imports.import_services(self.salon, SimpleUploadedFile('catalog.txt', b'a,b'))
+
+
+# Kathmandu Durbar Square and places at roughly known distances from it
+KATHMANDU = (27.7043, 85.3074)
+
+
+class NearbySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salons = {
+            name: make_salon(make_owner(n), name=name, latitude=lat, longitude=lng)
+            for n, (name, lat, lng) in enumerate((
+                ('Thamel', 27.7154, 85.3123),      # 1.3 km
+                ('Patan', 27.6727, 85.3250),       # 3.9 km
+                ('Bhaktapur', 27.6710, 85.4298),   # 12.6 km
+                ('Pokhara', 28.2096, 83.9856),     # 143 km
+            ))
+        }
+        make_salon(make_owner(4), name='Unlocated')
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, salons):
+        return [salon.name for salon in salons]
+
+    def test_radius_and_distance_order(self):
+        salons = geo.nearby(Salon.objects.all(), *KATHMANDU, radius_km=10)
+        self.assertEqual(self.names(salons), ['Thamel', 'Patan'])
+        self.assertAlmostEqual(salons[0].distance_km, 1.33, delta=0.05)
+        self.assertAlmostEqual(salons[1].distance_km, 3.92, delta=0.05)
+        self.assertEqual(self.names(geo.nearby(Salon.objects.all(), *KATHMANDU, radius_km=2)), ['Thamel'])
+        # The radius is capped, so Pokhara is never reached from Kathmandu
+        self.assertEqual(
+            self.names(geo.nearby(Salon.objects.all(), *KATHMANDU, radius_km=500)),
+            ['Thamel', 'Patan', 'Bhaktapur'],
+        )
+        self.assertEqual(self.names(geo.nearby(Salon.objects.all(), *KATHMANDU, radius_km=50, limit=2)), ['Thamel', 'Patan'])
+
+    def test_search_box_crossing_cell_boundaries(self):
+        # The equator and the prime meridian split the geohash space at its
+        # first character, so these four share no prefix at all
+        corners = [
+            make_salon(make_owner(n), name=name, latitude=lat, longitude=lng)
+            for n, (name, lat, lng) in enumerate(
+                (('NE', 0.01, 0.01), ('NW', 0.01, -0.02), ('SE', -0.02, 0.01), ('SW', -0.03, -0.03)), start=5,
+            )
+        ]
+        self.assertEqual(len({salon.geohash[0] for salon in corners}), 4)
+        self.assertGreater(len(geo.covering_prefixes(geo.bounding_box(0, 0, 5))), 1)
+        salons = geo.nearby(Salon.objects.all(), 0, 0, radius_km=5)
+        self.assertEqual(self.names(salons), ['NE', 'NW', 'SE', 'SW'])
+
+        # Same answer as measuring every salon, near a finer cell edge too
+        lat_step, _ = geo.cell_size(5)
+        edge = (KATHMANDU[0] // lat_step) * lat_step
+        for point in ((0, 0), (edge, KATHMANDU[1]), KATHMANDU):
+            for radius in (1, 4, 15):
+                expected = sorted(
+                    (geo.haversine_km(*point, salon.latitude, salon.longitude), salon.name)
+                    for salon in Salon.objects.filter(latitude__isnull=False)
+                )
+                expected = [name for distance, name in expected if distance <= radius]
+                self.assertEqual(self.names(geo.nearby(Salon.objects.all(), *point, radius_km=radius)), expected)
+
+    def test_public_list_near_a_point(self):
+        response = self.client.get(reverse('salon:public_salon_list'), {'near': '%s,%s' % KATHMANDU, 'radius': '5'})
+        self.assertEqual(self.names(response.context['salons']), ['Thamel', 'Patan'])
+        response = self.client.get(reverse('salon:public_salon_list'), {'near': 'nowhere'})
+        self.assertEqual(len(response.context['salons']), 5)
+
+
+class GeocodeSalonsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.thamel = make_salon(make_owner(0), name='A', location='Thamel, Kathmandu')
+        self.patan = make_salon(make_owner(1), name='B', location='Lalitpur / Patan')
+        make_salon(make_owner(2), name='C', location='Somewhere Else')
+
+    def write(self, name, text):
+        path = f'{self.directory}/{name}'
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def geocode(self, *args):
+        out = StringIO()
+        call_command('geocode_salons', *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_gazetteer(self):
+        path = self.write('places.csv', (
+            'Name,Latitude,Longitude,Population\n'
+            'Thamel,27.7154,85.3123,\n'
+            'Patan,1.0,2.0,10\n'
+            'Patan,27.6727,85.3250,200000\n'
+            'Broken,north,east,\n'
+        ))
+        self.assertEqual(len(geocode_salons.load_gazetteer(path)), 2)
+
+        output = self.geocode(path, '--dry-run')
+        self.assertIn('Would locate 2 salon(s).', output)
+        self.assertFalse(Salon.objects.filter(latitude__isnull=False).exists())
+
+        version = self.thamel.catalog_version
+        output = self.geocode(path)
+        self.assertIn('Located 2 salon(s).', output)
+        self.assertIn("no match for 'Somewhere Else' (1 salon(s))", output)
+        self.thamel.refresh_from_db()
+        self.patan.refresh_from_db()
+        self.assertEqual((self.thamel.latitude, self.thamel.longitude), (27.7154, 85.3123))
+        # The more populous of the two places called Patan wins
+        self.assertEqual((self.patan.latitude, self.patan.longitude), (27.6727, 85.3250))
+        self.assertEqual(self.patan.geohash, geo.encode(27.6727, 85.3250))
+        self.assertGreater(self.thamel.catalog_version, version)
+        self.assertEqual([salon.pk for salon in geo.nearby(Salon.objects.all(), *KATHMANDU, radius_km=2)], [self.thamel.pk])
+
+        # Located salons are left alone unless --all is given
+        self.assertIn('Located 0 salon(s).', self.geocode(path))
+
+    def test_geonames_dump(self):
+        def row(name, alternates, lat, lng, population):
+            columns = ['1', name, name, alternates, lat, lng] + [''] * 8 + [population, '', '', 'Asia/Kathmandu', '2024-01-01']
+            return '\t'.join(columns) + '\n'
+
+        path = self.write('NP.txt', row('Lalitpur', 'Patan,Yala', '27.6667', '85.3167', '220802') + 'short\trow\n')
+        self.assertIn('Located 1 salon(s).', self.geocode(path))
+        self.patan.refresh_from_db()
+        self.assertEqual((self.patan.latitude, self.patan.longitude), (27.6667, 85.3167))
+
+    def test_unreadable_gazetteer(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot read gazetteer'):
+            self.geocode(f'{self.directory}/missing.csv')
+        with self.assertRaisesMessage(CommandError, 'name, latitude and longitude'):
+            self.geocode(self.write('bad.csv', 'place,lat,lng\nThamel,1,2\n'))
+
+
+class CatalogRebuildTests(SimpleTestCase):
+    key = 'test:catalog'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_entry_is_served_while_another_process_rebuilds(self):
+        build = mock.Mock(return_value='fresh')
+        cache.set(self.key, (time_module.time() - 1, 'stale'), 60)
+        cache.add(f'{self.key}:lock', 1)
+        self.assertEqual(catalog_cache._get_or_build(self.key, build), 'stale')
+        build.assert_not_called()
+
+        cache.delete(f'{self.key}:lock')
+        self.assertEqual(catalog_cache._get_or_build(self.key, build), 'fresh')
+        self.assertEqual(catalog_cache._get_or_build(self.key, build), 'fresh')
+        build.assert_called_once()
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+
+    def test_only_one_caller_rebuilds_a_missing_entry(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time_module.sleep(0.3)
+            return 'built'
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda _: catalog_cache._get_or_build(self.key, build), range(6)))
+        self.assertEqual(results, ['built'] * 6)
+        self.assertEqual(len(calls), 1)
+
+    def test_waiters_build_themselves_once_the_wait_runs_out(self):
+        cache.add(f'{self.key}:lock', 1)
+        build = mock.Mock(return_value='built')
+        with mock.patch.object(catalog_cache, 'REBUILD_WAIT', 0.1):
+            self.assertEqual(catalog_cache._get_or_build(self.key, build), 'built')
+        build.assert_called_once()
+
+    def test_failed_rebuild_releases_the_lock(self):
+        with self.assertRaises(ValueError):
+            catalog_cache._get_or_build(self.key, mock.Mock(side_effect=ValueError))
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+
+
+class CatalogInvalidationTests(TestCase):
+    """Catalog edits reach the public pages and the API through the model signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = make_salon(make_owner())
+        cls.category = ServiceCategory.objects.create(salon=cls.salon, name='Hair')
+        cls.service = Service.objects.create(salon=cls.salon, category=cls.category, name='Classic cut', price=500, duration=30)
+        cls.staff = Staff.objects.create(
+            salon=cls.salon, name='Asha', role='Stylist', phone='9800000002',
+            available_from=time(9), available_to=time(18), working_days=EVERY_DAY,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        api = {kind: reverse(f'catalog_api:{kind}-list') + f'?salon={self.salon.pk}' for kind in ('category', 'service', 'staff')}
+        return dict(
+            api,
+            listing=reverse('salon:public_salon_list'),
+            detail=reverse('salon:public_salon_detail', args=[self.salon.pk]),
+        )
+
+    def assertChanges(self, change, **expected):
+        """`change` moves every validator, and each page then shows its expected text."""
+        before = {name: self.client.get(url)['ETag'] for name, url in self.urls().items()}
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        for name, url in self.urls().items():
+            response = self.client.get(url, headers={'if-none-match': before[name]})
+            self.assertEqual(response.status_code, 200, name)
+            if name in expected:
+                self.assertContains(response, expected[name])
+
+    def test_service_edit_and_delete(self):
+        def rename():
+            self.service.name = 'Layered cut'
+            self.service.save()
+
+        self.assertChanges(rename, detail='Layered cut', service='Layered cut')
+        self.assertEqual(
+            [salon.pk for salon in self.client.get(reverse('salon:public_salon_list'), {'q': 'layered'}).context['salons']],
+            [self.salon.pk],
+        )
+        self.assertChanges(self.service.delete)
+        self.assertNotContains(self.client.get(self.urls()['detail']), 'Layered cut')
+        self.assertEqual(self.client.get(self.urls()['service']).json()['results'], [])
+
+    def test_staff_edit_and_delete(self):
+        def rename():
+            self.staff.name = 'Bina'
+            self.staff.save()
+
+        self.assertChanges(rename, detail='Bina', staff='Bina')
+        self.assertChanges(self.staff.delete)
+        self.assertNotContains(self.client.get(self.urls()['detail']), 'Bina')
+        self.assertEqual(self.client.get(self.urls()['staff']).json()['results'], [])
+
+    def test_category_edit_and_delete(self):
+        def rename():
+            self.category.name = 'Hair and colour'
+            self.category.save()
+
+        self.assertChanges(rename, detail='Hair and colour', category='Hair and colour')
+        self.assertChanges(self.category.delete)
+        self.assertEqual(self.client.get(self.urls()['category']).json()['results'], [])
+
+
+class PlatformMetricsTests(TestCase):
+    """The incrementally kept platform rollup must equal a recount."""
+    # Approvals and revocations are counted when they happen, which a recount
+    # cannot know, so only these columns are comparable
+    FIELDS = (
+        'customer_signups', 'owner_signups', 'salons_registered',
+        'pending_bookings', 'confirmed_bookings', 'completed_bookings', 'cancelled_bookings',
+        'gross_booking_value',
+    )
+
+    def snapshot(self):
+        rows = PlatformMetrics.objects.order_by('date').values_list('date', *self.FIELDS)
+        return [row for row in rows if any(row[1:])]
+
+    def assertMatchesRecount(self):
+        kept = self.snapshot()
+        metrics.rebuild()
+        self.assertEqual(kept, self.snapshot())
+        return kept
+
+    def make_activity(self):
+        salon = make_salon(make_owner())
+        category = ServiceCategory.objects.create(salon=salon, name='Hair')
+        service = Service.objects.create(salon=salon, category=category, name='Cut', price=500, duration=30)
+        customers = [User.objects.create_user(username=f'c{i}@example.com', password='pass') for i in range(3)]
+        bookings = [
+            Booking.objects.create(customer=customer, salon=salon, service=service, date=date(2026, 3, day), time=time(10))
+            for customer in customers for day in (1, 2)
+        ]
+        return salon, customers, bookings
+
+    def test_create_change_and_delete(self):
+        salon, customers, bookings = self.make_activity()
+        self.assertMatchesRecount()
+
+        transition_bookings(salon, [b.pk for b in bookings[:3]], 'CONFIRMED')
+        transition_bookings(salon, [bookings[0].pk], 'COMPLETED')
+        bookings[4].status = 'CANCELLED'
+        bookings[4].save()
+        kept = self.assertMatchesRecount()
+        self.assertEqual(sum(row[-1] for row in kept), 500 * 5)
+
+        bookings[1].delete()
+        customers[2].delete()
+        self.assertMatchesRecount()
+
+    def test_backfill_migration_fills_an_empty_table(self):
+        self.make_activity()
+        PlatformMetrics.objects.filter(date=date.today()).update(salon_revocations=2)
+        kept = self.snapshot()
+        PlatformMetrics.objects.exclude(date=date.today()).delete()
+        PlatformMetrics.objects.filter(date=date.today()).update(**{field: 0 for field in self.FIELDS})
+        migration = import_module('salon.migrations.0012_backfill_platform_metrics')
+        migration.backfill_platform_metrics(apps, None)
+        self.assertEqual(self.snapshot(), kept)
+        self.assertEqual(PlatformMetrics.objects.get(date=date.today()).salon_revocations, 2)
+
+
+class ImageDerivativeTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), (200, 80, 120)).save(buffer, 'PNG')
+        self.upload = ContentFile(buffer.getvalue(), name='logo.png')
+
+    def test_sizes_never_upscale(self):
+        manifest = images.build_derivatives(self.upload)
+        self.assertEqual(manifest['widths'], [160, 320, 400])
+        with default_storage.open(images.derivative_name(manifest['digest'], 160, 'webp')) as file:
+            self.assertEqual(Image.open(file).size, (160, 80))
+
+    def test_force_encodes_existing_copies_again(self):
+        digest = images.build_derivatives(self.upload)['digest']
+        name = images.derivative_name(digest, 320, 'jpg')
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(b'damaged'))
+
+        images.build_derivatives(self.upload)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), b'damaged')
+
+        images.build_derivatives(self.upload, force=True)
+        with default_storage.open(name) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Async variants of the public pages when serving over ASGI (SERVER_INTERFACE)
+if settings.ASYNC_VIEWS:
+    salon_list_view, salon_detail_view = views.AsyncPublicSalonListView, views.AsyncPublicSalonDetailView
+else:
+    salon_list_view, salon_detail_view = views.PublicSalonListView, views.PublicSalonDetailView
+
 app_name = 'salon'
 
 urlpatterns = [
@@ -25,6 +32,7 @@ urlpatterns = [
     path('services/add/', views.ServiceCreateView.as_view(), name='service_create'),
     path('services/<int:pk>/edit/', views.ServiceUpdateView.as_view(), name='service_edit'),
     path('services/<int:pk>/delete/', views.ServiceDeleteView.as_view(), name='service_delete'),
+    path('services/import/', views.CatalogImportView.as_view(kind='services'), name='service_import'),
 
     # Staff Management
     path('staff/', views.StaffListView.as_view(), name='staff_list'),
@@ -32,8 +40,9 @@ urlpatterns = [
     path('staff/<int:pk>/edit/', views.StaffUpdateView.as_view(), name='staff_edit'),
     path('staff/<int:pk>/delete/', views.StaffDeleteView.as_view(), name='staff_delete'),
     path('staff/<int:pk>/delete/', views.StaffDeleteView.as_view(), name='staff_delete'),
+    path('staff/import/', views.CatalogImportView.as_view(kind='staff'), name='staff_import'),
 
     # Public Customer Views
-    path('salons/', views.PublicSalonListView.as_view(), name='public_salon_list'),
-    path('salons/<int:pk>/', views.PublicSalonDetailView.as_view(), name='public_salon_detail'),
+    path('salons/', salon_list_view.as_view(), name='public_salon_list'),
+    path('salons/<int:pk>/', salon_detail_view.as_view(), name='public_salon_detail'),
 ]
@@ -1,12 +1,24 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import CreateView, UpdateView, DetailView, ListView, View
+import hashlib
+
+from django.conf import settings
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.http import Http404
+from django.contrib.messages import get_messages
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.generic import CreateView, UpdateView, DetailView, FormView, ListView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from .models import Salon, SalonPhoto, ServiceCategory, Service, Staff
-from .forms import SalonRegistrationForm, ServiceCategoryForm, ServiceForm, StaffForm
-from booking.models import Booking
+from .forms import CatalogImportForm, SalonRegistrationForm, ServiceCategoryForm, ServiceForm, StaffForm
+from . import catalog_cache, geo, imports, metrics, search
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from booking import stats
+from booking.pagination import KeysetPage
 
 User = get_user_model()
 
@@ -15,6 +27,13 @@ class SalonOwnerRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_authenticated and self.request.user.user_type == 'salon_owner'
 
+    def get_salon(self):
+        # Cached snapshot set by SalonContextMiddleware; use it to scope
+        # queries, and load the row itself before editing the salon
+        if not self.request.salon:
+            raise Http404("No salon is registered for this account.")
+        return self.request.salon
+
 # Mixin to ensure only Super Admins (or staff) can access administration pages
 class SuperAdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
@@ -29,7 +48,7 @@ class SalonRegisterView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView)
 
     # If they already have a salon, don't let them register another one
     def dispatch(self, request, *args, **kwargs):
-        if request.user.is_authenticated and Salon.objects.filter(owner=request.user).exists():
+        if request.salon:
             return redirect('salon:dashboard')
         return super().dispatch(request, *args, **kwargs)
 
@@ -38,6 +57,11 @@ class SalonRegisterView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView)
         messages.success(self.request, "Salon registration submitted! Please wait for administrative approval.")
         return super().form_valid(form)
 
+def _count_for_salon(queryset):
+    # Correlated COUNT(*) subquery for use in Salon annotations
+    counts = queryset.filter(salon=OuterRef('pk')).order_by().values('salon').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
 # Private dashboard for Salon Owners
 class SalonDashboardView(LoginRequiredMixin, SalonOwnerRequiredMixin, DetailView):
     model = Salon
@@ -62,14 +86,24 @@ class SalonDashboardView(LoginRequiredMixin, SalonOwnerRequiredMixin, DetailView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         salon = self.object
-        context['total_bookings_count'] = salon.bookings.count()
-        context['active_services_count'] = salon.services.filter(is_active=True).count()
-        context['staff_count'] = salon.staff.count()
-        context['recent_bookings'] = salon.bookings.all().order_by('-created_at')[:5]
+        # Booking figures come from the SalonStats rollup instead of COUNTs
+        # over the bookings table
+        totals = stats.salon_totals(salon)
+        context['stats'] = totals
+        context['total_bookings_count'] = totals['total_count']
+        context['active_services_count'] = salon.active_services_count
+        context['staff_count'] = salon.staff_count
+        context['daily_trend'] = stats.daily_trend(salon)
+        context['recent_bookings'] = salon.bookings.select_related('customer', 'service').order_by('-created_at')[:5]
         return context
 
     def get_object(self, queryset=None):
-        return get_object_or_404(Salon, owner=self.request.user)
+        # Service and staff counts ride along with the salon row
+        queryset = Salon.objects.annotate(
+            active_services_count=_count_for_salon(Service.objects.filter(is_active=True)),
+            staff_count=_count_for_salon(Staff.objects.all()),
+        )
+        return get_object_or_404(queryset, owner=self.request.user)
 
 # View for owners to edit their salon profile
 class SalonEditView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView):
@@ -90,15 +124,39 @@ class SuperAdminDashboardView(LoginRequiredMixin, SuperAdminRequiredMixin, ListV
     model = Salon
     template_name = 'salon/superadmin_dashboard.html'
     context_object_name = 'salons'
-    queryset = Salon.objects.all().order_by('-created_at')
+    queryset = Salon.objects.select_related('owner')
+    page_size = 25
+    keyset_fields = ('created_at', 'id')
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['total_users'] = User.objects.count()
+        page = KeysetPage(
+            self.object_list, self.keyset_fields, self.page_size,
+            after=self.request.GET.get('after'), before=self.request.GET.get('before'),
+        )
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        # Totals come from the daily rollups so they cost the same at any size;
+        # the pending count only reads the partial index of unapproved salons
+        totals = metrics.platform_totals()
+        context['totals'] = totals
+        context['total_salons'] = totals['salons_registered']
+        context['total_users'] = totals['users']
+        context['total_bookings'] = totals['bookings']
         context['pending_salons_count'] = Salon.objects.filter(is_approved=False).count()
-        context['total_bookings'] = Booking.objects.count()
+        context['series'] = metrics.daily_series()
+        context['page'] = page
+        context['next_query'] = self._page_query('after', page.next_cursor)
+        context['previous_query'] = self._page_query('before', page.previous_cursor)
         return context
 
+    def _page_query(self, direction, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query.pop('after', None)
+        query.pop('before', None)
+        query[direction] = cursor
+        return query.urlencode()
+
 # Admin View to List All Salons
 class AdminSalonListView(LoginRequiredMixin, SuperAdminRequiredMixin, ListView):
     model = Salon
@@ -148,7 +206,7 @@ class CategoryListView(LoginRequiredMixin, SalonOwnerRequiredMixin, ListView):
     context_object_name = 'categories'
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return ServiceCategory.objects.filter(salon=salon)
 
 class CategoryCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView):
@@ -158,7 +216,7 @@ class CategoryCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView
     success_url = reverse_lazy('salon:category_list')
 
     def form_valid(self, form):
-        form.instance.salon = get_object_or_404(Salon, owner=self.request.user)
+        form.instance.salon = self.get_salon()
         messages.success(self.request, "Category created successfully.")
         return super().form_valid(form)
 
@@ -169,12 +227,12 @@ class CategoryUpdateView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView
     success_url = reverse_lazy('salon:category_list')
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return ServiceCategory.objects.filter(salon=salon)
 
 class CategoryDeleteView(LoginRequiredMixin, SalonOwnerRequiredMixin, View):
     def post(self, request, pk):
-        salon = get_object_or_404(Salon, owner=request.user)
+        salon = self.get_salon()
         category = get_object_or_404(ServiceCategory, pk=pk, salon=salon)
         category.delete()
         messages.success(request, "Category deleted successfully.")
@@ -188,7 +246,7 @@ class ServiceListView(LoginRequiredMixin, SalonOwnerRequiredMixin, ListView):
     context_object_name = 'services'
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return Service.objects.filter(salon=salon).select_related('category')
 
 class ServiceCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView):
@@ -199,11 +257,11 @@ class ServiceCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['salon'] = get_object_or_404(Salon, owner=self.request.user)
+        kwargs['salon'] = self.get_salon()
         return kwargs
 
     def form_valid(self, form):
-        form.instance.salon = get_object_or_404(Salon, owner=self.request.user)
+        form.instance.salon = self.get_salon()
         messages.success(self.request, "Service added successfully.")
         return super().form_valid(form)
 
@@ -214,12 +272,12 @@ class ServiceUpdateView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView)
     success_url = reverse_lazy('salon:service_list')
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return Service.objects.filter(salon=salon)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['salon'] = get_object_or_404(Salon, owner=self.request.user)
+        kwargs['salon'] = self.get_salon()
         return kwargs
 
     def form_valid(self, form):
@@ -228,7 +286,7 @@ class ServiceUpdateView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView)
 
 class ServiceDeleteView(LoginRequiredMixin, SalonOwnerRequiredMixin, View):
     def post(self, request, pk):
-        salon = get_object_or_404(Salon, owner=request.user)
+        salon = self.get_salon()
         service = get_object_or_404(Service, pk=pk, salon=salon)
         service.delete()
         messages.success(request, "Service deleted successfully.")
@@ -242,7 +300,7 @@ class StaffListView(LoginRequiredMixin, SalonOwnerRequiredMixin, ListView):
     context_object_name = 'staff_members'
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return Staff.objects.filter(salon=salon).order_by('name')
 
 class StaffCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView):
@@ -252,7 +310,7 @@ class StaffCreateView(LoginRequiredMixin, SalonOwnerRequiredMixin, CreateView):
     success_url = reverse_lazy('salon:staff_list')
 
     def form_valid(self, form):
-        form.instance.salon = get_object_or_404(Salon, owner=self.request.user)
+        form.instance.salon = self.get_salon()
         messages.success(self.request, f"Staff member '{form.instance.name}' added successfully.")
         return super().form_valid(form)
 
@@ -263,7 +321,7 @@ class StaffUpdateView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView):
     success_url = reverse_lazy('salon:staff_list')
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, owner=self.request.user)
+        salon = self.get_salon()
         return Staff.objects.filter(salon=salon)
 
     def form_valid(self, form):
@@ -272,42 +330,187 @@ class StaffUpdateView(LoginRequiredMixin, SalonOwnerRequiredMixin, UpdateView):
 
 class StaffDeleteView(LoginRequiredMixin, SalonOwnerRequiredMixin, View):
     def post(self, request, pk):
-        salon = get_object_or_404(Salon, owner=request.user)
+        salon = self.get_salon()
         member = get_object_or_404(Staff, pk=pk, salon=salon)
         name = member.name
         member.delete()
         return redirect('salon:staff_list')
 
+# --- Bulk Import ---
+
+# Upload a CSV/XLSX of services or staff; all rows are saved or none are
+class CatalogImportView(LoginRequiredMixin, SalonOwnerRequiredMixin, FormView):
+    form_class = CatalogImportForm
+    template_name = 'salon/catalog_import.html'
+    kind = 'services'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['kind'] = self.kind
+        context['columns'] = imports.SERVICE_COLUMNS if self.kind == 'services' else imports.STAFF_COLUMNS
+        context['list_url'] = reverse_lazy('salon:service_list' if self.kind == 'services' else 'salon:staff_list')
+        return context
+
+    def form_valid(self, form):
+        importer = imports.import_services if self.kind == 'services' else imports.import_staff
+        try:
+            created, errors = importer(self.get_salon(), form.cleaned_data['file'])
+        except imports.UploadError as exc:
+            form.add_error('file', str(exc))
+            return self.form_invalid(form)
+        if errors:
+            messages.error(self.request, f"Nothing was imported: {len(errors)} row(s) need fixing.")
+            return self.render_to_response(self.get_context_data(form=form, row_errors=sorted(errors.items())))
+        if not created:
+            form.add_error('file', "The file has no rows to import.")
+            return self.form_invalid(form)
+        messages.success(self.request, f"Imported {created} {'services' if self.kind == 'services' else 'staff members'}.")
+        return redirect('salon:service_list' if self.kind == 'services' else 'salon:staff_list')
+
 # --- Public Customer Views ---
 
-class PublicSalonListView(ListView):
+class ConditionalPublicPageMixin:
+    """
+    Anonymous visitors get ETag/Last-Modified validators built from the
+    catalog version, a 304 before any template work once they hold the
+    current page, and a Cache-Control that lets a reverse proxy keep the
+    page for PUBLIC_PAGE_CACHE_SECONDS. Signed-in users (and anyone with a
+    pending message) see their own name and messages, so their copy is
+    always rendered and kept private.
+    """
+
+    def page_validators(self, user, version, modified):
+        """(ETag, last-modified timestamp) when the page can be shared, else None."""
+        if user.is_authenticated or len(get_messages(self.request)):
+            return None
+        # The static manifest hash changes with the stylesheets a deploy
+        # links to, so a kept page never points at removed assets
+        key = '|'.join([
+            str(version),
+            self.request.get_full_path(),
+            getattr(staticfiles_storage, 'manifest_hash', ''),
+        ])
+        return f'W/"{hashlib.md5(key.encode()).hexdigest()}"', modified
+
+    def not_modified(self, validators):
+        if validators is None:
+            return None
+        etag, modified = validators
+        response = get_conditional_response(self.request, etag=etag, last_modified=int(modified))
+        return None if response is None else self.add_validators(response, validators)
+
+    def add_validators(self, response, validators):
+        if validators is None:
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        etag, modified = validators
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PUBLIC_PAGE_CACHE_SECONDS)
+        return response
+
+
+class PublicSalonListView(ConditionalPublicPageMixin, ListView):
     model = Salon
     template_name = 'salon/public_salon_list.html'
     context_object_name = 'salons'
-    
-    def get_queryset(self):
+    radius_choices = [2, 5, 10, 25, 50]
+
+    def parse_search(self):
+        self.query = self.request.GET.get('q', '').strip()
+        self.point = geo.parse_point(self.request.GET.get('near'))
+        self.radius = geo.parse_radius(self.request.GET.get('radius'))
+
+    def public_salons(self):
         # Show all approved and active salons
-        return Salon.objects.filter(is_approved=True, is_active=True).order_by('name')
+        return Salon.objects.filter(is_approved=True, is_active=True)
+
+    def get_queryset(self):
+        self.parse_search()
+        queryset = self.public_salons()
+        if self.point:
+            if self.query:
+                queryset = queryset.filter(pk__in=search.search_salons(queryset, self.query).order_by().values('pk'))
+            # Nearest first within the radius
+            return geo.nearby(queryset, *self.point, radius_km=self.radius)
+        if self.query:
+            # Ranked full-text search over salon details and catalog names
+            return search.search_salons(queryset, self.query)
+        return queryset.order_by('name')
+
+    def get(self, request, *args, **kwargs):
+        # Any catalog change can move salons in or out of every listing
+        validators = self.page_validators(request.user, *catalog_cache.catalog_state())
+        response = self.not_modified(validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.add_validators(response, validators)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['near'] = self.request.GET.get('near', '') if self.point else ''
+        context['radius'] = self.radius
+        context['radius_choices'] = self.radius_choices
+        return context
 
-class PublicSalonDetailView(DetailView):
+class AsyncPublicSalonListView(PublicSalonListView):
+    """The same page for ASGI, with its queries made through the async ORM."""
+
+    async def get(self, request, *args, **kwargs):
+        validators = self.page_validators(await request.auser(), *await catalog_cache.acatalog_state())
+        response = self.not_modified(validators)
+        if response is not None:
+            return response
+        self.parse_search()
+        queryset = self.public_salons()
+        if self.point:
+            if self.query:
+                matches = await search.asearch_salons(queryset, self.query)
+                queryset = queryset.filter(pk__in=matches.order_by().values('pk'))
+            salons = await geo.anearby(queryset, *self.point, radius_km=self.radius)
+        elif self.query:
+            salons = [salon async for salon in await search.asearch_salons(queryset, self.query)]
+        else:
+            salons = [salon async for salon in queryset.order_by('name')]
+        self.object_list = salons
+        # TemplateResponse: the handler renders it on a thread after the view
+        return self.add_validators(self.render_to_response(self.get_context_data()), validators)
+
+class PublicSalonDetailView(ConditionalPublicPageMixin, DetailView):
     model = Salon
     template_name = 'salon/public_salon_detail.html'
     context_object_name = 'salon'
-    
+
+    def salon_validators(self, user):
+        return self.page_validators(user, self.object.catalog_version, self.object.catalog_updated_at.timestamp())
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        validators = self.salon_validators(request.user)
+        response = self.not_modified(validators)
+        if response is None:
+            response = self.render_to_response(self.get_context_data(object=self.object))
+        return self.add_validators(response, validators)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        salon = self.object
-        # Group services by category for display
-        services = salon.services.filter(is_active=True).select_related('category').order_by('category__name', 'name')
-        
-        # Grouping logic
-        grouped_services = {}
-        for service in services:
-            cat_name = service.category.name if service.category else "Uncategorized"
-            if cat_name not in grouped_services:
-                grouped_services[cat_name] = []
-            grouped_services[cat_name].append(service)
-            
-        context['grouped_services'] = grouped_services
-        context['staff_members'] = salon.staff.filter(is_active=True)
+        # Services grouped by category and the team section, rendered once per
+        # catalog change and shared through the cache
+        context['catalog_html'] = catalog_cache.get_catalog_html(self.object)
         return context
+
+class AsyncPublicSalonDetailView(PublicSalonDetailView):
+    """The same page for ASGI; a cached catalog costs no thread hand-off."""
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(Salon, pk=self.kwargs['pk'])
+        validators = self.salon_validators(await request.auser())
+        response = self.not_modified(validators)
+        if response is not None:
+            return response
+        # DetailView's context without the sync catalog lookup above
+        context = super(PublicSalonDetailView, self).get_context_data(
+            catalog_html=await catalog_cache.aget_catalog_html(self.object),
+        )
+        return self.add_validators(self.render_to_response(context), validators)